@@ -1,7 +1,18 @@
 """Shared API dependencies."""
 
+from typing import Optional
+
+from fastapi import Depends, Header, Query
+
+from app.models.api_schemas import WhiteBalanceRequest
+from app.models.enums import ColorSpace, OutputFormat, WhiteBalanceAlgorithm
+from app.services.image_encoding import MEDIA_TYPES
 from app.services.white_balance_service import WhiteBalanceService
 
+IMAGE_MEDIA_TYPES: dict[str, OutputFormat] = {
+    media_type: output_format for output_format, media_type in MEDIA_TYPES.items()
+}
+
 
 def get_white_balance_service() -> WhiteBalanceService:
     """Get white balance service instance.
@@ -11,3 +22,169 @@ def get_white_balance_service() -> WhiteBalanceService:
     """
     return WhiteBalanceService()
 
+
+def get_estimation_request(
+    algorithm: WhiteBalanceAlgorithm = Query(
+        default=WhiteBalanceAlgorithm.GREY_WORLD,
+        description="White balance algorithm to apply",
+    ),
+    input_color_space: ColorSpace = Query(
+        default=ColorSpace.SRGB,
+        description="Input color space",
+    ),
+    processing_space: ColorSpace = Query(
+        default=ColorSpace.LINEAR_RGB,
+        description="Processing color space",
+    ),
+    estimation_max_edge: int | None = Query(
+        default=None,
+        ge=16,
+        description="Estimate gains on a proxy with at most this long edge in pixels",
+    ),
+    report_estimation_error: bool = Query(
+        default=False,
+        description="Also estimate at full resolution and report the angular difference",
+    ),
+    sigma: float | None = Query(
+        default=None,
+        ge=0.0,
+        le=50.0,
+        description="Gaussian pre-smoothing sigma in pixels for edge-based and Minkowski "
+        "algorithms (0 disables smoothing; algorithm default if omitted)",
+    ),
+    p: float | None = Query(
+        default=None,
+        ge=1.0,
+        le=32.0,
+        description="Minkowski norm of grey edge, shades of grey and general grey edge "
+        "(6 if omitted)",
+    ),
+    n: int | None = Query(
+        default=None,
+        ge=0,
+        le=2,
+        description="Derivative order of general grey edge (1 if omitted)",
+    ),
+    percentile: float | None = Query(
+        default=None,
+        ge=0.0,
+        le=100.0,
+        description="White patch brightness or grey edge gradient percentile selecting "
+        "reference pixels (99.5 and 95 if omitted)",
+    ),
+) -> WhiteBalanceRequest:
+    """Build the request of an estimation endpoint from its query parameters.
+
+    Args:
+        algorithm: Algorithm to use, see ``/algorithms``.
+        input_color_space: Input color space (sRGB, linear_rgb).
+        processing_space: Processing color space (sRGB, linear_rgb).
+        estimation_max_edge: Long edge of the estimation proxy (None for settings default).
+        report_estimation_error: Whether to report proxy vs full-resolution error.
+        sigma: Pre-smoothing sigma.
+        p: Minkowski norm parameter.
+        n: Derivative order of general grey edge.
+        percentile: White patch or grey edge selection percentile.
+
+    Returns:
+        White balance request with default output settings.
+    """
+    return WhiteBalanceRequest(
+        algorithm=algorithm,
+        input_color_space=input_color_space,
+        processing_space=processing_space,
+        estimation_max_edge=estimation_max_edge,
+        report_estimation_error=report_estimation_error,
+        sigma=sigma,
+        p=p,
+        n=n,
+        percentile=percentile,
+    )
+
+
+def get_white_balance_request(
+    request: WhiteBalanceRequest = Depends(get_estimation_request),
+    output_format: OutputFormat = Query(
+        default=OutputFormat.PNG,
+        description="Output image format",
+    ),
+    output_quality: int | None = Query(
+        default=None,
+        ge=1,
+        le=100,
+        description="JPEG/WebP quality (settings default if omitted)",
+    ),
+    compress_level: int | None = Query(
+        default=None,
+        ge=0,
+        le=9,
+        description="PNG zlib level, or WebP effort clamped to 6 (settings defaults if omitted)",
+    ),
+) -> WhiteBalanceRequest:
+    """Build the request of an endpoint returning images from its query parameters.
+
+    Args:
+        request: Estimation parameters of the request.
+        output_format: Output image format (png, jpeg, webp, raw).
+        output_quality: JPEG/WebP quality.
+        compress_level: PNG compression level or WebP effort.
+
+    Returns:
+        White balance request.
+    """
+    return WhiteBalanceRequest(
+        **request.model_dump(exclude={"output_format", "output_quality", "compress_level"}),
+        output_format=output_format,
+        output_quality=output_quality,
+        compress_level=compress_level,
+    )
+
+
+def get_accepted_image_format(
+    accept: Optional[str] = Header(default=None),
+) -> Optional[OutputFormat]:
+    """Negotiate a binary image response from the Accept header.
+
+    The media type with the highest quality value wins; ties between image
+    types go to the type listed first and ties with JSON keep JSON.
+    ``image/*`` selects PNG. JSON, ``*/*`` and a missing header keep the
+    default JSON response. Malformed quality values count as ``q=0``.
+
+    Args:
+        accept: Value of the Accept request header.
+
+    Returns:
+        Output format to return as a binary response, or None for JSON.
+    """
+    if not accept:
+        return None
+
+    best_format: Optional[OutputFormat] = None
+    best_quality = 0.0
+    json_quality = 0.0
+    for entry in accept.split(","):
+        media_type, *params = [part.strip() for part in entry.split(";")]
+        media_type = media_type.lower()
+
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+
+        if media_type in ("application/json", "*/*"):
+            json_quality = max(json_quality, quality)
+            continue
+
+        if media_type == "image/*":
+            output_format: Optional[OutputFormat] = OutputFormat.PNG
+        else:
+            output_format = IMAGE_MEDIA_TYPES.get(media_type)
+        if output_format is not None and quality > best_quality:
+            best_format, best_quality = output_format, quality
+
+    if best_format is None or json_quality >= best_quality:
+        return None
+    return best_format
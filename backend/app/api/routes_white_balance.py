@@ -1,59 +1,730 @@
 """White balance API routes."""
 
-from fastapi import APIRouter, Depends, File, Query, UploadFile
+import json
+from typing import AsyncIterator, Iterator, Optional, Union
 
-from app.models.api_schemas import WhiteBalanceRequest, WhiteBalanceResponse
-from app.models.enums import ColorSpace, WhiteBalanceAlgorithm
+from fastapi import APIRouter, Depends, File, Form, Path, Query, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+
+from app.api.dependencies import (
+    get_accepted_image_format,
+    get_estimation_request,
+    get_white_balance_request,
+)
+from app.core import metrics
+from app.core.config import settings
+from app.core.errors import WhiteBalanceError
+from app.models.api_schemas import (
+    AlgorithmInfoResponse,
+    CacheStatsResponse,
+    CompareVariant,
+    ImageUploadResponse,
+    SequenceOptions,
+    WhiteBalanceBatchItem,
+    WhiteBalanceBatchResponse,
+    WhiteBalanceCompareResponse,
+    WhiteBalanceEstimateResponse,
+    WhiteBalanceRequest,
+    WhiteBalanceResponse,
+    WhiteBalanceSequenceFrame,
+    WhiteBalanceSequenceSummary,
+)
+from app.models.dto import IlluminantEstimate, ProcessedImageResult, SequenceResult
+from app.models.enums import OutputFormat, WhiteBalanceAlgorithm
+from app.services.image_encoding import MEDIA_TYPES
+from app.services.image_store import get_image_store
+from app.services.result_cache import CACHE_HIT, CACHE_MISS, get_result_cache
 from app.services.white_balance_service import WhiteBalanceService
 
 router = APIRouter(prefix="/white-balance", tags=["white-balance"])
 
+STREAM_CHUNK_SIZE = 1 << 16
+
+# Statistics headers sent with binary image responses
+RESULT_HEADERS = [
+    "X-Algorithm",
+    "X-Processing-Space",
+    "X-Avg-RGB-Before",
+    "X-Avg-RGB-After",
+    "X-Gains",
+    "X-Estimation-Size",
+    "X-Estimation-Error-Deg",
+    "X-Image-Width",
+    "X-Image-Height",
+    "X-Output-Bytes",
+    "X-Encode-Time-Ms",
+    "X-Cache",
+    "Server-Timing",
+    "X-Profile-Id",
+]
+
+# Cache status of a batch served partly from the result cache
+CACHE_PARTIAL = "PARTIAL"
+
+
+def _format_rgb(values: Optional[tuple[float, ...]]) -> Optional[str]:
+    """Format an RGB triple for a response header.
+
+    Args:
+        values: RGB values, or None.
+
+    Returns:
+        Comma-separated values, or None.
+    """
+    if values is None:
+        return None
+    return ",".join(f"{value:.6f}" for value in values)
+
+
+def _server_timing(
+    stage_times_ms: Optional[dict[str, float]], cache_status: Optional[str] = None
+) -> Optional[str]:
+    """Format the stage timings of a result as a ``Server-Timing`` header.
+
+    Args:
+        stage_times_ms: Milliseconds per processing stage, if known.
+        cache_status: Cache status of the result, if it was looked up.
+
+    Returns:
+        Header value, or None if timings are disabled or unknown.
+    """
+    if not settings.metrics_enabled:
+        return None
+    # Cache hits carry the timings of the request that computed them
+    if cache_status == CACHE_HIT:
+        return 'cache;desc="hit"'
+    if not stage_times_ms:
+        return None
+    return metrics.format_server_timing(stage_times_ms)
+
+
+def _set_server_timing(response: Response, server_timing: Optional[str]) -> None:
+    """Set the ``Server-Timing`` header of a JSON response, if there is one.
+
+    Args:
+        response: Response used to set headers on JSON responses.
+        server_timing: Header value, or None.
+    """
+    if server_timing is not None:
+        response.headers["Server-Timing"] = server_timing
+
+
+def _result_headers(result: ProcessedImageResult) -> dict[str, str]:
+    """Build response headers carrying the processing statistics.
+
+    Args:
+        result: Processed image result.
+
+    Returns:
+        Headers for a binary image response.
+    """
+    headers = {
+        "X-Algorithm": result.algorithm,
+        "X-Processing-Space": result.processing_space,
+        "X-Avg-RGB-Before": _format_rgb(result.avg_rgb_before),
+        "X-Avg-RGB-After": _format_rgb(result.avg_rgb_after),
+        "X-Gains": _format_rgb(result.gains),
+    }
+    if result.estimation_size is not None:
+        headers["X-Estimation-Size"] = "{}x{}".format(*result.estimation_size)
+    if result.estimation_error_deg is not None:
+        headers["X-Estimation-Error-Deg"] = f"{result.estimation_error_deg:.6f}"
+    if result.width is not None and result.height is not None:
+        headers["X-Image-Width"] = str(result.width)
+        headers["X-Image-Height"] = str(result.height)
+    headers["X-Output-Bytes"] = str(result.output_bytes)
+    if result.encode_time_ms is not None:
+        headers["X-Encode-Time-Ms"] = f"{result.encode_time_ms:.3f}"
+    headers["X-Cache"] = result.cache_status
+    headers["Server-Timing"] = _server_timing(result.stage_times_ms, result.cache_status)
+    headers["X-Profile-Id"] = result.profile_id
+    return {name: value for name, value in headers.items() if value is not None}
+
+
+def _to_response(result: ProcessedImageResult) -> WhiteBalanceResponse:
+    """Convert a processed image result to the JSON response model.
+
+    Args:
+        result: Processed image result.
+
+    Returns:
+        White balance response with the image base64 encoded.
+    """
+    return WhiteBalanceResponse(
+        algorithm=result.algorithm,
+        processing_space=result.processing_space,
+        image_base64=result.image_base64,
+        avg_rgb_before=result.avg_rgb_before,
+        avg_rgb_after=result.avg_rgb_after,
+        gains=result.gains,
+        estimation_size=result.estimation_size,
+        estimation_error_deg=result.estimation_error_deg,
+        output_format=result.output_format,
+        width=result.width,
+        height=result.height,
+        output_bytes=result.output_bytes,
+        encode_time_ms=result.encode_time_ms,
+        profile_id=result.profile_id,
+        profile_summary=result.profile_summary,
+    )
+
+
+def _image_response(
+    result: ProcessedImageResult, image_format: Optional[OutputFormat], response: Response
+) -> Union[WhiteBalanceResponse, StreamingResponse]:
+    """Build the response for a single processed image.
+
+    Args:
+        result: Processed image result.
+        image_format: Output format negotiated from the Accept header, if binary.
+        response: Response used to set headers on JSON responses.
+
+    Returns:
+        Streamed encoded image with statistics headers, or the JSON response.
+    """
+    if image_format is not None:
+        return StreamingResponse(
+            _iter_chunks(result.image_data),
+            media_type=result.media_type,
+            headers=_result_headers(result),
+        )
+
+    if result.cache_status is not None:
+        response.headers["X-Cache"] = result.cache_status
+    _set_server_timing(response, _server_timing(result.stage_times_ms, result.cache_status))
+
+    # Convert to response model
+    return _to_response(result)
+
 
-@router.post("/apply", response_model=WhiteBalanceResponse)
+def _estimate_response(
+    result: IlluminantEstimate, response: Response
+) -> WhiteBalanceEstimateResponse:
+    """Convert an illuminant estimate to the JSON response model.
+
+    Args:
+        result: Illuminant estimate.
+        response: Response used to set the cache status and timing headers.
+
+    Returns:
+        Estimate response.
+    """
+    if result.cache_status is not None:
+        response.headers["X-Cache"] = result.cache_status
+    _set_server_timing(response, _server_timing(result.stage_times_ms, result.cache_status))
+
+    return WhiteBalanceEstimateResponse(
+        algorithm=result.algorithm,
+        processing_space=result.processing_space,
+        gains=result.gains,
+        illuminant_rgb=result.illuminant_rgb,
+        width=result.width,
+        height=result.height,
+        avg_rgb_before=result.avg_rgb_before,
+        estimation_size=result.estimation_size,
+        estimation_error_deg=result.estimation_error_deg,
+    )
+
+
+def _parse_variants(variants: str) -> list[CompareVariant]:
+    """Parse the JSON list of comparison variants.
+
+    Args:
+        variants: JSON array of variant objects.
+
+    Returns:
+        Parsed variants.
+
+    Raises:
+        WhiteBalanceError: If the JSON is malformed or a variant is invalid.
+    """
+    try:
+        return TypeAdapter(list[CompareVariant]).validate_json(variants)
+    except ValidationError as e:
+        raise WhiteBalanceError(f"Invalid variants: {e}") from e
+
+
+def _iter_chunks(data: bytes) -> Iterator[memoryview]:
+    """Yield encoded image bytes in chunks without copying them.
+
+    Args:
+        data: Encoded image.
+
+    Yields:
+        Consecutive chunks of ``data``.
+    """
+    view = memoryview(data)
+    for start in range(0, len(view), STREAM_CHUNK_SIZE):
+        yield view[start : start + STREAM_CHUNK_SIZE]
+
+
+async def _iter_sequence_lines(
+    first: SequenceResult,
+    remaining: AsyncIterator[SequenceResult],
+    request: WhiteBalanceRequest,
+) -> AsyncIterator[str]:
+    """Yield a processed frame sequence as newline-delimited JSON.
+
+    Every frame is one line, sent as soon as its upload is processed, and a
+    summary line closes the stream. An error after the first upload can no
+    longer change the status code, so it is sent as a last line shaped like
+    an error response instead.
+
+    Args:
+        first: Processed frames of the first upload.
+        remaining: Processed frames of the following uploads.
+        request: White balance request parameters.
+
+    Yields:
+        JSON lines of :class:`WhiteBalanceSequenceFrame` and a closing
+        :class:`WhiteBalanceSequenceSummary`.
+    """
+    frame_count = 0
+    estimated_frames = 0
+    scene_changes: list[int] = []
+    elapsed_ms = 0.0
+    stage_times_ms: dict[str, float] = {}
+    result: Optional[SequenceResult] = first
+    while result is not None:
+        for frame, estimated, scene_change in zip(
+            result.frames, result.estimated, result.scene_changes
+        ):
+            line = WhiteBalanceSequenceFrame(
+                filename=frame.filename,
+                index=frame_count,
+                estimated=estimated,
+                scene_change=scene_change,
+                **_to_response(frame).model_dump(),
+            )
+            yield line.model_dump_json() + "\n"
+            estimated_frames += estimated
+            if scene_change:
+                scene_changes.append(frame_count)
+            frame_count += 1
+        elapsed_ms += result.elapsed_ms
+        metrics.add_stage_times(stage_times_ms, result.stage_times_ms or {})
+
+        try:
+            result = await anext(remaining, None)
+        except WhiteBalanceError as e:
+            yield json.dumps({"detail": str(e), "type": e.__class__.__name__}) + "\n"
+            return
+
+    summary = WhiteBalanceSequenceSummary(
+        algorithm=request.algorithm,
+        processing_space=request.processing_space,
+        frame_count=frame_count,
+        estimated_frames=estimated_frames,
+        scene_changes=scene_changes,
+        elapsed_ms=elapsed_ms,
+        frames_per_second=frame_count * 1000.0 / max(elapsed_ms, 1e-6),
+        stage_times_ms=stage_times_ms if settings.metrics_enabled and stage_times_ms else None,
+    )
+    yield summary.model_dump_json() + "\n"
+
+
+@router.post(
+    "/apply",
+    response_model=WhiteBalanceResponse,
+    responses={
+        200: {
+            "content": {media_type: {} for media_type in MEDIA_TYPES.values()},
+            "description": "JSON with a base64 image, or the encoded image itself "
+            "when requested via the Accept header",
+        }
+    },
+)
 async def apply_white_balance(
+    response: Response,
     file: UploadFile = File(...),
-    algorithm: WhiteBalanceAlgorithm = Query(
-        default=WhiteBalanceAlgorithm.GREY_WORLD,
-        description="White balance algorithm to apply",
-    ),
-    input_color_space: ColorSpace = Query(
-        default=ColorSpace.SRGB,
-        description="Input color space",
-    ),
-    processing_space: ColorSpace = Query(
-        default=ColorSpace.LINEAR_RGB,
-        description="Processing color space",
+    profile: bool = Query(
+        default=False,
+        description="Profile processing and return the hottest operators (requires "
+        "PROFILING_ENABLED; bypasses the result cache)",
     ),
+    request: WhiteBalanceRequest = Depends(get_white_balance_request),
+    image_format: Optional[OutputFormat] = Depends(get_accepted_image_format),
     service: WhiteBalanceService = Depends(),
-) -> WhiteBalanceResponse:
+) -> Union[WhiteBalanceResponse, StreamingResponse]:
     """Apply white balance algorithm to uploaded image.
 
+    Sending ``Accept: image/png``, ``image/jpeg``, ``image/webp`` or
+    ``application/octet-stream`` (raw RGB) returns the encoded image directly,
+    with statistics in ``X-*`` response headers; the Accept header then takes
+    precedence over ``output_format``. Otherwise the image is returned base64
+    encoded inside JSON.
+
     Args:
+        response: Response used to set the cache status header.
         file: Image file to process.
-        algorithm: Algorithm to use (grey_world, white_patch, grey_edge).
-        input_color_space: Input color space (sRGB, linear_rgb).
-        processing_space: Processing color space (sRGB, linear_rgb).
+        profile: Whether to profile processing.
+        request: White balance request parameters.
+        image_format: Output format negotiated from the Accept header, if binary.
         service: White balance service instance.
 
     Returns:
-        White balance response with processed image.
+        White balance response with processed image, or the image itself.
     """
-    # Create request model
-    request = WhiteBalanceRequest(
-        algorithm=algorithm,
-        input_color_space=input_color_space,
-        processing_space=processing_space,
-    )
+    if image_format is not None:
+        request.output_format = image_format
 
     # Process image
-    result = await service.apply(file, request)
+    result = await service.apply(file, request, profile)
+
+    return _image_response(result, image_format, response)
+
+
+@router.post("/estimate", response_model=WhiteBalanceEstimateResponse)
+async def estimate_white_balance(
+    response: Response,
+    file: UploadFile = File(...),
+    request: WhiteBalanceRequest = Depends(get_estimation_request),
+    service: WhiteBalanceService = Depends(),
+) -> WhiteBalanceEstimateResponse:
+    """Estimate white balance gains for uploaded image without returning an image.
+
+    Args:
+        response: Response used to set the cache status and timing headers.
+        file: Image file to analyze.
+        request: White balance request parameters.
+        service: White balance service instance.
+
+    Returns:
+        Estimated per-channel gains and illuminant color.
+    """
+    # Estimate gains
+    result = await service.estimate(file, request)
+
+    return _estimate_response(result, response)
+
+
+@router.post("/apply-batch", response_model=WhiteBalanceBatchResponse)
+async def apply_white_balance_batch(
+    response: Response,
+    files: list[UploadFile] = File(...),
+    request: WhiteBalanceRequest = Depends(get_white_balance_request),
+    service: WhiteBalanceService = Depends(),
+) -> WhiteBalanceBatchResponse:
+    """Apply white balance algorithm to many uploaded images at once.
+
+    Args:
+        response: Response used to set the cache status and timing headers.
+        files: Image files to process.
+        request: White balance request parameters.
+        service: White balance service instance.
+
+    Returns:
+        Batch response with one processed image per uploaded file.
+    """
+    # Process images
+    results = await service.apply_batch(files, request)
+
+    statuses = {result.cache_status for result in results}
+    if statuses == {CACHE_HIT} or statuses == {CACHE_MISS}:
+        response.headers["X-Cache"] = statuses.pop()
+    elif None not in statuses:
+        response.headers["X-Cache"] = CACHE_PARTIAL
+
+    # Images served from the cache took no processing time in this request
+    stage_times_ms: dict[str, float] = {}
+    for result in results:
+        if result.cache_status != CACHE_HIT:
+            metrics.add_stage_times(stage_times_ms, result.stage_times_ms or {})
+    _set_server_timing(response, _server_timing(stage_times_ms, response.headers.get("X-Cache")))
 
     # Convert to response model
-    return WhiteBalanceResponse(
-        algorithm=result.algorithm,
-        processing_space=result.processing_space,
-        image_base64=result.image_base64,
+    return WhiteBalanceBatchResponse(
+        algorithm=request.algorithm,
+        processing_space=request.processing_space,
+        results=[
+            WhiteBalanceBatchItem(
+                filename=result.filename, **_to_response(result).model_dump()
+            )
+            for result in results
+        ],
+    )
+
+
+@router.post("/apply-sequence", response_class=StreamingResponse)
+async def apply_white_balance_sequence(
+    files: list[UploadFile] = File(...),
+    reestimate_interval: int | None = Query(
+        default=None,
+        ge=1,
+        description="Re-estimate gains at least every this many frames (settings default if "
+        "omitted)",
+    ),
+    smoothing: float | None = Query(
+        default=None,
+        gt=0.0,
+        le=1.0,
+        description="Weight of each new estimate in the moving average of the gains, 1 "
+        "disables smoothing (settings default if omitted)",
+    ),
+    scene_change_threshold: float | None = Query(
+        default=None,
+        gt=0.0,
+        description="Relative change of the channel means that triggers a new estimate "
+        "(settings default if omitted)",
+    ),
+    request: WhiteBalanceRequest = Depends(get_white_balance_request),
+    service: WhiteBalanceService = Depends(),
+) -> StreamingResponse:
+    """Apply white balance to a sequence of frames with temporally smoothed gains.
+
+    Args:
+        files: Frames in sequence order; animated images contribute all their frames.
+        reestimate_interval: Maximum number of frames between estimates.
+        smoothing: Moving average weight of new estimates.
+        scene_change_threshold: Channel mean change that triggers an estimate.
+        request: White balance request parameters.
+        service: White balance service instance.
+
+    Returns:
+        Newline-delimited JSON stream with one line per frame and a summary line.
+    """
+    if request.report_estimation_error:
+        raise WhiteBalanceError("report_estimation_error is not supported for sequences")
+
+    options = SequenceOptions(
+        reestimate_interval=reestimate_interval,
+        smoothing=smoothing,
+        scene_change_threshold=scene_change_threshold,
+    )
+
+    # Process the first upload before streaming, so its errors get a regular error response
+    results = service.apply_sequence(files, request, options)
+    first = await anext(results)
+
+    return StreamingResponse(
+        _iter_sequence_lines(first, results, request),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.post("/compare", response_model=WhiteBalanceCompareResponse)
+async def compare_white_balance(
+    response: Response,
+    file: UploadFile | None = File(default=None),
+    image_id: str | None = Query(
+        default=None,
+        description="Image ID returned by /images, instead of uploading a file",
+    ),
+    algorithms: list[WhiteBalanceAlgorithm] | None = Query(
+        default=None,
+        description="Algorithms to compare (all algorithms if omitted)",
+    ),
+    variants: str | None = Form(
+        default=None,
+        description='JSON list of variants such as [{"algorithm": "grey_edge", '
+        '"processing_space": "sRGB", "sigma": 2}]; takes precedence over algorithms',
+    ),
+    contact_sheet: bool = Query(
+        default=False,
+        description="Also return the input and all results side by side in one image",
+    ),
+    request: WhiteBalanceRequest = Depends(get_white_balance_request),
+    service: WhiteBalanceService = Depends(),
+) -> WhiteBalanceCompareResponse:
+    """Compare several algorithms or parameter sets on one image.
+
+    The image is decoded and converted once, and intermediate statistics
+    are shared between variants.
+
+    Args:
+        response: Response used to set the timing header.
+        file: Image file to process, unless ``image_id`` is given.
+        image_id: Image ID returned by ``/images``.
+        algorithms: Algorithms to compare.
+        variants: JSON list of variants with per-variant parameters.
+        contact_sheet: Whether to return a side-by-side contact sheet.
+        request: Parameters shared by all variants; each variant replaces the
+            algorithm and the parameters it sets.
+        service: White balance service instance.
+
+    Returns:
+        One result per variant, in order, and the optional contact sheet.
+    """
+    if variants is not None:
+        compare_variants = _parse_variants(variants)
+    else:
+        compare_variants = [
+            CompareVariant(algorithm=algorithm)
+            for algorithm in (algorithms or list(WhiteBalanceAlgorithm))
+        ]
+
+    # Create one request model per variant
+    shared = request.model_dump()
+    requests = [
+        WhiteBalanceRequest(**{**shared, **variant.model_dump(exclude_none=True)})
+        for variant in compare_variants
+    ]
+
+    # Compare variants
+    result = await service.compare(file, image_id, requests, contact_sheet)
+    _set_server_timing(response, _server_timing(result.stage_times_ms))
+
+    # Convert to response model
+    return WhiteBalanceCompareResponse(
+        width=result.width,
+        height=result.height,
         avg_rgb_before=result.avg_rgb_before,
-        avg_rgb_after=result.avg_rgb_after,
+        results=[_to_response(item) for item in result.results],
+        contact_sheet_base64=result.contact_sheet_base64,
+        contact_sheet_width=result.contact_sheet_size[0] if result.contact_sheet_size else None,
+        contact_sheet_height=result.contact_sheet_size[1] if result.contact_sheet_size else None,
+    )
+
+
+@router.post("/images", response_model=ImageUploadResponse)
+async def upload_image(
+    file: UploadFile = File(...),
+    service: WhiteBalanceService = Depends(),
+) -> ImageUploadResponse:
+    """Decode an image once and keep it for repeated processing.
+
+    The returned ``image_id`` can be passed to ``/images/{image_id}/apply``
+    and ``/images/{image_id}/estimate``, which skip upload, decode and color
+    conversion. Images expire after a period without use.
+
+    Args:
+        file: Image file to keep.
+        service: White balance service instance.
+
+    Returns:
+        Image ID and basic information about the stored image.
+    """
+    stored = await service.upload(file)
+    return ImageUploadResponse(
+        image_id=stored.image_id,
+        width=stored.width,
+        height=stored.height,
+        avg_rgb_before=stored.avg_rgb_before,
+        expires_in_seconds=get_image_store().ttl_seconds,
     )
 
+
+@router.post(
+    "/images/{image_id}/apply",
+    response_model=WhiteBalanceResponse,
+    responses={
+        200: {
+            "content": {media_type: {} for media_type in MEDIA_TYPES.values()},
+            "description": "JSON with a base64 image, or the encoded image itself "
+            "when requested via the Accept header",
+        }
+    },
+)
+async def apply_white_balance_stored(
+    response: Response,
+    image_id: str = Path(..., description="Image ID returned by /images"),
+    request: WhiteBalanceRequest = Depends(get_white_balance_request),
+    image_format: Optional[OutputFormat] = Depends(get_accepted_image_format),
+    service: WhiteBalanceService = Depends(),
+) -> Union[WhiteBalanceResponse, StreamingResponse]:
+    """Apply white balance algorithm to a previously uploaded image.
+
+    Accepts the same parameters and Accept header negotiation as ``/apply``.
+
+    Args:
+        response: Response used to set the cache status header.
+        image_id: Image ID returned by ``/images``.
+        request: White balance request parameters.
+        image_format: Output format negotiated from the Accept header, if binary.
+        service: White balance service instance.
+
+    Returns:
+        White balance response with processed image, or the image itself.
+    """
+    if image_format is not None:
+        request.output_format = image_format
+
+    # Process stored image
+    result = await service.apply_stored(image_id, request)
+
+    return _image_response(result, image_format, response)
+
+
+@router.post("/images/{image_id}/estimate", response_model=WhiteBalanceEstimateResponse)
+async def estimate_white_balance_stored(
+    response: Response,
+    image_id: str = Path(..., description="Image ID returned by /images"),
+    request: WhiteBalanceRequest = Depends(get_estimation_request),
+    service: WhiteBalanceService = Depends(),
+) -> WhiteBalanceEstimateResponse:
+    """Estimate white balance gains for a previously uploaded image.
+
+    Args:
+        response: Response used to set the cache status and timing headers.
+        image_id: Image ID returned by ``/images``.
+        request: White balance request parameters.
+        service: White balance service instance.
+
+    Returns:
+        Estimated per-channel gains and illuminant color.
+    """
+    # Estimate gains on stored image
+    result = await service.estimate_stored(image_id, request)
+
+    return _estimate_response(result, response)
+
+
+@router.delete("/images/{image_id}", status_code=204)
+async def delete_image(
+    image_id: str = Path(..., description="Image ID returned by /images"),
+) -> Response:
+    """Release a previously uploaded image.
+
+    Args:
+        image_id: Image ID returned by ``/images``.
+
+    Returns:
+        Empty response.
+    """
+    get_image_store().delete(image_id)
+    return Response(status_code=204)
+
+
+@router.get("/cache", response_model=CacheStatsResponse)
+async def get_cache_stats() -> CacheStatsResponse:
+    """Report result cache usage and hit/miss counters.
+
+    Returns:
+        Result cache statistics.
+    """
+    cache = get_result_cache()
+    return CacheStatsResponse(
+        enabled=cache.enabled,
+        entries=len(cache),
+        size_bytes=cache.size_bytes,
+        max_bytes=cache.max_bytes,
+        hits=cache.hits,
+        misses=cache.misses,
+        evictions=cache.evictions,
+    )
+
+
+@router.get("/algorithms", response_model=list[AlgorithmInfoResponse])
+async def list_algorithms(
+    service: WhiteBalanceService = Depends(),
+) -> list[AlgorithmInfoResponse]:
+    """List the available algorithms with their parameters and capabilities.
+
+    Args:
+        service: White balance service instance.
+
+    Returns:
+        One entry per algorithm, including which request parameters it uses,
+        whether it can run on batches and band by band, and its rough cost.
+    """
+    return [
+        AlgorithmInfoResponse(
+            name=spec.name,
+            parameters=list(spec.parameters),
+            batched=spec.batched,
+            tiled=spec.tiled,
+            cost_ns_per_pixel=spec.cost_ns_per_pixel,
+        )
+        for spec in service.list_algorithms()
+    ]
@@ -1,5 +1,7 @@
 """Application configuration."""
 
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -11,6 +13,70 @@ class Settings(BaseSettings):
     api_v1_prefix: str = "/api/v1"
     cors_origins: list[str] = ["http://localhost:3000", "http://localhost:3001"]
 
+    # Upload limits per image; larger uploads are rejected with 413 (None disables)
+    max_upload_bytes: Optional[int] = 256 * 1024 * 1024
+    max_image_megapixels: Optional[float] = 200.0
+
+    # Batch processing; same-size images are decoded and stacked in chunks of at most
+    # batch_max_pixels pixels, which bounds the memory of one batch job
+    max_batch_size: int = 256
+    batch_max_pixels: int = 16_777_216
+
+    # Frame sequences: gains are re-estimated every N frames or when the channel means
+    # change by more than the threshold, and smoothed with a moving average
+    max_sequence_frames: int = 1000
+    sequence_reestimate_interval: int = 10
+    sequence_smoothing: float = 0.3
+    sequence_scene_change_threshold: float = 0.1
+
+    # Illuminant estimation on a downscaled proxy (None estimates at full resolution)
+    estimation_max_edge: Optional[int] = None
+    # Shrink the proxy further so estimation fits this budget at the algorithm's
+    # registered cost per pixel (None disables)
+    estimation_budget_ms: Optional[float] = None
+
+    # Precision of full-resolution tensors that are downscaled to an estimation proxy,
+    # including stored images larger than estimation_max_edge; estimation runs in float32
+    processing_dtype: Literal["float32", "float16", "bfloat16"] = "float32"
+
+    # Band-wise low-memory processing for very large images (None disables)
+    tiled_min_megapixels: Optional[float] = 64.0
+    tile_max_pixels: int = 4_194_304
+
+    # Output encoding defaults
+    output_quality: int = 90
+    png_compress_level: int = 6
+    # WebP encoder effort (0-6); Pillow's default of 4, as 6 is much slower for little gain
+    webp_method: int = 4
+
+    # Worker pool for CPU-bound processing ("thread" or "process")
+    worker_pool_kind: Literal["thread", "process"] = "thread"
+    worker_count: Optional[int] = None
+    worker_queue_size: int = 16
+    torch_threads: Optional[int] = None
+    busy_retry_after_seconds: int = 1
+
+    # Result cache keyed on upload content and parameters (0 disables)
+    result_cache_max_bytes: int = 256 * 1024 * 1024
+    result_cache_dir: Optional[str] = None
+    result_cache_disk_max_bytes: int = 1024 * 1024 * 1024
+
+    # Algorithm comparison
+    max_compare_variants: int = 16
+    contact_sheet_cell_edge: int = 512
+
+    # Decoded uploads kept for repeated processing by image ID
+    image_store_max_bytes: int = 1024 * 1024 * 1024
+    image_store_ttl_seconds: float = 900.0
+
+    # Prometheus metrics at /metrics and per-stage Server-Timing response headers
+    metrics_enabled: bool = True
+
+    # Opt-in per-request profiling ("torch" operators or "cprofile" functions)
+    profiling_enabled: bool = False
+    profiler: Literal["torch", "cprofile"] = "torch"
+    profile_dir: Optional[str] = None
+
     class Config:
         """Pydantic config."""
 
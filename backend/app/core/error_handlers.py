@@ -3,9 +3,13 @@
 from fastapi import Request, status
 from fastapi.responses import JSONResponse
 
+from app.core.config import settings
 from app.core.errors import (
     ColorSpaceConversionError,
+    ImageNotFoundError,
     InvalidImageError,
+    PayloadTooLargeError,
+    ServiceBusyError,
     UnsupportedAlgorithmError,
     WhiteBalanceError,
 )
@@ -82,3 +86,55 @@ async def color_space_conversion_error_handler(
         content={"detail": str(exc), "type": "ColorSpaceConversionError"},
     )
 
+
+async def service_busy_error_handler(request: Request, exc: ServiceBusyError) -> JSONResponse:
+    """Handle service busy errors.
+
+    Args:
+        request: FastAPI request.
+        exc: Exception instance.
+
+    Returns:
+        JSON error response asking the client to retry later.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc), "type": "ServiceBusyError"},
+        headers={"Retry-After": str(settings.busy_retry_after_seconds)},
+    )
+
+
+async def image_not_found_error_handler(
+    request: Request, exc: ImageNotFoundError
+) -> JSONResponse:
+    """Handle unknown or expired image IDs.
+
+    Args:
+        request: FastAPI request.
+        exc: Exception instance.
+
+    Returns:
+        JSON error response.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_404_NOT_FOUND,
+        content={"detail": str(exc), "type": "ImageNotFoundError"},
+    )
+
+
+async def payload_too_large_error_handler(
+    request: Request, exc: PayloadTooLargeError
+) -> JSONResponse:
+    """Handle uploads over the size limits.
+
+    Args:
+        request: FastAPI request.
+        exc: Exception instance.
+
+    Returns:
+        JSON error response.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        content={"detail": str(exc), "type": "PayloadTooLargeError"},
+    )
@@ -24,3 +24,20 @@ class ColorSpaceConversionError(WhiteBalanceError):
 
     pass
 
+
+class ServiceBusyError(WhiteBalanceError):
+    """Raised when the processing queue is full."""
+
+    pass
+
+
+class ImageNotFoundError(WhiteBalanceError):
+    """Raised when a stored image does not exist or has expired."""
+
+    pass
+
+
+class PayloadTooLargeError(WhiteBalanceError):
+    """Raised when an upload exceeds the configured byte or pixel limits."""
+
+    pass
@@ -0,0 +1,253 @@
+"""Processing metrics in the Prometheus text exposition format.
+
+Histograms are observed in the API process as requests complete. Values
+owned by other components, such as result cache counters or the worker
+queue depth, are registered as callback metrics and read when ``/metrics``
+is scraped.
+
+Processing stages are timed with :func:`stage` inside a
+:func:`collect_stage_times` block. Collection is bound to the current
+context, so a worker job records only its own stages, and stage timers
+outside a collection block cost next to nothing. Nested blocks also add
+their stages to the enclosing block. Timed stages also show up
+as labeled ranges when the job runs under ``torch.profiler``.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional, TypeVar, Union
+
+import torch
+
+# Stage durations of the running job in milliseconds, or None if not collected
+_stage_times: ContextVar[Optional[dict[str, float]]] = ContextVar("stage_times", default=None)
+
+# Bucket upper bounds
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+MEGAPIXEL_BUCKETS = (0.1, 0.5, 1.0, 2.0, 4.0, 8.0, 12.0, 24.0, 48.0, 64.0, 100.0, 200.0)
+BYTE_BUCKETS = tuple(float(1 << shift) for shift in range(14, 31, 2))
+
+
+@contextmanager
+def collect_stage_times() -> Iterator[dict[str, float]]:
+    """Collect the durations of the stages timed in this context.
+
+    Yields:
+        Dictionary filled with the total milliseconds per stage name.
+    """
+    times: dict[str, float] = {}
+    outer = _stage_times.get()
+    token = _stage_times.set(times)
+    try:
+        yield times
+    finally:
+        _stage_times.reset(token)
+        if outer is not None:
+            add_stage_times(outer, times)
+
+
+def add_stage_times(total: dict[str, float], times: dict[str, float]) -> None:
+    """Add stage durations to a running total.
+
+    Args:
+        total: Milliseconds per stage name, updated in place.
+        times: Milliseconds per stage name to add.
+    """
+    for name, millis in times.items():
+        total[name] = total.get(name, 0.0) + millis
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a processing stage, adding to earlier runs of the same stage.
+
+    Args:
+        name: Stage name, for example ``"decode"``.
+    """
+    times = _stage_times.get()
+    if times is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        with torch.profiler.record_function(f"stage:{name}"):
+            yield
+    finally:
+        times[name] = times.get(name, 0.0) + (time.perf_counter() - start) * 1000.0
+
+
+def format_server_timing(times: dict[str, float]) -> str:
+    """Format stage durations as a ``Server-Timing`` header value.
+
+    Args:
+        times: Milliseconds per stage name.
+
+    Returns:
+        Comma-separated ``name;dur=milliseconds`` entries.
+    """
+    return ", ".join(f"{name};dur={millis:.1f}" for name, millis in times.items())
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    """Format a label set, for example ``{stage="decode"}``."""
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Histogram:
+    """Thread-safe histogram with optional labels."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: tuple[float, ...],
+        labelnames: tuple[str, ...] = (),
+    ) -> None:
+        """Initialize an empty histogram.
+
+        Args:
+            name: Metric name.
+            documentation: Help text.
+            buckets: Increasing bucket upper bounds; ``+Inf`` is added.
+            labelnames: Names of the labels every observation carries.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets) + (math.inf,)
+        self.labelnames = labelnames
+        # Per label values: bucket counts (not cumulative), sum and count
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record an observation.
+
+        Args:
+            value: Observed value.
+            **labels: Value of each label in ``labelnames``.
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            counts, totals = self._series.setdefault(key, ([0] * len(self.buckets), [0.0, 0]))
+            counts[index] += 1
+            totals[0] += value
+            totals[1] += 1
+
+    def render(self) -> list[str]:
+        """Render the histogram in the text exposition format."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [
+                (key, list(counts), list(totals)) for key, (counts, totals) in self._series.items()
+            ]
+        for key, counts, (total, count) in sorted(series):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels({**labels, "le": _format_value(bound)})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {int(count)}")
+        return lines
+
+
+class CallbackMetric:
+    """Unlabeled gauge or counter whose value is read when metrics are rendered."""
+
+    def __init__(
+        self, name: str, documentation: str, kind: str, func: Callable[[], float]
+    ) -> None:
+        """Initialize a callback metric.
+
+        Args:
+            name: Metric name.
+            documentation: Help text.
+            kind: ``"gauge"`` or ``"counter"``.
+            func: Returns the current value.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.func = func
+
+    def render(self) -> list[str]:
+        """Render the metric in the text exposition format."""
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            f"{self.name} {_format_value(self.func())}",
+        ]
+
+
+Metric = TypeVar("Metric", Histogram, CallbackMetric)
+
+_metrics: dict[str, Union[Histogram, CallbackMetric]] = {}
+
+
+def register(metric: Metric) -> Metric:
+    """Register a metric for rendering, replacing any previous one with the same name.
+
+    Args:
+        metric: Metric to expose.
+
+    Returns:
+        ``metric`` itself.
+    """
+    _metrics[metric.name] = metric
+    return metric
+
+
+def render_metrics() -> str:
+    """Render all registered metrics in the text exposition format.
+
+    Returns:
+        Exposition text ending with a newline.
+    """
+    lines = []
+    for metric in list(_metrics.values()):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = register(
+    Histogram(
+        "white_balance_stage_seconds",
+        "Time spent in each processing stage per image; stages shared by the images of "
+        "one batch, comparison or sequence upload are split evenly between them.",
+        SECONDS_BUCKETS,
+        ("operation", "stage", "algorithm", "processing_space"),
+    )
+)
+IMAGE_MEGAPIXELS = register(
+    Histogram(
+        "white_balance_image_megapixels",
+        "Size of processed images in megapixels.",
+        MEGAPIXEL_BUCKETS,
+    )
+)
+REQUEST_BYTES = register(
+    Histogram("white_balance_request_bytes", "Size of uploaded images in bytes.", BYTE_BUCKETS)
+)
+RESPONSE_BYTES = register(
+    Histogram(
+        "white_balance_response_bytes", "Size of encoded output images in bytes.", BYTE_BUCKETS
+    )
+)
@@ -1,8 +1,19 @@
 """Color space conversion functions."""
 
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
 import torch
 
 from app.core.errors import ColorSpaceConversionError
+from app.engine.utils import (
+    apply_channel_luts,
+    apply_gains,
+    array_to_tensor,
+    row_strips,
+    tensor_to_array,
+)
 
 
 def srgb_to_linear(tensor: torch.Tensor) -> torch.Tensor:
@@ -12,7 +23,7 @@ def srgb_to_linear(tensor: torch.Tensor) -> torch.Tensor:
     to linear RGB (values proportional to light intensity).
 
     Args:
-        tensor: Tensor of shape (C, H, W) with values in [0, 1] in sRGB.
+        tensor: Tensor of shape (C, H, W) or (N, C, H, W) with values in [0, 1] in sRGB.
 
     Returns:
         Tensor of same shape with values in [0, 1] in linear RGB.
@@ -38,7 +49,7 @@ def linear_to_srgb(tensor: torch.Tensor) -> torch.Tensor:
     Applies gamma correction to convert from linear RGB to gamma-corrected sRGB.
 
     Args:
-        tensor: Tensor of shape (C, H, W) with values in [0, 1] in linear RGB.
+        tensor: Tensor of shape (C, H, W) or (N, C, H, W) with values in [0, 1] in linear RGB.
 
     Returns:
         Tensor of same shape with values in [0, 1] in sRGB.
@@ -58,3 +69,164 @@ def linear_to_srgb(tensor: torch.Tensor) -> torch.Tensor:
     except Exception as e:
         raise ColorSpaceConversionError(f"Failed to convert linear to sRGB: {e}") from e
 
+
+# Number of entries of the linear -> sRGB output table. At 4096 entries one
+# step is below one 8-bit output level everywhere on the sRGB curve.
+LINEAR_TO_SRGB_LUT_SIZE = 4096
+
+
+@lru_cache(maxsize=None)
+def srgb_to_linear_lut() -> np.ndarray:
+    """Build the lookup table from 8-bit sRGB codes to linear RGB.
+
+    Returns:
+        Read-only float32 array of 256 linear values in [0, 1].
+    """
+    codes = torch.arange(256, dtype=torch.float64) / 255.0
+    lut = srgb_to_linear(codes).to(torch.float32).numpy()
+    lut.setflags(write=False)
+    return lut
+
+
+@lru_cache(maxsize=None)
+def linear_to_srgb_lut(size: int = LINEAR_TO_SRGB_LUT_SIZE) -> np.ndarray:
+    """Build the lookup table from quantized linear RGB to 8-bit sRGB codes.
+
+    Args:
+        size: Number of uniformly spaced linear input levels over [0, 1].
+
+    Returns:
+        Read-only uint8 array of ``size`` sRGB codes.
+    """
+    levels = torch.linspace(0.0, 1.0, size, dtype=torch.float64)
+    lut = torch.round(linear_to_srgb(levels) * 255.0).to(torch.uint8).numpy()
+    lut.setflags(write=False)
+    return lut
+
+
+def srgb_uint8_to_linear(
+    array: np.ndarray, out: Optional[torch.Tensor] = None, dtype: torch.dtype = torch.float32
+) -> torch.Tensor:
+    """Convert 8-bit sRGB pixels straight to linear RGB with a lookup table.
+
+    Only 256 input codes exist, so a table lookup replaces the per-pixel
+    ``pow`` and both ``where`` branches of :func:`srgb_to_linear` and skips
+    the intermediate [0, 1] float image. The lookup also reorders the
+    pixels, writing strip by strip into one contiguous (C, H, W) tensor.
+    Table values are float32 and rounded once into the output dtype.
+
+    Args:
+        array: Array of shape (H, W, C) with dtype uint8 in sRGB.
+        out: Optional contiguous float tensor of shape (C, H, W) to write into.
+        dtype: Float dtype of the result when ``out`` is not given.
+
+    Returns:
+        Contiguous tensor of shape (C, H, W) with values in [0, 1] in linear RGB.
+    """
+    try:
+        height, width, channels = array.shape
+        if out is None:
+            out = torch.empty((channels, height, width), dtype=dtype)
+        lut = srgb_to_linear_lut()
+        # Index with the uint8 codes directly; np.take would first widen them to int64
+        for top, bottom in row_strips(height, width):
+            values = lut[array[top:bottom].transpose(2, 0, 1)]
+            out[:, top:bottom].copy_(torch.from_numpy(values))
+        return out
+    except Exception as e:
+        raise ColorSpaceConversionError(f"Failed to convert sRGB to linear: {e}") from e
+
+
+def linear_to_srgb_uint8(
+    tensor: torch.Tensor,
+    lut_size: int = LINEAR_TO_SRGB_LUT_SIZE,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Convert linear RGB to 8-bit sRGB pixels with a lookup table.
+
+    Fuses clamping, gamma encoding, scaling and the uint8 cast into a
+    quantization step and one table lookup. Results are rounded to the
+    nearest code and differ from :func:`linear_to_srgb` by at most one level.
+    Rows are processed in strips, so only the output is allocated at full size.
+
+    Args:
+        tensor: Tensor of shape (C, H, W) in linear RGB.
+        lut_size: Number of quantized linear levels.
+        out: Optional writable array of shape (H, W, C) with dtype uint8 to write into.
+
+    Returns:
+        Array of shape (H, W, C) with dtype uint8 in sRGB.
+    """
+    try:
+        channels, height, width = tensor.shape
+        if out is None:
+            out = np.empty((height, width, channels), dtype=np.uint8)
+        lut = linear_to_srgb_lut(lut_size)
+
+        for top, bottom in row_strips(height, width):
+            # Copy the strip into float32 (H, W, C) order, quantize in place, then look
+            # codes up into the output
+            indices = tensor[:, top:bottom].permute(1, 2, 0).to(
+                torch.float32, memory_format=torch.contiguous_format, copy=True
+            )
+            indices.clamp_(0.0, 1.0).mul_(lut_size - 1).add_(0.5)
+            np.take(lut, indices.to(torch.int16).numpy(), out=out[top:bottom], mode="clip")
+        return out
+    except Exception as e:
+        raise ColorSpaceConversionError(f"Failed to convert linear to sRGB: {e}") from e
+
+
+def finish_luts(
+    gains: torch.Tensor, linearize: bool = True, dtype: torch.dtype = torch.float32
+) -> np.ndarray:
+    """Tabulate gain application and output encoding for every 8-bit input code.
+
+    Converting 8-bit sRGB to the processing space, applying per-channel
+    gains, clamping and encoding back to 8-bit sRGB maps each channel's
+    input code to an output code on its own. Running the regular conversions
+    once over all 256 codes therefore gives per-channel tables that
+    reproduce the full-image float pipeline exactly.
+
+    Args:
+        gains: Tensor of shape (C,) with per-channel gains.
+        linearize: Whether gains apply in linear RGB rather than sRGB.
+        dtype: Float dtype the full-image pipeline would process in.
+
+    Returns:
+        Array of shape (C, 256) with dtype uint8 mapping input to output codes.
+    """
+    channels = gains.shape[-1]
+    codes = np.repeat(np.arange(256, dtype=np.uint8)[None, :, None], channels, axis=2)
+    if linearize:
+        balanced = apply_gains(srgb_uint8_to_linear(codes, dtype=dtype), gains)
+        output = linear_to_srgb_uint8(balanced)
+    else:
+        output = tensor_to_array(apply_gains(array_to_tensor(codes, dtype=dtype), gains))
+    return np.ascontiguousarray(output[0].T)
+
+
+def finish_uint8(
+    array: np.ndarray,
+    gains: torch.Tensor,
+    linearize: bool = True,
+    dtype: torch.dtype = torch.float32,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Apply gains to 8-bit sRGB pixels and encode the result, in one pass.
+
+    Equivalent to converting to a float tensor, applying gains and
+    converting back with :func:`linear_to_srgb_uint8` (or
+    :func:`tensor_to_array` in sRGB), but with one table lookup per pixel
+    and no float image.
+
+    Args:
+        array: Array of shape (H, W, C) with dtype uint8 in sRGB.
+        gains: Tensor of shape (C,) with per-channel gains.
+        linearize: Whether gains apply in linear RGB rather than sRGB.
+        dtype: Float dtype the full-image pipeline would process in.
+        out: Optional writable array of shape (H, W, C) with dtype uint8 to write into.
+
+    Returns:
+        Array of shape (H, W, C) with dtype uint8 in sRGB.
+    """
+    return apply_channel_luts(array, finish_luts(gains, linearize, dtype), out)
@@ -0,0 +1,217 @@
+"""Registry of white balance estimators and their capabilities.
+
+Each algorithm is described by an :class:`AlgorithmSpec`: how to estimate
+gains from shared image statistics, which request parameters it takes,
+whether it can run on stacked batches and band by band, and a rough cost.
+The service looks algorithms up here instead of branching on their names,
+so adding an estimator only needs a ``WhiteBalanceAlgorithm`` member and a
+:func:`register_algorithm` call.
+"""
+
+import math
+from typing import Callable, NamedTuple, Optional
+
+import torch
+
+from app.engine import tiling
+from app.engine.statistics import ImageStatistics
+from app.engine.white_balance_grey_edge import estimate_grey_edge
+from app.engine.white_balance_grey_world import estimate_grey_world
+from app.engine.white_balance_minkowski import MinkowskiConfig, estimate_minkowski
+from app.engine.white_balance_white_patch import estimate_white_patch
+
+
+class AlgorithmSpec(NamedTuple):
+    """Description of a registered white balance algorithm."""
+
+    # Algorithm name, matching a WhiteBalanceAlgorithm value
+    name: str
+    # Estimates gains of shape (C,) or (N, C) from statistics and parameters
+    estimate: Callable[..., torch.Tensor]
+    # Request fields passed to ``estimate`` and ``accumulator`` as keyword arguments
+    parameters: tuple[str, ...] = ()
+    # Creates a band-wise accumulator, or None if the algorithm needs the whole image
+    accumulator: Optional[Callable[..., tiling.StatisticsAccumulator]] = None
+    # Whether ``estimate`` accepts (N, C, H, W) batches
+    batched: bool = True
+    # Approximate single-threaded estimation time per pixel at default parameters
+    cost_ns_per_pixel: float = 1.0
+
+    @property
+    def tiled(self) -> bool:
+        """Whether large images can be streamed band by band."""
+        return self.accumulator is not None
+
+    def estimate_gains(self, stats: ImageStatistics, **params: float) -> torch.Tensor:
+        """Estimate gains, running image by image if batches are not supported.
+
+        Args:
+            stats: Statistics of a (C, H, W) or (N, C, H, W) tensor in [0, 1].
+            **params: Algorithm parameters.
+
+        Returns:
+            Gains tensor of shape (C,) or (N, C).
+        """
+        if stats.image.dim() == 4 and not self.batched:
+            return torch.stack(
+                [self.estimate(ImageStatistics(image), **params) for image in stats.image]
+            )
+        return self.estimate(stats, **params)
+
+
+_algorithms: dict[str, AlgorithmSpec] = {}
+
+
+def register_algorithm(spec: AlgorithmSpec) -> None:
+    """Register an algorithm, replacing any previous one with the same name.
+
+    Args:
+        spec: Algorithm description.
+    """
+    _algorithms[spec.name] = spec
+
+
+def get_algorithm(name: str) -> AlgorithmSpec:
+    """Look up a registered algorithm.
+
+    Args:
+        name: Algorithm name.
+
+    Returns:
+        Algorithm description.
+
+    Raises:
+        KeyError: If no algorithm with this name is registered.
+    """
+    return _algorithms[name]
+
+
+def list_algorithms() -> list[AlgorithmSpec]:
+    """List registered algorithms in registration order.
+
+    Returns:
+        Algorithm descriptions.
+    """
+    return list(_algorithms.values())
+
+
+def _grey_world(stats: ImageStatistics) -> torch.Tensor:
+    """Estimate grey world gains from shared statistics."""
+    return estimate_grey_world(stats.image, means=stats.channel_means())
+
+
+def _white_patch(stats: ImageStatistics, percentile: float = 99.5) -> torch.Tensor:
+    """Estimate white patch gains from shared statistics."""
+    return estimate_white_patch(stats.image, percentile, intensity=stats.intensity())
+
+
+def _grey_edge(
+    stats: ImageStatistics, sigma: float = 1.0, p: float = 6.0, percentile: float = 95.0
+) -> torch.Tensor:
+    """Estimate grey edge gains from shared statistics."""
+    return estimate_grey_edge(
+        stats.image,
+        sigma,
+        p,
+        percentile,
+        smoothed=stats.smoothed(sigma),
+        gradient_magnitude=stats.gradient_magnitude(sigma, p),
+    )
+
+
+def _minkowski(stats: ImageStatistics, order: int, p: float, sigma: float) -> torch.Tensor:
+    """Estimate Minkowski-family gains from shared statistics."""
+    return estimate_minkowski(
+        stats.image, order, p, sigma, magnitude=stats.derivative_magnitude(sigma, order)
+    )
+
+
+def _shades_of_grey(stats: ImageStatistics, p: float = 6.0, sigma: float = 0.0) -> torch.Tensor:
+    """Estimate shades of grey gains: the p-norm of pixel values."""
+    return _minkowski(stats, 0, p, sigma)
+
+
+def _max_rgb(stats: ImageStatistics, sigma: float = 0.0) -> torch.Tensor:
+    """Estimate max-RGB gains: the per-channel maximum."""
+    return _minkowski(stats, 0, math.inf, sigma)
+
+
+def _general_grey_edge(
+    stats: ImageStatistics, n: int = 1, p: float = 6.0, sigma: float = 1.0
+) -> torch.Tensor:
+    """Estimate general grey edge gains: the p-norm of n-th order derivatives."""
+    return _minkowski(stats, n, p, sigma)
+
+
+def _shades_of_grey_accumulator(
+    p: float = 6.0, sigma: float = 0.0
+) -> tiling.MinkowskiMomentAccumulator:
+    """Create a band-wise shades of grey accumulator."""
+    return tiling.MinkowskiMomentAccumulator([MinkowskiConfig(0, p, sigma)])
+
+
+def _max_rgb_accumulator(sigma: float = 0.0) -> tiling.MinkowskiMomentAccumulator:
+    """Create a band-wise max-RGB accumulator."""
+    return tiling.MinkowskiMomentAccumulator([MinkowskiConfig(0, math.inf, sigma)])
+
+
+def _general_grey_edge_accumulator(
+    n: int = 1, p: float = 6.0, sigma: float = 1.0
+) -> tiling.MinkowskiMomentAccumulator:
+    """Create a band-wise general grey edge accumulator."""
+    return tiling.MinkowskiMomentAccumulator([MinkowskiConfig(n, p, sigma)])
+
+
+register_algorithm(
+    AlgorithmSpec(
+        name="grey_world",
+        estimate=_grey_world,
+        accumulator=tiling.GreyWorldAccumulator,
+        cost_ns_per_pixel=1.5,
+    )
+)
+register_algorithm(
+    AlgorithmSpec(
+        name="white_patch",
+        estimate=_white_patch,
+        parameters=("percentile",),
+        accumulator=tiling.WhitePatchAccumulator,
+        cost_ns_per_pixel=40.0,
+    )
+)
+register_algorithm(
+    AlgorithmSpec(
+        name="grey_edge",
+        estimate=_grey_edge,
+        parameters=("sigma", "p", "percentile"),
+        accumulator=tiling.GreyEdgeAccumulator,
+        cost_ns_per_pixel=400.0,
+    )
+)
+register_algorithm(
+    AlgorithmSpec(
+        name="shades_of_grey",
+        estimate=_shades_of_grey,
+        parameters=("p", "sigma"),
+        accumulator=_shades_of_grey_accumulator,
+        cost_ns_per_pixel=25.0,
+    )
+)
+register_algorithm(
+    AlgorithmSpec(
+        name="max_rgb",
+        estimate=_max_rgb,
+        parameters=("sigma",),
+        accumulator=_max_rgb_accumulator,
+        cost_ns_per_pixel=1.5,
+    )
+)
+register_algorithm(
+    AlgorithmSpec(
+        name="general_grey_edge",
+        estimate=_general_grey_edge,
+        parameters=("n", "p", "sigma"),
+        accumulator=_general_grey_edge_accumulator,
+        cost_ns_per_pixel=300.0,
+    )
+)
@@ -0,0 +1,84 @@
+"""Intermediate image statistics shared between white balance estimators.
+
+Several estimators derive the same intermediates from an image: channel
+means, the per-pixel intensity, smoothed copies, Sobel gradients and
+derivative magnitudes.
+``ImageStatistics`` computes each of them on first use and keeps it, so
+running many algorithms or parameter sets on one image only pays for each
+intermediate once. Estimators always work in float32: images processed in
+reduced precision are upcast once here.
+"""
+
+import torch
+
+from app.engine.white_balance_grey_edge import (
+    compute_gradient_magnitude,
+    compute_gradients,
+    gradient_norm,
+    smooth_image,
+)
+from app.engine.white_balance_minkowski import derivative_magnitude
+
+
+class ImageStatistics:
+    """Lazily computed, memoized intermediates of one image tensor."""
+
+    def __init__(self, image: torch.Tensor) -> None:
+        """Initialize statistics for an image.
+
+        Args:
+            image: Float tensor of shape (C, H, W) or (N, C, H, W) with values in [0, 1].
+        """
+        self.image = image.float()
+        self._cache: dict[tuple, object] = {}
+
+    def channel_means(self) -> torch.Tensor:
+        """Per-channel means of shape (C,) or (N, C)."""
+        key = ("channel_means",)
+        if key not in self._cache:
+            self._cache[key] = self.image.mean(dim=(-2, -1))
+        return self._cache[key]
+
+    def intensity(self) -> torch.Tensor:
+        """Per-pixel mean over channels, of shape (H, W) or (N, H, W)."""
+        key = ("intensity",)
+        if key not in self._cache:
+            self._cache[key] = self.image.mean(dim=-3)
+        return self._cache[key]
+
+    def smoothed(self, sigma: float) -> torch.Tensor:
+        """Image smoothed for edge detection with the given sigma."""
+        key = ("smoothed", sigma)
+        if key not in self._cache:
+            self._cache[key] = smooth_image(self.image, sigma)
+        return self._cache[key]
+
+    def gradients(self, sigma: float) -> tuple[torch.Tensor, torch.Tensor]:
+        """Sobel x and y gradients of the smoothed image."""
+        key = ("gradients", sigma)
+        if key not in self._cache:
+            self._cache[key] = compute_gradients(self.smoothed(sigma))
+        return self._cache[key]
+
+    def derivative_magnitude(self, sigma: float, order: int) -> torch.Tensor:
+        """Magnitude of the n-th order derivative of the smoothed image."""
+        key = ("derivative_magnitude", sigma, order)
+        if key not in self._cache:
+            self._cache[key] = derivative_magnitude(self.smoothed(sigma), order)
+        return self._cache[key]
+
+    def gradient_magnitude(self, sigma: float, p: float) -> torch.Tensor:
+        """Minkowski gradient magnitude of the smoothed image.
+
+        The first magnitude per sigma uses the fused, low-memory kernel;
+        gradients are only kept once a second ``p`` needs them.
+        """
+        key = ("gradient_magnitude", sigma, p)
+        if key not in self._cache:
+            seen = ("gradient_sigma", sigma)
+            if seen in self._cache or ("gradients", sigma) in self._cache:
+                self._cache[key] = gradient_norm(*self.gradients(sigma), p)
+            else:
+                self._cache[key] = compute_gradient_magnitude(self.smoothed(sigma), p)
+                self._cache[seen] = True
+        return self._cache[key]
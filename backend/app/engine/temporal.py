@@ -0,0 +1,108 @@
+"""Temporally smoothed white balance gains for frame sequences.
+
+Estimating every frame of a sequence on its own makes the gains flicker
+with noise and small content changes, and repeats the full estimation on
+frames that barely differ. :class:`TemporalGainSmoother` instead estimates
+on the first frame, then again only every ``reestimate_interval`` frames or
+when the channel means of a frame move away from those of the last
+estimated frame by more than ``scene_change_threshold``. The applied gains
+follow the latest estimate with an exponential moving average, except
+across a scene cut (a jump between consecutive frames), where they are
+reset to the new estimate so the old scene's cast does not bleed over.
+"""
+
+from typing import Callable, NamedTuple, Optional
+
+import torch
+
+
+class SequenceStep(NamedTuple):
+    """Gains for one frame of a sequence."""
+
+    # Smoothed gains of shape (C,) to apply to the frame
+    gains: torch.Tensor
+    # Whether gains were estimated on this frame
+    estimated: bool
+    # Whether the frame starts a new scene
+    scene_change: bool
+
+
+def channel_mean_change(means: torch.Tensor, reference: torch.Tensor) -> float:
+    """Measure how far the channel means of a frame moved from a reference.
+
+    Args:
+        means: Tensor of shape (C,) with per-channel means.
+        reference: Tensor of shape (C,) with the reference per-channel means.
+
+    Returns:
+        Sum of absolute changes relative to the sum of the reference means.
+    """
+    return ((means - reference).abs().sum() / reference.sum().clamp(min=1e-6)).item()
+
+
+class TemporalGainSmoother:
+    """Decides when to estimate gains in a sequence and smooths them over time.
+
+    Usage::
+
+        smoother = TemporalGainSmoother(0.3, 10, 0.1)
+        for frame in frames:
+            step = smoother.step(channel_means(frame), lambda: estimate(frame))
+            apply(frame, step.gains)
+    """
+
+    def __init__(
+        self, smoothing: float, reestimate_interval: int, scene_change_threshold: float
+    ) -> None:
+        """Initialize the smoother.
+
+        Args:
+            smoothing: Weight of the latest estimate in the moving average, in
+                (0, 1]; 1 applies every estimate as is.
+            reestimate_interval: Estimate at least every this many frames.
+            scene_change_threshold: Relative change of the channel means
+                (see :func:`channel_mean_change`) that triggers an estimate.
+        """
+        self.smoothing = smoothing
+        self.reestimate_interval = reestimate_interval
+        self.scene_change_threshold = scene_change_threshold
+        self._gains: Optional[torch.Tensor] = None
+        self._target: Optional[torch.Tensor] = None
+        self._previous_means: Optional[torch.Tensor] = None
+        self._estimate_means: Optional[torch.Tensor] = None
+        self._frames_since_estimate = 0
+
+    def step(self, means: torch.Tensor, estimate: Callable[[], torch.Tensor]) -> SequenceStep:
+        """Get the gains for the next frame.
+
+        Args:
+            means: Tensor of shape (C,) with the per-channel means of the frame.
+            estimate: Estimates gains of shape (C,) on the frame; only called
+                when the frame needs an estimate.
+
+        Returns:
+            Gains to apply and whether the frame was estimated or starts a scene.
+        """
+        scene_change = (
+            self._previous_means is not None
+            and channel_mean_change(means, self._previous_means) > self.scene_change_threshold
+        )
+        estimated = (
+            self._target is None
+            or scene_change
+            or self._frames_since_estimate >= self.reestimate_interval
+            or channel_mean_change(means, self._estimate_means) > self.scene_change_threshold
+        )
+        if estimated:
+            self._target = estimate()
+            self._estimate_means = means
+            self._frames_since_estimate = 0
+
+        if self._gains is None or scene_change:
+            self._gains = self._target.clone()
+        else:
+            self._gains = self._gains + self.smoothing * (self._target - self._gains)
+
+        self._previous_means = means
+        self._frames_since_estimate += 1
+        return SequenceStep(self._gains, estimated, scene_change)
@@ -0,0 +1,337 @@
+"""Tiled statistics accumulation for images larger than the memory budget.
+
+Images are processed as horizontal bands that span the full width. Each
+accumulator consumes one band at a time and only keeps small fixed-size
+state (sums or histograms), so memory stays bounded by the band size no
+matter how large the image is. Algorithms that look at a neighbourhood
+declare a ``halo``: the number of extra rows each band must carry above and
+below so results at band seams match whole-image processing.
+"""
+
+import math
+from typing import Iterable, Iterator, NamedTuple, Protocol
+
+import torch
+
+from app.engine.utils import histogram_quantile_bin
+from app.engine.white_balance_grey_edge import (
+    compute_gradient_magnitude,
+    grey_edge_gains,
+    smooth_image,
+    smoothing_radius,
+)
+from app.engine.white_balance_grey_world import grey_world_gains
+from app.engine.white_balance_minkowski import (
+    MinkowskiConfig,
+    derivative_magnitude,
+    minkowski_gains,
+    scaled_moments,
+)
+from app.engine.white_balance_white_patch import white_patch_gains
+
+
+class RowBand(NamedTuple):
+    """A horizontal band of rows, with optional halo rows around it."""
+
+    top: int
+    bottom: int
+    halo_top: int
+    halo_bottom: int
+
+
+def iter_row_bands(
+    height: int, width: int, max_pixels: int, halo: int = 0
+) -> Iterator[RowBand]:
+    """Split an image into full-width row bands of bounded size.
+
+    Args:
+        height: Image height in pixels.
+        width: Image width in pixels.
+        max_pixels: Maximum number of pixels per band, excluding halo rows.
+        halo: Number of context rows to include above and below each band,
+            clipped at the image border.
+
+    Yields:
+        Row bands covering the image from top to bottom.
+    """
+    rows = max(1, max_pixels // max(1, width))
+    for top in range(0, height, rows):
+        bottom = min(height, top + rows)
+        yield RowBand(
+            top=top,
+            bottom=bottom,
+            halo_top=min(halo, top),
+            halo_bottom=min(halo, height - bottom),
+        )
+
+
+def crop_halo(tensor: torch.Tensor, halo_top: int, halo_bottom: int) -> torch.Tensor:
+    """Remove halo rows from a band tensor.
+
+    Args:
+        tensor: Tensor of shape (..., H, W) including halo rows.
+        halo_top: Number of halo rows at the top.
+        halo_bottom: Number of halo rows at the bottom.
+
+    Returns:
+        View of ``tensor`` without the halo rows.
+    """
+    return tensor[..., halo_top : tensor.shape[-2] - halo_bottom, :]
+
+
+class StatisticsAccumulator(Protocol):
+    """Streaming estimator that turns image bands into per-channel gains."""
+
+    halo: int
+
+    def update(self, band: torch.Tensor, halo_top: int = 0, halo_bottom: int = 0) -> None:
+        """Accumulate statistics of one band of shape (C, H, W)."""
+        ...
+
+    def gains(self) -> torch.Tensor:
+        """Return per-channel gains of shape (C,) for everything seen so far."""
+        ...
+
+
+class GreyWorldAccumulator:
+    """Streaming grey world statistics: per-channel sums."""
+
+    halo = 0
+
+    def __init__(self) -> None:
+        """Initialize empty grey world statistics."""
+        self.sums = torch.zeros(3, dtype=torch.float64)
+        self.count = 0
+
+    def update(self, band: torch.Tensor, halo_top: int = 0, halo_bottom: int = 0) -> None:
+        """Accumulate per-channel sums of one band.
+
+        Args:
+            band: Tensor of shape (C, H, W) in linear RGB.
+            halo_top: Number of halo rows at the top.
+            halo_bottom: Number of halo rows at the bottom.
+        """
+        band = crop_halo(band, halo_top, halo_bottom)
+        self.sums += band.sum(dim=(-2, -1), dtype=torch.float64)
+        self.count += band.shape[-2] * band.shape[-1]
+
+    def gains(self) -> torch.Tensor:
+        """Return grey world gains for the accumulated image.
+
+        Returns:
+            Tensor of shape (C,) with per-channel gains.
+        """
+        return grey_world_gains((self.sums / max(1, self.count)).float())
+
+
+class WhitePatchAccumulator:
+    """Streaming white patch statistics.
+
+    Keeps a fixed-bin histogram of pixel intensity and, per bin, the maximum
+    value of each channel. The percentile threshold is resolved to bin
+    precision, so all pixels in the bin containing the threshold count as
+    bright.
+    """
+
+    halo = 0
+
+    def __init__(self, percentile: float = 99.5, bins: int = 4096) -> None:
+        """Initialize empty white patch statistics.
+
+        Args:
+            percentile: Percentile to use for white patch detection.
+            bins: Number of intensity histogram bins over [0, 1].
+        """
+        self.percentile = percentile
+        self.bins = bins
+        self.counts = torch.zeros(bins, dtype=torch.int64)
+        self.channel_max = torch.zeros(bins, 3)
+
+    def update(self, band: torch.Tensor, halo_top: int = 0, halo_bottom: int = 0) -> None:
+        """Accumulate the intensity histogram of one band.
+
+        Args:
+            band: Tensor of shape (C, H, W) in linear RGB.
+            halo_top: Number of halo rows at the top.
+            halo_bottom: Number of halo rows at the bottom.
+        """
+        band = crop_halo(band, halo_top, halo_bottom)
+        intensity = band.mean(dim=0).flatten()
+        indices = (intensity * self.bins).long().clamp_(0, self.bins - 1)
+        self.counts += torch.bincount(indices, minlength=self.bins)
+
+        values = band.flatten(1).float()
+        for c in range(3):
+            self.channel_max[:, c].scatter_reduce_(0, indices, values[c], reduce="amax")
+
+    def gains(self) -> torch.Tensor:
+        """Return white patch gains for the accumulated image.
+
+        Returns:
+            Tensor of shape (C,) with per-channel gains.
+        """
+        start = histogram_quantile_bin(self.counts, self.percentile / 100.0)
+        return white_patch_gains(self.channel_max[start:].amax(dim=0))
+
+
+class GreyEdgeAccumulator:
+    """Streaming grey edge statistics.
+
+    Keeps a per-channel histogram of gradient magnitude together with the sum
+    of pixel values falling into each bin, which is enough to compute the
+    mean color of the pixels above any magnitude percentile. The halo covers
+    the smoothing radius plus the one row the Sobel operator looks at.
+    """
+
+    def __init__(
+        self, sigma: float = 1.0, p: float = 6.0, percentile: float = 95.0, bins: int = 16384
+    ) -> None:
+        """Initialize empty grey edge statistics.
+
+        Args:
+            sigma: Standard deviation for Gaussian smoothing.
+            p: Minkowski norm parameter for edge detection.
+            percentile: Gradient magnitude percentile selecting edge pixels.
+            bins: Number of gradient magnitude histogram bins.
+        """
+        self.sigma = sigma
+        self.p = p
+        self.percentile = percentile
+        self.bins = bins
+        self.halo = smoothing_radius(sigma) + 1
+        # Smoothing keeps data in [0, 1], where Sobel responses are bounded by 4
+        # per direction
+        self.max_magnitude = 4.0 * 2.0 ** (1.0 / p)
+        self.counts = torch.zeros(3, bins, dtype=torch.int64)
+        self.sums = torch.zeros(3, bins, dtype=torch.float64)
+
+    def update(self, band: torch.Tensor, halo_top: int = 0, halo_bottom: int = 0) -> None:
+        """Accumulate the gradient magnitude histogram of one band.
+
+        Args:
+            band: Tensor of shape (C, H, W) in linear RGB, including halo rows.
+            halo_top: Number of halo rows at the top.
+            halo_bottom: Number of halo rows at the bottom.
+        """
+        smoothed = smooth_image(band, self.sigma)
+        magnitude = crop_halo(
+            compute_gradient_magnitude(smoothed, self.p), halo_top, halo_bottom
+        )
+        band = crop_halo(smoothed, halo_top, halo_bottom)
+
+        indices = (magnitude * (self.bins / self.max_magnitude)).long().clamp_(0, self.bins - 1)
+        for c in range(3):
+            channel_indices = indices[c].flatten()
+            self.counts[c] += torch.bincount(channel_indices, minlength=self.bins)
+            self.sums[c] += torch.bincount(
+                channel_indices, weights=band[c].flatten().double(), minlength=self.bins
+            )
+
+    def gains(self) -> torch.Tensor:
+        """Return grey edge gains for the accumulated image.
+
+        Returns:
+            Tensor of shape (C,) with per-channel gains.
+        """
+        start = histogram_quantile_bin(self.counts.sum(dim=0), self.percentile / 100.0)
+        edge_counts = self.counts[:, start:].sum(dim=1)
+        edge_sums = self.sums[:, start:].sum(dim=1)
+        edge_means = torch.where(
+            edge_counts > 0,
+            edge_sums / edge_counts.clamp_min(1),
+            # Fallback to overall mean if no edges found
+            self.sums.sum(dim=1) / self.counts.sum(dim=1).clamp_min(1),
+        )
+        return grey_edge_gains(edge_means.float())
+
+
+class MinkowskiMomentAccumulator:
+    """Streaming Minkowski-family statistics for many parameter sets at once.
+
+    For every (order, p, sigma) configuration, keeps the per-channel maximum
+    and the sum of p-th powers relative to it, rescaling the sum whenever a
+    band raises the maximum. Each band is smoothed once per sigma and
+    differentiated once per (order, sigma), so adding norms ``p`` is almost
+    free.
+    """
+
+    def __init__(self, configs: Iterable[MinkowskiConfig]) -> None:
+        """Initialize empty moments.
+
+        Args:
+            configs: Parameter sets to estimate, in the order of the results.
+        """
+        self.configs = [MinkowskiConfig(*config) for config in configs]
+        self.halo = max(config.halo for config in self.configs)
+        self.peaks = torch.zeros(len(self.configs), 3, dtype=torch.float64)
+        self.moments = torch.zeros(len(self.configs), 3, dtype=torch.float64)
+        self.count = 0
+
+    def update(self, band: torch.Tensor, halo_top: int = 0, halo_bottom: int = 0) -> None:
+        """Accumulate the moments of one band.
+
+        Args:
+            band: Tensor of shape (C, H, W) in linear RGB, including halo rows.
+            halo_top: Number of halo rows at the top.
+            halo_bottom: Number of halo rows at the bottom.
+        """
+        smoothed: dict[float, torch.Tensor] = {}
+        magnitudes: dict[tuple[int, float], torch.Tensor] = {}
+        for index, (order, p, sigma) in enumerate(self.configs):
+            if (order, sigma) not in magnitudes:
+                if sigma not in smoothed:
+                    smoothed[sigma] = smooth_image(band, sigma)
+                magnitudes[(order, sigma)] = crop_halo(
+                    derivative_magnitude(smoothed[sigma], order), halo_top, halo_bottom
+                )
+            peak, moments = scaled_moments(magnitudes[(order, sigma)], p)
+            self._merge(index, peak.double(), moments.double(), p)
+
+        self.count += (band.shape[-2] - halo_top - halo_bottom) * band.shape[-1]
+
+    def _merge(self, index: int, peak: torch.Tensor, moments: torch.Tensor, p: float) -> None:
+        """Merge band moments into the running moments of one configuration.
+
+        Args:
+            index: Configuration index.
+            peak: Per-channel band maximum.
+            moments: Per-channel band sum of ``(values / peak) ** p``.
+            p: Minkowski norm parameter.
+        """
+        old_peak = self.peaks[index]
+        new_peak = torch.maximum(old_peak, peak)
+        if not math.isinf(p):
+            scale = torch.where(new_peak > 0, new_peak, torch.ones_like(new_peak))
+            self.moments[index] = (
+                self.moments[index] * (old_peak / scale) ** p + moments * (peak / scale) ** p
+            )
+        self.peaks[index] = new_peak
+
+    def norms(self) -> torch.Tensor:
+        """Return the Minkowski norms of everything seen so far.
+
+        Returns:
+            Tensor of shape (K, C), one row per configuration.
+        """
+        norms = self.peaks.clone()
+        for index, config in enumerate(self.configs):
+            if not math.isinf(config.p):
+                mean = self.moments[index] / max(1, self.count)
+                norms[index] *= mean ** (1.0 / config.p)
+        return norms.float()
+
+    def all_gains(self) -> torch.Tensor:
+        """Return gains for every configuration.
+
+        Returns:
+            Tensor of shape (K, C) with per-channel gains.
+        """
+        return minkowski_gains(self.norms())
+
+    def gains(self) -> torch.Tensor:
+        """Return gains for the first configuration.
+
+        Returns:
+            Tensor of shape (C,) with per-channel gains.
+        """
+        return self.all_gains()[0]
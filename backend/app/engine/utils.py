@@ -1,7 +1,171 @@
 """Utility functions for tensor operations."""
 
+import math
+from typing import Iterator, Optional
+
 import torch
 
+# Pixels per strip in the fused tensor -> uint8 conversions; bounds their float
+# temporaries to a few MiB whatever the image size.
+CONVERSION_CHUNK_PIXELS = 1 << 18
+
+
+def row_strips(
+    height: int, width: int, max_pixels: int = CONVERSION_CHUNK_PIXELS
+) -> Iterator[tuple[int, int]]:
+    """Split image rows into strips of at most ``max_pixels`` pixels.
+
+    Args:
+        height: Image height.
+        width: Image width.
+        max_pixels: Pixel budget per strip; a strip holds at least one row.
+
+    Yields:
+        Tuples of (top, bottom) row indices.
+    """
+    rows = max(1, max_pixels // max(width, 1))
+    for top in range(0, height, rows):
+        yield top, min(top + rows, height)
+
+
+def image_to_array(
+    image: "PIL.Image.Image",
+    box: Optional[tuple[int, int, int, int]] = None,
+    out: Optional["np.ndarray"] = None,
+) -> "np.ndarray":
+    """Convert PIL Image to a uint8 numpy array.
+
+    Pixels are packed by Pillow's raw encoder straight into the array, so
+    they are copied once and no intermediate ``bytes`` of the whole image
+    is built. The encoder is not public Pillow API; if it is unavailable,
+    pixels are copied through ``np.asarray`` instead.
+
+    Args:
+        image: PIL Image.
+        box: Optional (left, top, right, bottom) region to convert instead of
+            cropping the image first.
+        out: Optional contiguous uint8 array of shape (H, W, C) to write into.
+
+    Returns:
+        Array of shape (H, W, C) with dtype uint8, read-only unless ``out`` was given.
+    """
+    import numpy as np
+
+    # Convert to RGB if needed
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.load()
+
+    left, top, right, bottom = box if box is not None else (0, 0, *image.size)
+    array = np.empty((bottom - top, right - left, 3), dtype=np.uint8) if out is None else out
+    if array.size:
+        try:
+            _pack_pixels(image, (left, top, right, bottom), array.reshape(-1))
+        except (AttributeError, TypeError):
+            region = image if box is None else image.crop(box)
+            array[...] = np.asarray(region)
+
+    # Arrays are shared between requests, so keep them immutable like np.asarray(image)
+    if out is None:
+        array.setflags(write=False)
+    return array
+
+
+def _pack_pixels(
+    image: "PIL.Image.Image", box: tuple[int, int, int, int], flat: "np.ndarray"
+) -> None:
+    """Pack the RGB pixels of a region into a flat uint8 array.
+
+    Args:
+        image: Loaded PIL Image in RGB mode.
+        box: (left, top, right, bottom) region to read.
+        flat: Contiguous uint8 array with room for the region's pixels.
+
+    Raises:
+        AttributeError, TypeError: If Pillow's raw encoder interface changed.
+        RuntimeError: If the encoder fails.
+    """
+    import numpy as np
+    from PIL import Image
+
+    encoder = Image._getencoder("RGB", "raw", "RGB")
+    encoder.setimage(image.im, box)
+    # The raw encoder emits whole rows, so its buffer must hold at least one row
+    # (3 bytes per pixel)
+    offset = 0
+    errcode = 0
+    while not errcode:
+        _, errcode, data = encoder.encode(max(CONVERSION_CHUNK_PIXELS, image.width * 4))
+        flat[offset : offset + len(data)] = np.frombuffer(data, dtype=np.uint8)
+        offset += len(data)
+    if errcode < 0:
+        raise RuntimeError(f"Encoder error {errcode} while reading pixels")
+
+
+def apply_channel_luts(
+    array: "np.ndarray", luts: "np.ndarray", out: Optional["np.ndarray"] = None
+) -> "np.ndarray":
+    """Map each channel of a uint8 image through its own 256-entry table.
+
+    Uses Pillow's per-band ``point`` strip by strip, which looks codes up
+    in C without widening them into an index array.
+
+    Args:
+        array: Array of shape (H, W, 3) with dtype uint8.
+        luts: Array of shape (3, 256) with dtype uint8, one table per channel.
+        out: Optional writable array of shape (H, W, 3) with dtype uint8 to write into.
+
+    Returns:
+        Array of shape (H, W, 3) with dtype uint8.
+    """
+    import numpy as np
+    from PIL import Image
+
+    height, width, _ = array.shape
+    if out is None:
+        out = np.empty((height, width, 3), dtype=np.uint8)
+    table = luts.reshape(-1).tolist()
+
+    for top, bottom in row_strips(height, width):
+        strip = np.ascontiguousarray(array[top:bottom])
+        band = Image.frombuffer("RGB", (width, bottom - top), strip, "raw", "RGB", 0, 1)
+        image_to_array(band.point(table), out=out[top:bottom])
+    return out
+
+
+def array_to_tensor(
+    array: "np.ndarray", out: Optional[torch.Tensor] = None, dtype: torch.dtype = torch.float32
+) -> torch.Tensor:
+    """Convert a uint8 numpy array to PyTorch tensor.
+
+    Casting, scaling and the (H, W, C) -> (C, H, W) reordering happen in one
+    pass into a single contiguous tensor. Values are computed in float32 and
+    rounded once into ``dtype``.
+
+    Args:
+        array: Array of shape (H, W, C) with dtype uint8.
+        out: Optional contiguous float tensor of shape (C, H, W) to write into.
+        dtype: Float dtype of the result when ``out`` is not given.
+
+    Returns:
+        Contiguous tensor of shape (C, H, W) with values in [0, 1].
+    """
+    import numpy as np
+
+    height, width, channels = array.shape
+    if out is None:
+        out = torch.empty((channels, height, width), dtype=dtype)
+    if out.dtype == torch.float32:
+        np.divide(array.transpose(2, 0, 1), np.float32(255.0), out=out.numpy(), dtype=np.float32)
+        return out
+
+    # numpy has no bfloat16, so reduced precisions go through float32 strips
+    for top, bottom in row_strips(height, width):
+        strip = array[top:bottom].transpose(2, 0, 1)
+        values = np.divide(strip, np.float32(255.0), dtype=np.float32)
+        out[:, top:bottom].copy_(torch.from_numpy(values))
+    return out
+
 
 def image_to_tensor(image: "PIL.Image.Image") -> torch.Tensor:
     """Convert PIL Image to PyTorch tensor.
@@ -12,20 +176,53 @@ def image_to_tensor(image: "PIL.Image.Image") -> torch.Tensor:
     Returns:
         Tensor of shape (C, H, W) with values in [0, 1].
     """
+    return array_to_tensor(image_to_array(image))
+
+
+def compute_array_channel_means(array: "np.ndarray") -> torch.Tensor:
+    """Compute the mean of each channel of a uint8 image array.
+
+    Args:
+        array: Array of shape (H, W, C) with dtype uint8.
+
+    Returns:
+        Tensor of shape (C,) with per-channel means in [0, 1].
+    """
     import numpy as np
-    from PIL import Image
 
-    # Convert to RGB if needed
-    if image.mode != "RGB":
-        image = image.convert("RGB")
+    means = array.mean(axis=(0, 1), dtype=np.float64) / 255.0
+    return torch.from_numpy(means).float()
+
+
+def tensor_to_array(tensor: torch.Tensor, out: Optional["np.ndarray"] = None) -> "np.ndarray":
+    """Convert PyTorch tensor to a uint8 numpy array.
 
-    # Convert to numpy array and normalize to [0, 1]
-    arr = np.array(image, dtype=np.float32) / 255.0
+    Works strip by strip: each strip is scaled, clamped and reordered into
+    one small float buffer and truncated straight into the output, which is
+    the only full-size allocation.
 
-    # Convert to tensor and rearrange from (H, W, C) to (C, H, W)
-    tensor = torch.from_numpy(arr).permute(2, 0, 1)
+    Args:
+        tensor: Tensor of shape (C, H, W) with values in [0, 1].
+        out: Optional writable array of shape (H, W, C) with dtype uint8 to write into.
 
-    return tensor
+    Returns:
+        Array of shape (H, W, C) with dtype uint8.
+    """
+    import numpy as np
+
+    channels, height, width = tensor.shape
+    if out is None:
+        out = np.empty((height, width, channels), dtype=np.uint8)
+    pixels = torch.from_numpy(out)
+
+    for top, bottom in row_strips(height, width):
+        # Copy the strip into float32 (H, W, C) order and denormalize to [0, 255] in
+        # place; the uint8 copy truncates like astype
+        scaled = tensor[:, top:bottom].permute(1, 2, 0).to(
+            torch.float32, memory_format=torch.contiguous_format, copy=True
+        )
+        pixels[top:bottom].copy_(scaled.mul_(255.0).clamp_(0.0, 255.0))
+    return out
 
 
 def tensor_to_image(tensor: torch.Tensor) -> "PIL.Image.Image":
@@ -37,22 +234,24 @@ def tensor_to_image(tensor: torch.Tensor) -> "PIL.Image.Image":
     Returns:
         PIL Image in RGB mode.
     """
-    import numpy as np
     from PIL import Image
 
-    # Clamp values to [0, 1]
-    tensor = torch.clamp(tensor, 0.0, 1.0)
+    # Create PIL Image
+    image = Image.fromarray(tensor_to_array(tensor), mode="RGB")
 
-    # Convert to numpy and rearrange from (C, H, W) to (H, W, C)
-    arr = tensor.permute(1, 2, 0).cpu().numpy()
+    return image
 
-    # Denormalize to [0, 255] and convert to uint8
-    arr = (arr * 255.0).astype(np.uint8)
 
-    # Create PIL Image
-    image = Image.fromarray(arr, mode="RGB")
+def compute_channel_means(tensor: torch.Tensor) -> torch.Tensor:
+    """Compute the mean of each channel.
 
-    return image
+    Args:
+        tensor: Tensor of shape (C, H, W) or (N, C, H, W) with values in [0, 1].
+
+    Returns:
+        Tensor of shape (C,) or (N, C) with per-channel means.
+    """
+    return tensor.mean(dim=(-2, -1))
 
 
 def compute_average_rgb(tensor: torch.Tensor) -> tuple[float, float, float]:
@@ -65,6 +264,142 @@ def compute_average_rgb(tensor: torch.Tensor) -> tuple[float, float, float]:
         Tuple of (R, G, B) average values.
     """
     # Compute mean for each channel
-    means = tensor.view(3, -1).mean(dim=1)
+    means = compute_channel_means(tensor)
     return (means[0].item(), means[1].item(), means[2].item())
 
+
+def apply_gains(image: torch.Tensor, gains: torch.Tensor) -> torch.Tensor:
+    """Apply per-channel gains and clamp to the valid range.
+
+    Gains are cast to the image dtype, so reduced-precision images are
+    scaled at their own width instead of being promoted to float32.
+
+    Args:
+        image: Tensor of shape (C, H, W) or (N, C, H, W) with values in [0, 1].
+        gains: Tensor of shape (C,) or (N, C) with per-channel gains.
+
+    Returns:
+        Tensor of same shape and dtype as ``image`` with values in [0, 1].
+    """
+    # Reshape gains to (..., C, 1, 1) for broadcasting
+    balanced = image * gains.to(image.dtype)[..., None, None]
+
+    # Clamp to valid range
+    return balanced.clamp_(0.0, 1.0)
+
+
+def gains_to_illuminant(gains: torch.Tensor) -> torch.Tensor:
+    """Convert per-channel gains to the estimated illuminant color.
+
+    The illuminant is proportional to the inverse of the gains and is
+    normalized so that its channels sum to one (rgb chromaticity). Gains
+    are clamped away from zero, and gains that imply no illuminant at all
+    (for example all zero on a black image) give a neutral one.
+
+    Args:
+        gains: Tensor of shape (C,) or (N, C) with per-channel gains.
+
+    Returns:
+        Tensor of same shape with the normalized illuminant RGB.
+    """
+    illuminant = 1.0 / gains.clamp(min=1e-6)
+    total = illuminant.sum(dim=-1, keepdim=True)
+    neutral = torch.full_like(illuminant, 1.0 / illuminant.shape[-1])
+    return torch.where(total > 0, illuminant / total, neutral)
+
+
+def downscale_to_max_edge(tensor: torch.Tensor, max_edge: int | None) -> torch.Tensor:
+    """Downscale an image so that its long edge is at most ``max_edge`` pixels.
+
+    Uses area averaging, so when applied to linear RGB the proxy keeps the
+    physically meaningful channel means of the original.
+
+    Args:
+        tensor: Tensor of shape (C, H, W) or (N, C, H, W).
+        max_edge: Maximum long edge in pixels, or None to keep full resolution.
+
+    Returns:
+        Downscaled tensor, or ``tensor`` itself if it is already small enough.
+    """
+    height, width = tensor.shape[-2:]
+    long_edge = max(height, width)
+    if max_edge is None or long_edge <= max_edge:
+        return tensor
+
+    scale = max_edge / long_edge
+    size = (max(1, round(height * scale)), max(1, round(width * scale)))
+
+    batched = tensor if tensor.dim() == 4 else tensor.unsqueeze(0)
+    proxy = torch.nn.functional.interpolate(batched, size=size, mode="area")
+    return proxy if tensor.dim() == 4 else proxy.squeeze(0)
+
+
+def angular_error(gains_a: torch.Tensor, gains_b: torch.Tensor) -> torch.Tensor:
+    """Compute the angle between the illuminants implied by two sets of gains.
+
+    This is the standard recovery angular error used to compare illuminant
+    estimates; it ignores overall brightness.
+
+    Args:
+        gains_a: Tensor of shape (C,) or (N, C) with per-channel gains.
+        gains_b: Tensor of same shape with per-channel gains.
+
+    Returns:
+        Tensor of shape () or (N,) with the angular error in degrees.
+    """
+    # acos is ill-conditioned near 1, so compute in double precision
+    a = gains_to_illuminant(gains_a.double())
+    b = gains_to_illuminant(gains_b.double())
+    cosine = (a * b).sum(dim=-1) / (a.norm(dim=-1) * b.norm(dim=-1))
+    return torch.rad2deg(torch.acos(cosine.clamp(-1.0, 1.0))).to(gains_a.dtype)
+
+
+def select_quantile(values: torch.Tensor, q: float, dim: int = -1) -> torch.Tensor:
+    """Compute the q-th quantile along a dimension by selection.
+
+    Matches ``torch.quantile`` with linear interpolation, but finds the order
+    statistic with ``kthvalue`` (linear-time selection) instead of sorting.
+    It is deterministic and has no input size limit, so callers do not need
+    to subsample large tensors.
+
+    Args:
+        values: Tensor of values.
+        q: Quantile in [0, 1].
+        dim: Dimension to reduce.
+
+    Returns:
+        Tensor with ``dim`` removed holding the quantile values.
+    """
+    count = values.shape[dim]
+    position = q * (count - 1)
+    lower = math.floor(position)
+    fraction = position - lower
+
+    low = values.kthvalue(lower + 1, dim=dim, keepdim=True).values
+    if fraction == 0.0:
+        return low.squeeze(dim)
+
+    # The next order statistic equals ``low`` when it is duplicated, otherwise
+    # it is the smallest value strictly above it
+    at_or_below = (values <= low).sum(dim=dim, keepdim=True)
+    above = torch.where(values > low, values, torch.full_like(values, float("inf")))
+    high = torch.where(at_or_below > lower + 1, low, above.amin(dim=dim, keepdim=True))
+    return torch.lerp(low, high, fraction).squeeze(dim)
+
+
+def histogram_quantile_bin(counts: torch.Tensor, q: float) -> int:
+    """Find the histogram bin containing the q-th quantile.
+
+    Used by streaming estimators that only keep fixed-bin histograms.
+
+    Args:
+        counts: Histogram counts of shape (B,).
+        q: Quantile in [0, 1].
+
+    Returns:
+        Index of the bin holding the order statistic at the quantile position.
+    """
+    total = int(counts.sum().item())
+    rank = math.floor(q * max(0, total - 1))
+    cumulative = torch.cumsum(counts, dim=0)
+    return int(torch.searchsorted(cumulative, torch.tensor(rank), right=True).item())
@@ -1,39 +1,64 @@
 """Grey World white balance algorithm."""
 
+from typing import Optional
+
 import torch
 
+from app.engine.utils import apply_gains
 
-def apply_grey_world(image: torch.Tensor) -> torch.Tensor:
-    """Apply grey world white balance.
+
+def estimate_grey_world(
+    image: torch.Tensor, means: Optional[torch.Tensor] = None
+) -> torch.Tensor:
+    """Estimate grey world channel gains.
 
     Assumes that the average scene color should be neutral grey.
-    Adjusts each channel so that the mean becomes grey (equal RGB values).
+    Computes per-channel gains that make each channel mean equal to grey.
 
     Args:
-        image: Tensor of shape (C, H, W) with values in [0, 1] in linear RGB.
+        image: Tensor of shape (C, H, W) or (N, C, H, W) with values in [0, 1]
+            in linear RGB.
+        means: Precomputed per-channel means of shape (C,) or (N, C), if available.
 
     Returns:
-        Tensor of same shape and range, white balanced in linear RGB.
+        Tensor of shape (C,) or (N, C) with per-channel gains.
     """
     # Compute mean for each channel
-    means = image.view(3, -1).mean(dim=1, keepdim=True)
+    if means is None:
+        means = image.mean(dim=(-2, -1))
+    return grey_world_gains(means)
 
+
+def grey_world_gains(means: torch.Tensor) -> torch.Tensor:
+    """Compute grey world gains from per-channel means.
+
+    Args:
+        means: Tensor of shape (C,) or (N, C) with per-channel means.
+
+    Returns:
+        Tensor of same shape with per-channel gains.
+    """
     # Compute overall mean (target grey value)
-    overall_mean = means.mean()
+    overall_mean = means.mean(dim=-1, keepdim=True)
 
     # Avoid division by zero
     means = torch.where(means < 1e-6, torch.ones_like(means), means)
 
     # Compute gains to make each channel mean equal to overall mean
-    gains = overall_mean / means
+    return overall_mean / means
 
-    # Apply gains to each channel
-    # Reshape gains to (C, 1, 1) for broadcasting
-    gains = gains.view(3, 1, 1)
-    balanced = image * gains
 
-    # Clamp to valid range
-    balanced = torch.clamp(balanced, 0.0, 1.0)
+def apply_grey_world(image: torch.Tensor) -> torch.Tensor:
+    """Apply grey world white balance.
+
+    Assumes that the average scene color should be neutral grey.
+    Adjusts each channel so that the mean becomes grey (equal RGB values).
 
-    return balanced
+    Args:
+        image: Tensor of shape (C, H, W) or (N, C, H, W) with values in [0, 1]
+            in linear RGB.
 
+    Returns:
+        Tensor of same shape and range, white balanced in linear RGB.
+    """
+    return apply_gains(image, estimate_grey_world(image))
@@ -0,0 +1,202 @@
+"""Minkowski-norm family of white balance algorithms.
+
+Grey world, shades of grey, max-RGB and grey edge are special cases of one
+estimate (van de Weijer et al., "Edge-based color constancy", 2007): the
+illuminant color of each channel is proportional to the Minkowski p-norm of
+the n-th order derivative of the image, smoothed with a Gaussian of scale
+sigma, over all pixels. Order 0 with p=1 is grey world, finite p is shades
+of grey and p=inf is max-RGB; orders 1 and 2 are first- and second-order
+grey edge.
+
+The norm is computed from moments scaled by the per-channel maximum, so
+large p neither overflows nor underflows and moments of image parts (such
+as tiles) can be merged exactly.
+"""
+
+import math
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+import torch
+
+from app.engine.utils import apply_gains
+from app.engine.white_balance_grey_edge import smooth_image, smoothing_radius, sobel_kernel
+
+# Norms below this carry no color information (flat channels without derivative energy)
+NORM_EPSILON = 1e-6
+
+
+class MinkowskiConfig(NamedTuple):
+    """Parameters of one member of the Minkowski family."""
+
+    # Derivative order: 0 for pixel values, 1 for gradients, 2 for second derivatives
+    order: int
+    # Minkowski norm; math.inf takes the maximum
+    p: float
+    # Gaussian smoothing applied before differentiation
+    sigma: float
+
+    @property
+    def halo(self) -> int:
+        """Rows of context each output pixel depends on."""
+        return smoothing_radius(self.sigma) + (1 if self.order > 0 else 0)
+
+
+def estimate_minkowski(
+    image: torch.Tensor,
+    order: int = 0,
+    p: float = 6.0,
+    sigma: float = 0.0,
+    magnitude: Optional[torch.Tensor] = None,
+) -> torch.Tensor:
+    """Estimate channel gains with a member of the Minkowski family.
+
+    Args:
+        image: Tensor of shape (C, H, W) or (N, C, H, W) with values in [0, 1]
+            in linear RGB.
+        order: Derivative order, 0 to 2 (default: 0).
+        p: Minkowski norm parameter, or ``math.inf`` for the maximum (default: 6.0).
+        sigma: Standard deviation for Gaussian smoothing (default: 0.0).
+        magnitude: Precomputed ``derivative_magnitude(smooth_image(image, sigma),
+            order)``, if available.
+
+    Returns:
+        Tensor of shape (C,) or (N, C) with per-channel gains.
+    """
+    if magnitude is None:
+        magnitude = derivative_magnitude(smooth_image(image, sigma), order)
+    return minkowski_gains(minkowski_norm(magnitude, p))
+
+
+def minkowski_gains(norms: torch.Tensor) -> torch.Tensor:
+    """Compute gains that equalize per-channel Minkowski norms.
+
+    Channels whose norm is below :data:`NORM_EPSILON` say nothing about the
+    illuminant, so they keep a unit gain and the remaining channels are
+    balanced against each other. Without any usable channel, for example on
+    a flat image, all gains are one.
+
+    Args:
+        norms: Non-negative tensor of shape (C,) or (N, C) with per-channel norms.
+
+    Returns:
+        Tensor of same shape with per-channel gains.
+    """
+    valid = norms >= NORM_EPSILON
+    ones = torch.ones_like(norms)
+    target = torch.where(valid, norms, 0.0).sum(dim=-1, keepdim=True) / valid.sum(
+        dim=-1, keepdim=True
+    ).clamp(min=1)
+    return torch.where(valid, target / torch.where(valid, norms, ones), ones)
+
+
+def derivative_magnitude(image: torch.Tensor, order: int) -> torch.Tensor:
+    """Compute the per-channel magnitude of the n-th order image derivative.
+
+    Order 1 uses the Sobel gradient magnitude, order 2 the norm of the
+    Hessian ``sqrt(fxx^2 + 4 fxy^2 + fyy^2)``. Borders are extended by
+    replicating edge pixels so the image frame does not register as an edge.
+
+    Args:
+        image: Tensor of shape (C, H, W) or (N, C, H, W).
+        order: Derivative order, 0 to 2.
+
+    Returns:
+        Non-negative tensor of the same shape.
+
+    Raises:
+        ValueError: If ``order`` is not 0, 1 or 2.
+    """
+    if order == 0:
+        return image
+    if order not in (1, 2):
+        raise ValueError(f"Unsupported derivative order: {order}")
+
+    # Fold batch and channel dimensions so every channel is filtered independently
+    height, width = image.shape[-2:]
+    channels = image.reshape(-1, 1, height, width)  # (N * C, 1, H, W)
+    padded = torch.nn.functional.pad(channels, (1, 1, 1, 1), mode="replicate")
+    derivatives = torch.nn.functional.conv2d(
+        padded, derivative_kernel(order, image.dtype, image.device)
+    )
+
+    # Weight the mixed derivative so the norm matches sqrt(fxx^2 + 4 fxy^2 + fyy^2)
+    if order == 2:
+        derivatives[:, 2].mul_(2.0)
+    magnitude = derivatives.square_().sum(dim=1).sqrt_()
+    return magnitude.view_as(image)
+
+
+@lru_cache(maxsize=None)
+def derivative_kernel(order: int, dtype: torch.dtype, device: torch.device) -> torch.Tensor:
+    """Get the stacked 3x3 derivative kernels of an order.
+
+    Args:
+        order: Derivative order, 1 or 2.
+        dtype: Kernel dtype.
+        device: Kernel device.
+
+    Returns:
+        Read-only tensor of shape (K, 1, 3, 3): Sobel x and y for order 1,
+        xx, yy and xy for order 2.
+    """
+    if order == 1:
+        return sobel_kernel(dtype, device)
+    d_xx = [[1, -2, 1], [2, -4, 2], [1, -2, 1]]
+    d_yy = [[1, 2, 1], [-2, -4, -2], [1, 2, 1]]
+    d_xy = [[1, 0, -1], [0, 0, 0], [-1, 0, 1]]
+    return torch.tensor([[d_xx], [d_yy], [d_xy]], dtype=dtype, device=device)
+
+
+def scaled_moments(values: torch.Tensor, p: float) -> tuple[torch.Tensor, torch.Tensor]:
+    """Compute per-channel p-th power moments relative to the channel maximum.
+
+    Args:
+        values: Non-negative tensor of shape (..., C, H, W).
+        p: Minkowski norm parameter, or ``math.inf``.
+
+    Returns:
+        Tuple of (per-channel maximum, sum over pixels of ``(values / maximum) ** p``),
+        each of shape (..., C). The sum is zero for ``p=inf``.
+    """
+    peak = values.amax(dim=(-2, -1))
+    if math.isinf(p):
+        return peak, torch.zeros_like(peak)
+    scale = torch.where(peak > 0, peak, torch.ones_like(peak))
+    scaled = (values / scale[..., None, None]).pow_(p)
+    return peak, scaled.sum(dim=(-2, -1))
+
+
+def minkowski_norm(values: torch.Tensor, p: float) -> torch.Tensor:
+    """Compute the per-channel Minkowski mean ``mean(values ** p) ** (1 / p)``.
+
+    Args:
+        values: Non-negative tensor of shape (..., C, H, W).
+        p: Minkowski norm parameter, or ``math.inf`` for the maximum.
+
+    Returns:
+        Tensor of shape (..., C).
+    """
+    peak, moments = scaled_moments(values, p)
+    if math.isinf(p):
+        return peak
+    count = values.shape[-2] * values.shape[-1]
+    return peak * (moments / count).pow_(1.0 / p)
+
+
+def apply_minkowski(
+    image: torch.Tensor, order: int = 0, p: float = 6.0, sigma: float = 0.0
+) -> torch.Tensor:
+    """Apply white balance with a member of the Minkowski family.
+
+    Args:
+        image: Tensor of shape (C, H, W) or (N, C, H, W) with values in [0, 1]
+            in linear RGB.
+        order: Derivative order, 0 to 2 (default: 0).
+        p: Minkowski norm parameter, or ``math.inf`` for the maximum (default: 6.0).
+        sigma: Standard deviation for Gaussian smoothing (default: 0.0).
+
+    Returns:
+        Tensor of same shape and range, white balanced in linear RGB.
+    """
+    return apply_gains(image, estimate_minkowski(image, order, p, sigma))
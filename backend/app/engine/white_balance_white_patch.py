@@ -1,70 +1,98 @@
 """White Patch white balance algorithm."""
 
+from typing import Optional
+
 import torch
 
+from app.engine.utils import apply_gains, select_quantile
 
-def apply_white_patch(
-    image: torch.Tensor, percentile: float = 99.5
+
+def estimate_white_patch(
+    image: torch.Tensor, percentile: float = 99.5, intensity: Optional[torch.Tensor] = None
 ) -> torch.Tensor:
-    """Apply white patch white balance.
+    """Estimate white patch channel gains.
 
     Uses the brightest region in the image as reference white.
-    Scales channels so that the brightest patch becomes white.
+    Computes per-channel gains so that the brightest patch becomes white.
 
     Args:
-        image: Tensor of shape (C, H, W) with values in [0, 1] in linear RGB.
+        image: Tensor of shape (C, H, W) or (N, C, H, W) with values in [0, 1]
+            in linear RGB.
         percentile: Percentile to use for white patch detection (default: 99.5).
+        intensity: Precomputed per-pixel channel mean of shape (..., H, W), if
+            available.
 
     Returns:
-        Tensor of same shape and range, white balanced in linear RGB.
+        Tensor of shape (C,) or (N, C) with per-channel gains.
     """
     # Compute intensity/luminance across all channels to find brightest pixels
     # Use a simple average or max across channels
     # For white patch, we want pixels that are bright in all channels
-    intensity = image.mean(dim=0)  # (H, W) - average intensity per pixel
-    
-    # Flatten to find percentile
-    flat_intensity = intensity.view(-1)
-    
+    if intensity is None:
+        intensity = image.mean(dim=-3)  # (..., H, W) - average intensity per pixel
+
+    # Flatten spatial dimensions to find percentile per image
+    flat_intensity = intensity.flatten(-2)
+
     # Find threshold for brightest pixels
-    threshold = torch.quantile(flat_intensity, percentile / 100.0)
-    
+    threshold = select_quantile(flat_intensity, percentile / 100.0, dim=-1)
+
     # Create mask for brightest pixels
-    bright_mask = intensity >= threshold  # (H, W)
-    
-    # Get RGB values at brightest pixels for each channel
-    white_patch_values = []
-    for c in range(3):
-        channel_values = image[c][bright_mask]  # Get values where mask is True
-        if channel_values.numel() > 0:
-            # Use the maximum value in the bright region for this channel
-            white_patch_value = channel_values.max()
-        else:
-            # Fallback to overall max if no bright pixels found
-            white_patch_value = image[c].max()
-        white_patch_values.append(white_patch_value)
-    
-    white_patch_values_tensor = torch.tensor(white_patch_values, dtype=image.dtype, device=image.device)
-    
+    bright_mask = intensity >= threshold[..., None, None]  # (..., H, W)
+
+    # Use the maximum value in the bright region for each channel
+    masked = torch.where(
+        bright_mask.unsqueeze(-3), image, torch.full_like(image, float("-inf"))
+    )
+    white_patch_values = masked.amax(dim=(-2, -1))  # (..., C)
+
+    # Fallback to overall max if no bright pixels found
+    white_patch_values = torch.where(
+        torch.isfinite(white_patch_values),
+        white_patch_values,
+        image.amax(dim=(-2, -1)),
+    )
+
+    return white_patch_gains(white_patch_values)
+
+
+def white_patch_gains(white_patch_values: torch.Tensor) -> torch.Tensor:
+    """Compute white patch gains from per-channel white patch values.
+
+    Args:
+        white_patch_values: Tensor of shape (C,) or (N, C) with the brightest
+            per-channel values of the reference white region.
+
+    Returns:
+        Tensor of same shape with per-channel gains.
+    """
     # Avoid division by zero
-    white_patch_values_tensor = torch.where(
-        white_patch_values_tensor < 1e-6,
-        torch.ones_like(white_patch_values_tensor),
-        white_patch_values_tensor,
+    white_patch_values = torch.where(
+        white_patch_values < 1e-6,
+        torch.ones_like(white_patch_values),
+        white_patch_values,
     )
-    
+
     # Compute gains to make white patch values equal (neutral white)
     # Use maximum of white patch values as target
-    target = white_patch_values_tensor.max()
-    gains = target / white_patch_values_tensor
-    
-    # Apply gains to each channel
-    # Reshape gains to (C, 1, 1) for broadcasting
-    gains = gains.view(3, 1, 1)
-    balanced = image * gains
-    
-    # Clamp to valid range
-    balanced = torch.clamp(balanced, 0.0, 1.0)
-    
-    return balanced
+    target = white_patch_values.amax(dim=-1, keepdim=True)
+    return target / white_patch_values
+
+
+def apply_white_patch(
+    image: torch.Tensor, percentile: float = 99.5
+) -> torch.Tensor:
+    """Apply white patch white balance.
 
+    Uses the brightest region in the image as reference white.
+    Scales channels so that the brightest patch becomes white.
+
+    Args:
+        image: Tensor of shape (C, H, W) or (N, C, H, W) with values in [0, 1]
+            in linear RGB.
+        percentile: Percentile to use for white patch detection (default: 99.5).
+
+    Returns:
+        Tensor of same shape and range, white balanced in linear RGB.
+    """
+    return apply_gains(image, estimate_white_patch(image, percentile))
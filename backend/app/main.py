@@ -1,32 +1,55 @@
 """Main FastAPI application."""
 
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.api import routes_white_balance
+from app.core import metrics
 from app.core.config import settings
 from app.core.error_handlers import (
     color_space_conversion_error_handler,
+    image_not_found_error_handler,
     invalid_image_error_handler,
+    payload_too_large_error_handler,
+    service_busy_error_handler,
     unsupported_algorithm_error_handler,
     white_balance_error_handler,
 )
 from app.core.errors import (
     ColorSpaceConversionError,
+    ImageNotFoundError,
     InvalidImageError,
+    PayloadTooLargeError,
+    ServiceBusyError,
     UnsupportedAlgorithmError,
     WhiteBalanceError,
 )
 from app.core.logging import setup_logging
+from app.services.uploads import configure_pillow_limits
+from app.services.worker_pool import shutdown_worker_pool
 
 # Setup logging
 setup_logging()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Configure decoder limits on startup and stop processing workers on shutdown."""
+    configure_pillow_limits()
+    yield
+    shutdown_worker_pool()
+
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
     debug=settings.debug,
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -36,6 +59,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=routes_white_balance.RESULT_HEADERS,
 )
 
 # Register exception handlers
@@ -43,6 +67,9 @@ app.add_exception_handler(WhiteBalanceError, white_balance_error_handler)
 app.add_exception_handler(InvalidImageError, invalid_image_error_handler)
 app.add_exception_handler(UnsupportedAlgorithmError, unsupported_algorithm_error_handler)
 app.add_exception_handler(ColorSpaceConversionError, color_space_conversion_error_handler)
+app.add_exception_handler(ServiceBusyError, service_busy_error_handler)
+app.add_exception_handler(ImageNotFoundError, image_not_found_error_handler)
+app.add_exception_handler(PayloadTooLargeError, payload_too_large_error_handler)
 
 # Include routers
 app.include_router(routes_white_balance.router, prefix=settings.api_v1_prefix)
@@ -59,3 +86,13 @@ async def health():
     """Health check endpoint."""
     return {"status": "healthy"}
 
+
+async def get_metrics() -> PlainTextResponse:
+    """Prometheus metrics endpoint."""
+    return PlainTextResponse(
+        metrics.render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+if settings.metrics_enabled:
+    app.add_api_route("/metrics", get_metrics, methods=["GET"], include_in_schema=False)
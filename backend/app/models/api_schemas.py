@@ -1,8 +1,8 @@
 """Pydantic models for API request and response validation."""
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
-from app.models.enums import ColorSpace, WhiteBalanceAlgorithm
+from app.models.enums import ColorSpace, OutputFormat, WhiteBalanceAlgorithm
 
 
 class WhiteBalanceRequest(BaseModel):
@@ -11,6 +11,15 @@ class WhiteBalanceRequest(BaseModel):
     algorithm: WhiteBalanceAlgorithm
     input_color_space: ColorSpace = ColorSpace.SRGB
     processing_space: ColorSpace = ColorSpace.LINEAR_RGB
+    estimation_max_edge: int | None = Field(default=None, ge=16)
+    report_estimation_error: bool = False
+    output_format: OutputFormat = OutputFormat.PNG
+    output_quality: int | None = Field(default=None, ge=1, le=100)
+    compress_level: int | None = Field(default=None, ge=0, le=9)
+    sigma: float | None = Field(default=None, ge=0.0, le=50.0)
+    p: float | None = Field(default=None, ge=1.0, le=32.0)
+    n: int | None = Field(default=None, ge=0, le=2)
+    percentile: float | None = Field(default=None, ge=0.0, le=100.0)
 
     class Config:
         """Pydantic config."""
@@ -26,9 +35,156 @@ class WhiteBalanceResponse(BaseModel):
     image_base64: str
     avg_rgb_before: tuple[float, float, float] | None = None
     avg_rgb_after: tuple[float, float, float] | None = None
+    gains: tuple[float, float, float] | None = None
+    estimation_size: tuple[int, int] | None = None
+    estimation_error_deg: float | None = None
+    output_format: OutputFormat = OutputFormat.PNG
+    width: int | None = None
+    height: int | None = None
+    output_bytes: int | None = None
+    encode_time_ms: float | None = None
+    profile_id: str | None = None
+    profile_summary: str | None = None
 
     class Config:
         """Pydantic config."""
 
         use_enum_values = True
 
+
+class WhiteBalanceEstimateResponse(BaseModel):
+    """Response model for white balance estimation without image output."""
+
+    algorithm: WhiteBalanceAlgorithm
+    processing_space: ColorSpace
+    gains: tuple[float, float, float]
+    illuminant_rgb: tuple[float, float, float]
+    width: int
+    height: int
+    avg_rgb_before: tuple[float, float, float] | None = None
+    estimation_size: tuple[int, int] | None = None
+    estimation_error_deg: float | None = None
+
+    class Config:
+        """Pydantic config."""
+
+        use_enum_values = True
+
+
+class WhiteBalanceBatchItem(WhiteBalanceResponse):
+    """Per-image entry of a batch white balance response."""
+
+    filename: str | None = None
+
+
+class WhiteBalanceBatchResponse(BaseModel):
+    """Response model for batch white balance processing."""
+
+    algorithm: WhiteBalanceAlgorithm
+    processing_space: ColorSpace
+    results: list[WhiteBalanceBatchItem]
+
+    class Config:
+        """Pydantic config."""
+
+        use_enum_values = True
+
+
+class SequenceOptions(BaseModel):
+    """Temporal options of frame sequence processing.
+
+    Fields left unset use the settings defaults.
+    """
+
+    reestimate_interval: int | None = Field(default=None, ge=1)
+    smoothing: float | None = Field(default=None, gt=0.0, le=1.0)
+    scene_change_threshold: float | None = Field(default=None, gt=0.0)
+
+
+class WhiteBalanceSequenceFrame(WhiteBalanceBatchItem):
+    """Per-frame entry of a frame sequence white balance response."""
+
+    index: int
+    estimated: bool
+    scene_change: bool
+
+
+class WhiteBalanceSequenceSummary(BaseModel):
+    """Last line of a streamed frame sequence white balance response."""
+
+    algorithm: WhiteBalanceAlgorithm
+    processing_space: ColorSpace
+    frame_count: int
+    estimated_frames: int
+    scene_changes: list[int]
+    elapsed_ms: float
+    frames_per_second: float
+    stage_times_ms: dict[str, float] | None = None
+
+    class Config:
+        """Pydantic config."""
+
+        use_enum_values = True
+
+
+class CompareVariant(BaseModel):
+    """One algorithm and parameter set to run in a comparison.
+
+    Fields left unset use the values given for the whole comparison.
+    """
+
+    algorithm: WhiteBalanceAlgorithm
+    processing_space: ColorSpace | None = None
+    sigma: float | None = Field(default=None, ge=0.0, le=50.0)
+    p: float | None = Field(default=None, ge=1.0, le=32.0)
+    n: int | None = Field(default=None, ge=0, le=2)
+    percentile: float | None = Field(default=None, ge=0.0, le=100.0)
+
+    class Config:
+        """Pydantic config."""
+
+        use_enum_values = True
+
+
+class WhiteBalanceCompareResponse(BaseModel):
+    """Response model for comparing algorithms on one image."""
+
+    width: int
+    height: int
+    avg_rgb_before: tuple[float, float, float]
+    results: list[WhiteBalanceResponse]
+    contact_sheet_base64: str | None = None
+    contact_sheet_width: int | None = None
+    contact_sheet_height: int | None = None
+
+
+class ImageUploadResponse(BaseModel):
+    """Response model for an image kept for repeated processing."""
+
+    image_id: str
+    width: int
+    height: int
+    avg_rgb_before: tuple[float, float, float]
+    expires_in_seconds: float
+
+
+class CacheStatsResponse(BaseModel):
+    """Response model for result cache statistics."""
+
+    enabled: bool
+    entries: int
+    size_bytes: int
+    max_bytes: int
+    hits: int
+    misses: int
+    evictions: int
+
+
+class AlgorithmInfoResponse(BaseModel):
+    """Response model describing a registered white balance algorithm."""
+
+    name: str
+    parameters: list[str]
+    batched: bool
+    tiled: bool
+    cost_ns_per_pixel: float
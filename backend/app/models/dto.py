@@ -1,33 +1,249 @@
 """Data Transfer Objects for internal use."""
 
+import base64
 from typing import Optional
 
+import numpy as np
+import torch
+
 
 class ProcessedImageResult:
     """Result of white balance processing."""
 
     def __init__(
         self,
-        image_base64: str,
+        image_data: bytes,
+        media_type: str,
         algorithm: str,
         processing_space: str,
         avg_rgb_before: Optional[tuple[float, float, float]] = None,
         avg_rgb_after: Optional[tuple[float, float, float]] = None,
+        gains: Optional[tuple[float, float, float]] = None,
+        filename: Optional[str] = None,
+        estimation_size: Optional[tuple[int, int]] = None,
+        estimation_error_deg: Optional[float] = None,
+        output_format: str = "png",
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        encode_time_ms: Optional[float] = None,
+        cache_status: Optional[str] = None,
+        stage_times_ms: Optional[dict[str, float]] = None,
+        profile_id: Optional[str] = None,
+        profile_summary: Optional[str] = None,
     ):
         """Initialize processed image result.
 
         Args:
-            image_base64: Base64 encoded processed image.
+            image_data: Encoded processed image.
+            media_type: Media type of ``image_data``, for example ``image/png``.
             algorithm: Algorithm used for processing.
             processing_space: Color space used for processing.
             avg_rgb_before: Average RGB values before processing.
             avg_rgb_after: Average RGB values after processing.
+            gains: Per-channel gains applied by the algorithm.
+            filename: Original filename of the uploaded image.
+            estimation_size: (width, height) of the image gains were estimated on.
+            estimation_error_deg: Angular error of the proxy estimate against a
+                full-resolution estimate, if requested.
+            output_format: Format of ``image_data``.
+            width: Image width in pixels.
+            height: Image height in pixels.
+            encode_time_ms: Time spent encoding the output image.
+            cache_status: ``HIT`` or ``MISS`` if the result cache is enabled.
+            stage_times_ms: Time spent in each processing stage, in milliseconds.
+            profile_id: ID of the profile of this request, if it was profiled.
+            profile_summary: Table of the hottest operators or functions, if profiled.
         """
-        self.image_base64 = image_base64
+        self.image_data = image_data
+        self.media_type = media_type
         self.algorithm = algorithm
         self.processing_space = processing_space
         self.avg_rgb_before = avg_rgb_before
         self.avg_rgb_after = avg_rgb_after
+        self.gains = gains
+        self.filename = filename
+        self.estimation_size = estimation_size
+        self.estimation_error_deg = estimation_error_deg
+        self.output_format = output_format
+        self.width = width
+        self.height = height
+        self.encode_time_ms = encode_time_ms
+        self.cache_status = cache_status
+        self.stage_times_ms = stage_times_ms
+        self.profile_id = profile_id
+        self.profile_summary = profile_summary
+
+    @property
+    def output_bytes(self) -> int:
+        """Size of the encoded image in bytes."""
+        return len(self.image_data)
+
+    @property
+    def image_base64(self) -> str:
+        """Base64 encoded processed image, for embedding in JSON responses."""
+        return base64.b64encode(self.image_data).decode("utf-8")
+
+
+class IlluminantEstimate:
+    """Result of white balance estimation without applying the correction."""
+
+    def __init__(
+        self,
+        algorithm: str,
+        processing_space: str,
+        gains: tuple[float, float, float],
+        illuminant_rgb: tuple[float, float, float],
+        width: int,
+        height: int,
+        avg_rgb_before: Optional[tuple[float, float, float]] = None,
+        estimation_size: Optional[tuple[int, int]] = None,
+        estimation_error_deg: Optional[float] = None,
+        cache_status: Optional[str] = None,
+        stage_times_ms: Optional[dict[str, float]] = None,
+    ):
+        """Initialize illuminant estimate.
+
+        Args:
+            algorithm: Algorithm used for estimation.
+            processing_space: Color space the gains apply in.
+            gains: Per-channel gains that neutralize the illuminant.
+            illuminant_rgb: Estimated illuminant color, normalized to sum to one.
+            width: Image width in pixels.
+            height: Image height in pixels.
+            avg_rgb_before: Average RGB values of the input image.
+            estimation_size: (width, height) of the image gains were estimated on.
+            estimation_error_deg: Angular error of the proxy estimate against a
+                full-resolution estimate, if requested.
+            cache_status: ``HIT`` or ``MISS`` if the result cache is enabled.
+            stage_times_ms: Time spent in each processing stage, in milliseconds.
+        """
+        self.algorithm = algorithm
+        self.processing_space = processing_space
+        self.gains = gains
+        self.illuminant_rgb = illuminant_rgb
+        self.width = width
+        self.height = height
+        self.avg_rgb_before = avg_rgb_before
+        self.estimation_size = estimation_size
+        self.estimation_error_deg = estimation_error_deg
+        self.cache_status = cache_status
+        self.stage_times_ms = stage_times_ms
+
+
+class ComparisonResult:
+    """Results of several algorithms or parameter sets on one image."""
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        avg_rgb_before: tuple[float, float, float],
+        results: list[ProcessedImageResult],
+        contact_sheet: Optional[bytes] = None,
+        contact_sheet_size: Optional[tuple[int, int]] = None,
+        stage_times_ms: Optional[dict[str, float]] = None,
+    ):
+        """Initialize comparison result.
+
+        Args:
+            width: Image width in pixels.
+            height: Image height in pixels.
+            avg_rgb_before: Average RGB values of the input image.
+            results: One processed image per compared variant.
+            contact_sheet: Encoded side-by-side image of the input and all
+                results, if requested.
+            contact_sheet_size: (width, height) of the contact sheet.
+            stage_times_ms: Total time spent in each processing stage, in milliseconds.
+        """
+        self.width = width
+        self.height = height
+        self.avg_rgb_before = avg_rgb_before
+        self.results = results
+        self.contact_sheet = contact_sheet
+        self.contact_sheet_size = contact_sheet_size
+        self.stage_times_ms = stage_times_ms
+
+    @property
+    def contact_sheet_base64(self) -> Optional[str]:
+        """Base64 encoded contact sheet, for embedding in JSON responses."""
+        if self.contact_sheet is None:
+            return None
+        return base64.b64encode(self.contact_sheet).decode("utf-8")
+
+
+class SequenceResult:
+    """Results of white balancing the frames of a sequence."""
+
+    def __init__(
+        self,
+        frames: list[ProcessedImageResult],
+        estimated: list[bool],
+        scene_changes: list[bool],
+        elapsed_ms: float,
+        stage_times_ms: Optional[dict[str, float]] = None,
+    ):
+        """Initialize sequence result.
+
+        Args:
+            frames: One processed image per frame, in sequence order.
+            estimated: Whether gains were estimated on each frame.
+            scene_changes: Whether each frame starts a new scene.
+            elapsed_ms: Time spent decoding, processing and encoding all frames.
+            stage_times_ms: Total time spent in each processing stage, in milliseconds.
+        """
+        self.frames = frames
+        self.estimated = estimated
+        self.scene_changes = scene_changes
+        self.elapsed_ms = elapsed_ms
+        self.stage_times_ms = stage_times_ms
+
+    @property
+    def frames_per_second(self) -> float:
+        """Frames processed per second of processing time."""
+        return len(self.frames) * 1000.0 / max(self.elapsed_ms, 1e-6)
+
+
+class StoredImage:
+    """Decoded upload kept in memory for repeated processing."""
+
+    def __init__(
+        self,
+        image_id: str,
+        array: np.ndarray,
+        avg_rgb_before: tuple[float, float, float],
+        linear_tensor: Optional[torch.Tensor] = None,
+    ):
+        """Initialize stored image.
+
+        Args:
+            image_id: Identifier of the upload (its content hash).
+            array: Decoded image of shape (H, W, C) with dtype uint8.
+            avg_rgb_before: Average RGB values of the decoded image.
+            linear_tensor: Image linearized from sRGB, of shape (C, H, W), or
+                None if it was too large to keep.
+        """
+        self.image_id = image_id
+        self.array = array
+        self.avg_rgb_before = avg_rgb_before
+        self.linear_tensor = linear_tensor
+
+    @property
+    def width(self) -> int:
+        """Image width in pixels."""
+        return self.array.shape[1]
+
+    @property
+    def height(self) -> int:
+        """Image height in pixels."""
+        return self.array.shape[0]
+
+    @property
+    def size_bytes(self) -> int:
+        """Memory held by the decoded pixels."""
+        size = self.array.nbytes
+        if self.linear_tensor is not None:
+            size += self.linear_tensor.element_size() * self.linear_tensor.nelement()
+        return size
 
 
 class HistogramData:
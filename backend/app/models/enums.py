@@ -9,6 +9,9 @@ class WhiteBalanceAlgorithm(str, Enum):
     GREY_WORLD = "grey_world"
     WHITE_PATCH = "white_patch"
     GREY_EDGE = "grey_edge"
+    SHADES_OF_GREY = "shades_of_grey"
+    MAX_RGB = "max_rgb"
+    GENERAL_GREY_EDGE = "general_grey_edge"
 
 
 class ColorSpace(str, Enum):
@@ -17,3 +20,11 @@ class ColorSpace(str, Enum):
     SRGB = "sRGB"
     LINEAR_RGB = "linear_rgb"
 
+
+class OutputFormat(str, Enum):
+    """Encoded output image formats."""
+
+    PNG = "png"
+    JPEG = "jpeg"
+    WEBP = "webp"
+    RAW = "raw"
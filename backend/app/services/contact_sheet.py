@@ -0,0 +1,38 @@
+"""Side-by-side contact sheets of processed images."""
+
+import numpy as np
+from PIL import Image
+
+
+def make_contact_sheet(arrays: list[np.ndarray], cell_edge: int, gap: int = 8) -> np.ndarray:
+    """Lay out images left to right, each scaled to fit a square cell.
+
+    Args:
+        arrays: Images of shape (H, W, C) with dtype uint8, all of the same size.
+        cell_edge: Maximum long edge of each cell in pixels; images are only
+            ever scaled down.
+        gap: Width of the white separator between cells in pixels.
+
+    Returns:
+        Contact sheet of shape (H', W', C) with dtype uint8.
+    """
+    height, width = arrays[0].shape[:2]
+    scale = min(1.0, cell_edge / max(width, height))
+    cell_width = max(1, round(width * scale))
+    cell_height = max(1, round(height * scale))
+
+    sheet = np.full(
+        (cell_height, len(arrays) * cell_width + (len(arrays) - 1) * gap, 3),
+        255,
+        dtype=np.uint8,
+    )
+    for index, array in enumerate(arrays):
+        if (cell_width, cell_height) != (width, height):
+            array = np.asarray(
+                Image.fromarray(array).resize(
+                    (cell_width, cell_height), Image.Resampling.BOX, reducing_gap=2.0
+                )
+            )
+        left = index * (cell_width + gap)
+        sheet[:, left : left + cell_width] = array
+    return sheet
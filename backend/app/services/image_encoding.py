@@ -0,0 +1,76 @@
+"""Encoding of processed images to output formats."""
+
+import io
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+from app.core.config import settings
+from app.models.enums import OutputFormat
+
+MEDIA_TYPES: dict[OutputFormat, str] = {
+    OutputFormat.PNG: "image/png",
+    OutputFormat.JPEG: "image/jpeg",
+    OutputFormat.WEBP: "image/webp",
+    OutputFormat.RAW: "application/octet-stream",
+}
+
+PIL_FORMATS: dict[OutputFormat, str] = {
+    OutputFormat.PNG: "PNG",
+    OutputFormat.JPEG: "JPEG",
+    OutputFormat.WEBP: "WEBP",
+}
+
+# Pillow's WebP encoder exposes effort as ``method`` in 0 (fast) to 6 (slow)
+WEBP_MAX_METHOD = 6
+
+
+def resolve_compress_level(compress_level: Optional[int]) -> int:
+    """Resolve the PNG compression level, falling back to settings.
+
+    Args:
+        compress_level: Requested zlib level (0-9), or None.
+
+    Returns:
+        Compression level to use.
+    """
+    return settings.png_compress_level if compress_level is None else compress_level
+
+
+def encode_image(
+    array: np.ndarray,
+    output_format: OutputFormat,
+    quality: Optional[int] = None,
+    compress_level: Optional[int] = None,
+) -> bytes:
+    """Encode 8-bit pixels to the requested image format.
+
+    Args:
+        array: Array of shape (H, W, C) with dtype uint8.
+        output_format: Target format. ``raw`` returns the interleaved RGB bytes.
+        quality: JPEG/WebP quality (1-100), or None for the settings default.
+        compress_level: PNG zlib level (0-9) or WebP effort (0-6, higher values
+            are clamped), or None for the settings default of the format.
+
+    Returns:
+        Encoded image bytes.
+    """
+    if output_format == OutputFormat.RAW:
+        return np.ascontiguousarray(array).tobytes()
+
+    quality = settings.output_quality if quality is None else quality
+
+    options: dict[str, object]
+    if output_format == OutputFormat.PNG:
+        # optimize=True would search filter strategies at several times the cost
+        options = {"compress_level": resolve_compress_level(compress_level), "optimize": False}
+    elif output_format == OutputFormat.JPEG:
+        options = {"quality": quality}
+    else:
+        method = settings.webp_method if compress_level is None else compress_level
+        options = {"quality": quality, "method": min(method, WEBP_MAX_METHOD)}
+
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, format=PIL_FORMATS[output_format], **options)
+    return buffer.getvalue()
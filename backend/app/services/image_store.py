@@ -0,0 +1,153 @@
+"""In-memory store of decoded uploads, addressed by image ID.
+
+Comparing algorithms on one photo would otherwise re-upload, re-decode and
+re-linearize it for every request. Uploads registered here keep their
+decoded pixels, the linearized tensor and the "before" statistics, so
+later requests only run the algorithm and encode. Entries expire after a
+period without access and the least recently used entries are evicted when
+the store exceeds its memory budget.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import settings
+from app.core.errors import ImageNotFoundError
+from app.models.dto import StoredImage
+
+
+class ImageStore:
+    """Thread-safe LRU store of decoded images with a sliding TTL."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: float) -> None:
+        """Initialize the image store.
+
+        Args:
+            max_bytes: Memory budget for decoded images.
+            ttl_seconds: Time after the last access when an image expires.
+        """
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.size_bytes = 0
+        self._entries: OrderedDict[str, tuple[StoredImage, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Return the number of stored images."""
+        return len(self._entries)
+
+    def __contains__(self, image_id: str) -> bool:
+        """Check whether an image is stored and not expired."""
+        with self._lock:
+            self._expire(time.monotonic())
+            return image_id in self._entries
+
+    def put(self, image: StoredImage) -> bool:
+        """Store a decoded image, evicting least recently used images if needed.
+
+        Args:
+            image: Decoded image to store.
+
+        Returns:
+            False if the image alone exceeds the memory budget and was not stored.
+        """
+        if image.size_bytes > self.max_bytes:
+            return False
+
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            self._remove(image.image_id)
+            self._entries[image.image_id] = (image, now + self.ttl_seconds)
+            self.size_bytes += image.size_bytes
+
+            while self.size_bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size_bytes -= evicted.size_bytes
+        return True
+
+    def get(self, image_id: str) -> StoredImage:
+        """Look up a stored image and extend its lifetime.
+
+        Args:
+            image_id: Image ID returned when the image was stored.
+
+        Returns:
+            Stored image.
+
+        Raises:
+            ImageNotFoundError: If the image does not exist or has expired.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(image_id)
+            if entry is None:
+                raise ImageNotFoundError(f"Image {image_id} not found or expired")
+            self._entries[image_id] = (entry[0], now + self.ttl_seconds)
+            self._entries.move_to_end(image_id)
+            return entry[0]
+
+    def delete(self, image_id: str) -> None:
+        """Remove a stored image.
+
+        Args:
+            image_id: Image ID returned when the image was stored.
+
+        Raises:
+            ImageNotFoundError: If the image does not exist or has expired.
+        """
+        with self._lock:
+            self._expire(time.monotonic())
+            if not self._remove(image_id):
+                raise ImageNotFoundError(f"Image {image_id} not found or expired")
+
+    def _remove(self, image_id: str) -> bool:
+        """Remove an entry; must be called with the lock held.
+
+        Args:
+            image_id: Image ID.
+
+        Returns:
+            True if an entry was removed.
+        """
+        entry = self._entries.pop(image_id, None)
+        if entry is None:
+            return False
+        self.size_bytes -= entry[0].size_bytes
+        return True
+
+    def _expire(self, now: float) -> None:
+        """Drop expired entries; must be called with the lock held.
+
+        Entries are ordered by last access and share one TTL, so expired
+        entries are always at the front.
+
+        Args:
+            now: Current ``time.monotonic()`` value.
+        """
+        while self._entries:
+            image_id, (_, expires_at) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            self._remove(image_id)
+
+
+_image_store: Optional[ImageStore] = None
+
+
+def get_image_store() -> ImageStore:
+    """Get the shared image store configured from settings.
+
+    Returns:
+        Process-wide image store.
+    """
+    global _image_store
+    if _image_store is None:
+        _image_store = ImageStore(
+            max_bytes=settings.image_store_max_bytes,
+            ttl_seconds=settings.image_store_ttl_seconds,
+        )
+    return _image_store
@@ -0,0 +1,129 @@
+"""Opt-in profiling of individual processing jobs.
+
+A profiled job runs under ``torch.profiler`` (per-operator CPU time and
+memory allocations, with each processing stage as a labeled range) or under
+cProfile (Python function times, including Pillow decode and encode),
+depending on ``settings.profiler``. The report is a text table of the hottest
+entries; with ``settings.profile_dir`` set, the full trace is also written
+there: a Chrome trace (``<id>.json``, open in ``chrome://tracing`` or
+Perfetto) or a pstats dump (``<id>.prof``), next to the table (``<id>.txt``).
+"""
+
+import cProfile
+import io
+import pstats
+import threading
+import uuid
+from pathlib import Path
+from types import TracebackType
+from typing import NamedTuple, Optional
+
+import torch
+
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Rows of the summary table
+SUMMARY_ROWS = 30
+
+# Profilers are process-wide, so profiled jobs run one at a time
+_profile_lock = threading.Lock()
+
+
+class ProfileReport(NamedTuple):
+    """Outcome of a profiled job."""
+
+    profile_id: str
+    # Text table of the hottest operators or functions
+    summary: str
+    # Path of the stored trace, or None if traces are not stored
+    trace_path: Optional[str]
+
+
+class JobProfiler:
+    """Context manager that profiles the enclosed code if enabled.
+
+    Usage::
+
+        with JobProfiler(enabled) as profiler:
+            ...
+        report = profiler.report  # None unless enabled
+    """
+
+    def __init__(self, enabled: bool) -> None:
+        """Initialize the profiler.
+
+        Args:
+            enabled: Whether to profile; if False, the context manager does nothing.
+        """
+        self.enabled = enabled
+        self.report: Optional[ProfileReport] = None
+        self._torch_profiler: Optional[torch.profiler.profile] = None
+        self._cprofile: Optional[cProfile.Profile] = None
+
+    def __enter__(self) -> "JobProfiler":
+        """Start profiling."""
+        if not self.enabled:
+            return self
+        _profile_lock.acquire()
+        if settings.profiler == "torch":
+            self._torch_profiler = torch.profiler.profile(
+                activities=[torch.profiler.ProfilerActivity.CPU],
+                profile_memory=True,
+                record_shapes=True,
+            )
+            self._torch_profiler.__enter__()
+        else:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Stop profiling and build the report if the job succeeded."""
+        if not self.enabled:
+            return
+        try:
+            if self._torch_profiler is not None:
+                self._torch_profiler.__exit__(exc_type, exc, traceback)
+            else:
+                self._cprofile.disable()
+            if exc_type is None:
+                self.report = self._build_report()
+        finally:
+            _profile_lock.release()
+
+    def _build_report(self) -> ProfileReport:
+        """Summarize the profile and store the trace if configured."""
+        profile_id = uuid.uuid4().hex
+        directory = Path(settings.profile_dir) if settings.profile_dir else None
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+
+        trace_path = None
+        if self._torch_profiler is not None:
+            summary = self._torch_profiler.key_averages().table(
+                sort_by="self_cpu_time_total", row_limit=SUMMARY_ROWS
+            )
+            if directory is not None:
+                trace_path = str(directory / f"{profile_id}.json")
+                self._torch_profiler.export_chrome_trace(trace_path)
+        else:
+            buffer = io.StringIO()
+            stats = pstats.Stats(self._cprofile, stream=buffer)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(SUMMARY_ROWS)
+            summary = buffer.getvalue()
+            if directory is not None:
+                trace_path = str(directory / f"{profile_id}.prof")
+                stats.dump_stats(trace_path)
+
+        if directory is not None:
+            (directory / f"{profile_id}.txt").write_text(summary)
+        logger.info(f"Profile {profile_id} ({settings.profiler}):\n{summary}")
+        return ProfileReport(profile_id, summary, trace_path)
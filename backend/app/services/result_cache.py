@@ -0,0 +1,322 @@
+"""Result cache keyed on uploaded image content and request parameters.
+
+The explorer UI re-submits the same image whenever a setting is toggled
+back, so results are cached under a hash of the uploaded bytes plus the
+request fields. The in-memory cache is an LRU bounded by the encoded size
+of the cached results. Optionally, entries are also pickled to a directory
+so they survive restarts; the directory is pruned oldest-first to its own
+byte budget.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.api_schemas import WhiteBalanceRequest
+
+logger = get_logger(__name__)
+
+# Rough per-entry overhead for statistics and bookkeeping, in bytes
+ENTRY_OVERHEAD = 512
+
+CACHE_HIT = "HIT"
+CACHE_MISS = "MISS"
+
+
+def content_hash(image_bytes: bytes) -> str:
+    """Hash uploaded image bytes.
+
+    Args:
+        image_bytes: Encoded image bytes as uploaded.
+
+    Returns:
+        Hex digest of the content.
+    """
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def make_cache_key(kind: str, image_hash: str, request: WhiteBalanceRequest) -> str:
+    """Build a cache key for an upload and its processing parameters.
+
+    Args:
+        kind: Operation name, for example ``"apply"`` or ``"estimate"``.
+        image_hash: Content hash of the upload from :func:`content_hash`.
+        request: White balance request parameters.
+
+    Returns:
+        Hex digest identifying the result.
+    """
+    digest = hashlib.sha256(kind.encode())
+    digest.update(image_hash.encode())
+    digest.update(request.model_dump_json().encode())
+    # Outputs depend on the configured precision, and disk entries outlive restarts
+    digest.update(settings.processing_dtype.encode())
+    # The default estimation proxy is also configured, not part of the request
+    digest.update(f"{settings.estimation_max_edge}:{settings.estimation_budget_ms}".encode())
+    return digest.hexdigest()
+
+
+def _entry_size(value: Any) -> int:
+    """Estimate the memory held by a cached result.
+
+    Args:
+        value: Cached result.
+
+    Returns:
+        Approximate size in bytes.
+    """
+    return getattr(value, "output_bytes", 0) + ENTRY_OVERHEAD
+
+
+class ResultCache:
+    """Thread-safe LRU cache bounded by total result size."""
+
+    def __init__(
+        self,
+        max_bytes: int,
+        directory: Optional[str] = None,
+        disk_max_bytes: int = 0,
+    ) -> None:
+        """Initialize the result cache.
+
+        Args:
+            max_bytes: Memory budget; 0 disables caching.
+            directory: Directory to persist entries to, or None for memory only.
+            disk_max_bytes: Byte budget of the persistence directory.
+        """
+        self.max_bytes = max_bytes
+        self.directory = Path(directory) if directory else None
+        self.disk_max_bytes = disk_max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size_bytes = 0
+        self._entries: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        if self.enabled and self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether results are cached at all."""
+        return self.max_bytes > 0
+
+    def __len__(self) -> int:
+        """Return the number of entries held in memory."""
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Look up a result, falling back to the persistence directory.
+
+        Args:
+            key: Cache key from :func:`make_cache_key`.
+
+        Returns:
+            Cached result, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        value = self._load(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._insert(key, value)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """Store a result, evicting least recently used entries if needed.
+
+        Args:
+            key: Cache key from :func:`make_cache_key`.
+            value: Result to cache; must be picklable when persisting.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._insert(key, value)
+        self._store(key, value)
+
+    def clear(self) -> None:
+        """Drop all in-memory entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def _insert(self, key: str, value: Any) -> None:
+        """Insert an entry and evict down to the memory budget.
+
+        Must be called with the lock held.
+
+        Args:
+            key: Cache key.
+            value: Result to cache.
+        """
+        size = _entry_size(value)
+        if size > self.max_bytes:
+            return
+
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size_bytes -= previous[1]
+        self._entries[key] = (value, size)
+        self.size_bytes += size
+
+        while self.size_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.size_bytes -= evicted_size
+            self.evictions += 1
+
+    def _path(self, key: str) -> Path:
+        """Return the persistence path of a key."""
+        return self.directory / f"{key}.pkl"
+
+    def _load(self, key: str) -> Optional[Any]:
+        """Load a persisted entry.
+
+        Args:
+            key: Cache key.
+
+        Returns:
+            Persisted result, or None if missing or unreadable.
+        """
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            with path.open("rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+        # Refresh the modification time so pruning keeps recently used entries
+        os.utime(path)
+        return value
+
+    def _store(self, key: str, value: Any) -> None:
+        """Persist an entry and prune the directory to its byte budget.
+
+        Args:
+            key: Cache key.
+            value: Result to persist.
+        """
+        if self.directory is None:
+            return
+        path = self._path(key)
+        temp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            with temp_path.open("wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to persist cache entry {path.name}: {e}")
+            temp_path.unlink(missing_ok=True)
+            return
+        self._prune_directory()
+
+    def _prune_directory(self) -> None:
+        """Delete the least recently used persisted entries over the byte budget."""
+        files = []
+        total = 0
+        for path in self.directory.glob("*.pkl"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """Get the shared result cache configured from settings.
+
+    Returns:
+        Process-wide result cache.
+    """
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache(
+            max_bytes=settings.result_cache_max_bytes,
+            directory=settings.result_cache_dir,
+            disk_max_bytes=settings.result_cache_disk_max_bytes,
+        )
+    return _result_cache
+
+
+def _hit_ratio() -> float:
+    """Fraction of result cache lookups served from the cache."""
+    cache = get_result_cache()
+    lookups = cache.hits + cache.misses
+    return cache.hits / lookups if lookups else 0.0
+
+
+metrics.register(
+    metrics.CallbackMetric(
+        "white_balance_result_cache_hits_total",
+        "Result cache lookups served from the cache.",
+        "counter",
+        lambda: get_result_cache().hits,
+    )
+)
+metrics.register(
+    metrics.CallbackMetric(
+        "white_balance_result_cache_misses_total",
+        "Result cache lookups that had to be computed.",
+        "counter",
+        lambda: get_result_cache().misses,
+    )
+)
+metrics.register(
+    metrics.CallbackMetric(
+        "white_balance_result_cache_evictions_total",
+        "Results evicted from the in-memory cache.",
+        "counter",
+        lambda: get_result_cache().evictions,
+    )
+)
+metrics.register(
+    metrics.CallbackMetric(
+        "white_balance_result_cache_hit_ratio",
+        "Fraction of result cache lookups served from the cache.",
+        "gauge",
+        _hit_ratio,
+    )
+)
+metrics.register(
+    metrics.CallbackMetric(
+        "white_balance_result_cache_bytes",
+        "Memory held by cached results in bytes.",
+        "gauge",
+        lambda: get_result_cache().size_bytes,
+    )
+)
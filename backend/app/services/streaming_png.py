@@ -0,0 +1,94 @@
+"""Incremental PNG encoder for row-band output."""
+
+import struct
+import zlib
+from typing import BinaryIO
+
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class StreamingPngWriter:
+    """Write an 8-bit RGB PNG one band of rows at a time.
+
+    Pillow needs the whole image in memory to encode it. This writer instead
+    compresses rows as they arrive and emits IDAT chunks to ``stream``, so
+    only the compressor state and the current band are held in memory.
+    """
+
+    def __init__(
+        self,
+        stream: BinaryIO,
+        width: int,
+        height: int,
+        compress_level: int = 6,
+        chunk_size: int = 1 << 16,
+    ):
+        """Initialize the writer and emit the PNG header.
+
+        Args:
+            stream: Binary stream the PNG is written to.
+            width: Image width in pixels.
+            height: Image height in pixels.
+            compress_level: zlib compression level (0-9).
+            chunk_size: Target size of emitted IDAT chunks in bytes.
+        """
+        self.stream = stream
+        self.width = width
+        self.height = height
+        self.chunk_size = chunk_size
+        self.rows_written = 0
+        self._compressor = zlib.compressobj(compress_level)
+        self._pending = bytearray()
+
+        stream.write(PNG_SIGNATURE)
+        # Bit depth 8, color type 2 (RGB), default compression, filter and interlace
+        self._write_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def write_rows(self, rows: np.ndarray) -> None:
+        """Append rows to the image.
+
+        Args:
+            rows: Array of shape (H, W, 3) with dtype uint8.
+        """
+        if rows.shape[1:] != (self.width, 3) or rows.dtype != np.uint8:
+            raise ValueError(f"Expected uint8 rows of shape (H, {self.width}, 3), got {rows.shape}")
+
+        # Every scanline is prefixed with its filter type (0 = None)
+        scanlines = np.zeros((rows.shape[0], self.width * 3 + 1), dtype=np.uint8)
+        scanlines[:, 1:] = rows.reshape(rows.shape[0], -1)
+        self._pending += self._compressor.compress(scanlines.tobytes())
+        self.rows_written += rows.shape[0]
+        self._flush_chunks(final=False)
+
+    def close(self) -> None:
+        """Finish compression and write the trailing chunks."""
+        if self.rows_written != self.height:
+            raise ValueError(f"Wrote {self.rows_written} rows, expected {self.height}")
+        self._pending += self._compressor.flush()
+        self._flush_chunks(final=True)
+        self._write_chunk(b"IEND", b"")
+
+    def _flush_chunks(self, final: bool) -> None:
+        """Emit buffered compressed data as IDAT chunks.
+
+        Args:
+            final: Whether to emit the remaining data even if below chunk size.
+        """
+        while len(self._pending) >= self.chunk_size or (final and self._pending):
+            data = bytes(self._pending[: self.chunk_size])
+            del self._pending[: self.chunk_size]
+            self._write_chunk(b"IDAT", data)
+
+    def _write_chunk(self, chunk_type: bytes, data: bytes) -> None:
+        """Write a single PNG chunk.
+
+        Args:
+            chunk_type: Four-byte chunk type.
+            data: Chunk payload.
+        """
+        self.stream.write(struct.pack(">I", len(data)))
+        self.stream.write(chunk_type)
+        self.stream.write(data)
+        self.stream.write(struct.pack(">I", zlib.crc32(chunk_type + data) & 0xFFFFFFFF))
@@ -0,0 +1,126 @@
+"""Reading uploads within the configured size limits.
+
+Starlette spools multipart file parts to a temporary file (in memory up to
+1 MiB, on disk beyond), so an upload costs no memory until it is read.
+Before reading, the declared size and the image header are checked against
+``settings.max_upload_bytes`` and ``settings.max_image_megapixels``; Pillow
+parses the header without decoding pixels, so oversized images and
+decompression bombs are rejected with :class:`PayloadTooLargeError` at
+little cost. Accepted uploads are then read in chunks, stopping as soon as
+the byte limit is exceeded.
+"""
+
+import io
+from typing import Optional
+
+from fastapi import UploadFile
+from PIL import Image
+
+from app.core.config import settings
+from app.core.errors import PayloadTooLargeError
+
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+
+def max_image_pixels() -> Optional[int]:
+    """Get the pixel limit from ``settings.max_image_megapixels``.
+
+    Returns:
+        Maximum number of pixels per image, or None if unlimited.
+    """
+    limit = settings.max_image_megapixels
+    return None if limit is None else int(limit * 1_000_000)
+
+
+def configure_pillow_limits() -> None:
+    """Align Pillow's decompression bomb guard with the pixel limit.
+
+    The guard is process-wide and backs up the pixel limit of every decode,
+    so it is configured once when the application starts.
+    """
+    Image.MAX_IMAGE_PIXELS = max_image_pixels()
+
+
+def check_upload_bytes(size: int, name: str = "Upload") -> None:
+    """Check an upload size against the byte limit.
+
+    Args:
+        size: Upload size in bytes.
+        name: Name of the upload for the error message.
+
+    Raises:
+        PayloadTooLargeError: If the upload is too large.
+    """
+    limit = settings.max_upload_bytes
+    if limit is not None and size > limit:
+        raise PayloadTooLargeError(f"{name} exceeds the maximum upload size of {limit} bytes")
+
+
+def check_image_size(width: int, height: int, name: str = "Image") -> None:
+    """Check image dimensions against the pixel limit.
+
+    Args:
+        width: Image width in pixels.
+        height: Image height in pixels.
+        name: Name of the image for the error message.
+
+    Raises:
+        PayloadTooLargeError: If the image has too many pixels.
+    """
+    limit = max_image_pixels()
+    if limit is not None and width * height > limit:
+        raise PayloadTooLargeError(
+            f"{name} is {width}x{height} pixels ({width * height / 1e6:.3g} MP), "
+            f"the maximum is {limit / 1e6:g} MP"
+        )
+
+
+def check_image_header(file: UploadFile) -> None:
+    """Check the dimensions in an upload's image header without decoding pixels.
+
+    Uploads Pillow cannot identify are left to the decoder to report.
+
+    Args:
+        file: Uploaded image file, positioned at its start.
+
+    Raises:
+        PayloadTooLargeError: If the image has too many pixels.
+    """
+    try:
+        with Image.open(file.file) as image:
+            width, height = image.size
+    except PayloadTooLargeError:
+        raise
+    except Image.DecompressionBombError as e:
+        raise PayloadTooLargeError(f"{file.filename or 'Image'}: {e}") from e
+    except Exception:
+        return
+    finally:
+        file.file.seek(0)
+    check_image_size(width, height, file.filename or "Image")
+
+
+async def read_upload(file: UploadFile) -> bytes:
+    """Read an upload after checking its size and image header against the limits.
+
+    Args:
+        file: Uploaded image file.
+
+    Returns:
+        Encoded image bytes.
+
+    Raises:
+        PayloadTooLargeError: If the upload or its image exceeds the limits.
+    """
+    name = file.filename or "Upload"
+    if file.size is not None:
+        check_upload_bytes(file.size, name)
+    await file.seek(0)
+    check_image_header(file)
+
+    # BytesIO hands over its buffer without a final copy
+    buffer = io.BytesIO()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        buffer.write(chunk)
+        check_upload_bytes(buffer.tell(), name)
+    return buffer.getvalue()
@@ -1,151 +1,1796 @@
 """White balance service for orchestrating image processing."""
 
-import base64
+import copy
 import io
-from typing import Optional
+import math
+import time
+from typing import Any, AsyncIterator, Callable, Optional, TypeVar
 
+import numpy as np
+import torch
 from fastapi import UploadFile
-from PIL import Image
+from PIL import Image, ImageSequence
 
-from app.core.errors import InvalidImageError, UnsupportedAlgorithmError
+from app.core import metrics
+from app.core.config import settings
+from app.core.errors import (
+    InvalidImageError,
+    PayloadTooLargeError,
+    UnsupportedAlgorithmError,
+    WhiteBalanceError,
+)
 from app.core.logging import get_logger
-from app.engine import color_spaces, utils
-from app.engine.white_balance_grey_edge import apply_grey_edge
-from app.engine.white_balance_grey_world import apply_grey_world
-from app.engine.white_balance_white_patch import apply_white_patch
-from app.models.api_schemas import WhiteBalanceRequest
-from app.models.dto import ProcessedImageResult
-from app.models.enums import ColorSpace, WhiteBalanceAlgorithm
+from app.engine import color_spaces, registry, tiling, utils
+from app.engine.statistics import ImageStatistics
+from app.engine.temporal import TemporalGainSmoother
+from app.models.api_schemas import SequenceOptions, WhiteBalanceRequest
+from app.models.dto import (
+    ComparisonResult,
+    IlluminantEstimate,
+    ProcessedImageResult,
+    SequenceResult,
+    StoredImage,
+)
+from app.models.enums import ColorSpace, OutputFormat, WhiteBalanceAlgorithm
+from app.services.contact_sheet import make_contact_sheet
+from app.services.image_encoding import MEDIA_TYPES, encode_image, resolve_compress_level
+from app.services.image_store import get_image_store
+from app.services.profiling import JobProfiler
+from app.services.result_cache import (
+    CACHE_HIT,
+    CACHE_MISS,
+    content_hash,
+    get_result_cache,
+    make_cache_key,
+)
+from app.services.streaming_png import StreamingPngWriter
+from app.services.uploads import check_image_size, read_upload
+from app.services.worker_pool import get_worker_pool
 
 logger = get_logger(__name__)
 
+CachedResult = TypeVar("CachedResult", ProcessedImageResult, IlluminantEstimate)
+
 
 class WhiteBalanceService:
     """Service for applying white balance algorithms to images."""
 
     async def apply(
-        self, file: UploadFile, request: WhiteBalanceRequest
+        self, file: UploadFile, request: WhiteBalanceRequest, profile: bool = False
     ) -> ProcessedImageResult:
         """Apply white balance algorithm to uploaded image.
 
         Args:
             file: Uploaded image file.
             request: White balance request parameters.
+            profile: Whether to profile processing; profiled requests bypass the
+                result cache.
 
         Returns:
             Processed image result.
 
+        Raises:
+            WhiteBalanceError: If profiling is requested but disabled.
+            InvalidImageError: If image cannot be loaded.
+            UnsupportedAlgorithmError: If algorithm is not supported.
+            ServiceBusyError: If the processing queue is full.
+        """
+        if profile and not settings.profiling_enabled:
+            raise WhiteBalanceError("Profiling is disabled on this server")
+
+        # Read image bytes, then decode and process off the event loop
+        image_bytes = await read_upload(file)
+        if profile:
+            result = await get_worker_pool().run(self._apply_bytes, image_bytes, request, True)
+        else:
+            key = make_cache_key("apply", content_hash(image_bytes), request)
+            result = await self._run_cached(key, self._apply_bytes, image_bytes, request)
+        self._record_apply_metrics(result, len(image_bytes))
+        return result
+
+    async def estimate(
+        self, file: UploadFile, request: WhiteBalanceRequest
+    ) -> IlluminantEstimate:
+        """Estimate white balance gains without producing an output image.
+
+        Runs decoding, optional linearization and the algorithm's estimation
+        step only; gains are not applied and nothing is encoded.
+
+        Args:
+            file: Uploaded image file.
+            request: White balance request parameters.
+
+        Returns:
+            Estimated gains and illuminant color.
+
         Raises:
             InvalidImageError: If image cannot be loaded.
             UnsupportedAlgorithmError: If algorithm is not supported.
+            ServiceBusyError: If the processing queue is full.
+        """
+        # Read image bytes, then decode and analyze off the event loop
+        image_bytes = await read_upload(file)
+        key = make_cache_key("estimate", content_hash(image_bytes), request)
+        result = await self._run_cached(key, self._estimate_bytes, image_bytes, request)
+        self._record_estimate_metrics(result, len(image_bytes))
+        return result
+
+    async def apply_batch(
+        self, files: list[UploadFile], request: WhiteBalanceRequest
+    ) -> list[ProcessedImageResult]:
+        """Apply white balance algorithm to many uploaded images.
+
+        Images with the same dimensions are stacked into (N, C, H, W)
+        tensors of at most ``settings.batch_max_pixels`` pixels and
+        processed together. Each such chunk is read, decoded and processed
+        as its own job, so only one chunk is held in memory at a time.
+
+        Args:
+            files: Uploaded image files.
+            request: White balance request parameters.
+
+        Returns:
+            Processed image results, in the same order as ``files``.
+
+        Raises:
+            WhiteBalanceError: If the batch is empty or too large.
+            InvalidImageError: If an image cannot be loaded.
+            UnsupportedAlgorithmError: If algorithm is not supported.
+            ServiceBusyError: If the processing queue is full.
+        """
+        if not files:
+            raise WhiteBalanceError("Batch must contain at least one image")
+        if len(files) > settings.max_batch_size:
+            raise WhiteBalanceError(
+                f"Batch contains {len(files)} images, maximum is {settings.max_batch_size}"
+            )
+
+        # Read the uploads one at a time, serve what we can from the cache and
+        # note the size of the others from their image headers
+        cache = get_result_cache()
+        keys: list[str] = []
+        request_bytes: list[int] = []
+        sizes: dict[int, Optional[tuple[int, int]]] = {}
+        results: list[Optional[ProcessedImageResult]] = []
+        for index, file in enumerate(files):
+            image_bytes = await read_upload(file)
+            keys.append(make_cache_key("apply", content_hash(image_bytes), request))
+            request_bytes.append(len(image_bytes))
+            cached = cache.get(keys[-1])
+            if cached is not None:
+                cached = self._with_cache_status(cached, CACHE_HIT)
+                cached.filename = file.filename
+            else:
+                sizes[index] = self._header_size(image_bytes)
+            results.append(cached)
+
+        # Read, decode and process the remaining images chunk by chunk
+        for chunk in self._batch_chunks(sizes, request):
+            uploads = [(files[index].filename, await read_upload(files[index])) for index in chunk]
+            processed = await get_worker_pool().run(self._apply_batch_bytes, uploads, request)
+            del uploads
+            for index, result in zip(chunk, processed):
+                cache.put(keys[index], result)
+                results[index] = self._with_cache_status(result, CACHE_MISS)
+
+        for result, size in zip(results, request_bytes):
+            self._record_apply_metrics(result, size, "batch")
+        return results
+
+    def _header_size(self, image_bytes: bytes) -> Optional[tuple[int, int]]:
+        """Read the dimensions from an image header without decoding pixels.
+
+        Args:
+            image_bytes: Encoded image bytes.
+
+        Returns:
+            (width, height) of the image, or None if Pillow cannot identify it.
         """
         try:
-            # Read image bytes
-            image_bytes = await file.read()
-
-            # Load image with Pillow
-            try:
-                image = Image.open(io.BytesIO(image_bytes))
-            except Exception as e:
-                raise InvalidImageError(f"Failed to load image: {e}") from e
-
-            # Convert to tensor
-            tensor = utils.image_to_tensor(image)
-
-            # Compute average RGB before processing
-            avg_rgb_before = utils.compute_average_rgb(tensor)
-
-            # Handle color space conversion (pre-processing)
-            # Convert string values to enums for comparison
-            input_space_str = (
-                str(request.input_color_space)
-                if not isinstance(request.input_color_space, str)
-                else request.input_color_space
-            )
-            processing_space_str = (
-                str(request.processing_space)
-                if not isinstance(request.processing_space, str)
-                else request.processing_space
-            )
-
-            input_space = ColorSpace(input_space_str)
-            processing_space_enum = ColorSpace(processing_space_str)
-
-            if (
-                input_space == ColorSpace.SRGB
-                and processing_space_enum == ColorSpace.LINEAR_RGB
-            ):
-                tensor = color_spaces.srgb_to_linear(tensor)
-                logger.debug("Converted sRGB to linear RGB for processing")
-
-            # Apply white balance algorithm
-            # Convert string value to enum for comparison
-            algorithm_str = (
-                str(request.algorithm)
-                if not isinstance(request.algorithm, str)
-                else request.algorithm
-            )
-            algorithm = WhiteBalanceAlgorithm(algorithm_str)
-            balanced_tensor = self._apply_algorithm(tensor, algorithm)
-
-            # Handle color space conversion (post-processing)
-            if (
-                input_space == ColorSpace.SRGB
-                and processing_space_enum == ColorSpace.LINEAR_RGB
-            ):
-                balanced_tensor = color_spaces.linear_to_srgb(balanced_tensor)
-                logger.debug("Converted linear RGB back to sRGB for display")
+            with Image.open(io.BytesIO(image_bytes)) as image:
+                return image.size
+        except Exception:
+            return None
 
-            # Compute average RGB after processing
-            avg_rgb_after = utils.compute_average_rgb(balanced_tensor)
+    def _batch_chunks(
+        self, sizes: dict[int, Optional[tuple[int, int]]], request: WhiteBalanceRequest
+    ) -> list[list[int]]:
+        """Split batch images into chunks that are decoded and processed together.
+
+        Images of the same size are grouped, if the algorithm supports
+        batches, and each group is split so that a chunk holds at most
+        ``settings.batch_max_pixels`` pixels, but at least one image.
+
+        Args:
+            sizes: (width, height) of each image by index, None if unknown.
+            request: White balance request parameters.
+
+        Returns:
+            Image indices of each chunk.
+        """
+        batched = self._algorithm_spec(request).batched
+        chunks: list[list[int]] = []
+        groups: dict[tuple[int, int], list[int]] = {}
+        for index, size in sizes.items():
+            if batched and size is not None:
+                groups.setdefault(size, []).append(index)
+            else:
+                chunks.append([index])
+
+        for (width, height), indices in groups.items():
+            per_chunk = max(1, settings.batch_max_pixels // max(1, width * height))
+            chunks += [indices[i : i + per_chunk] for i in range(0, len(indices), per_chunk)]
+        return chunks
+
+    async def apply_sequence(
+        self, files: list[UploadFile], request: WhiteBalanceRequest, options: SequenceOptions
+    ) -> AsyncIterator[SequenceResult]:
+        """Apply white balance to the frames of a sequence with smoothed gains.
+
+        Frames are the uploads in order, each contributing all of its frames
+        if it is an animated image (GIF, APNG, WebP). Uploads are read and
+        processed one job at a time, and their frames are yielded as soon as
+        they are encoded, so only one upload and its output are held in
+        memory. Gains are only estimated every few frames or on a scene
+        change, and the applied gains follow the estimates with a moving
+        average. Results are not cached, since every frame depends on the
+        ones before it.
+
+        Args:
+            files: Uploaded frames or animated images, in sequence order.
+            request: White balance request parameters.
+            options: Re-estimation and smoothing options.
+
+        Yields:
+            Processed frames of each upload, in sequence order.
+
+        Raises:
+            WhiteBalanceError: If the sequence is empty or too long.
+            InvalidImageError: If a frame cannot be loaded.
+            UnsupportedAlgorithmError: If algorithm is not supported.
+            ServiceBusyError: If the processing queue is full.
+        """
+        if not files:
+            raise WhiteBalanceError("Sequence must contain at least one frame")
+        if len(files) > settings.max_sequence_frames:
+            raise WhiteBalanceError(
+                f"Sequence contains {len(files)} frames, "
+                f"maximum is {settings.max_sequence_frames}"
+            )
+
+        # The smoother is passed to every job and returned updated, which also
+        # works when process workers receive a copy of it
+        smoother = self._sequence_smoother(options)
+        frame_count = 0
+        estimation_size = (0, 0)
+        for file in files:
+            image_bytes = await read_upload(file)
+            result, smoother = await get_worker_pool().run(
+                self._apply_sequence_bytes,
+                file.filename,
+                image_bytes,
+                request,
+                smoother,
+                frame_count,
+                estimation_size,
+            )
+            frame_count += len(result.frames)
+            estimation_size = result.frames[-1].estimation_size
+            metrics.REQUEST_BYTES.observe(len(image_bytes))
+            for frame in result.frames:
+                self._record_apply_metrics(frame, operation="sequence")
+            yield result
+
+    async def upload(self, file: UploadFile) -> StoredImage:
+        """Decode an upload once and keep it for later requests by image ID.
+
+        The image ID is the content hash of the upload, so uploading the same
+        file again returns the existing entry without decoding it.
 
-            # Convert tensor back to image
-            processed_image = utils.tensor_to_image(balanced_tensor)
+        Args:
+            file: Uploaded image file.
+
+        Returns:
+            Stored image.
 
-            # Convert to base64
-            buffer = io.BytesIO()
-            processed_image.save(buffer, format="PNG")
-            image_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
+        Raises:
+            WhiteBalanceError: If the decoded image exceeds the store's budget.
+            InvalidImageError: If image cannot be loaded.
+            ServiceBusyError: If the processing queue is full.
+        """
+        image_bytes = await read_upload(file)
+        image_id = content_hash(image_bytes)
 
-            # Get string values from enums
-            algorithm_result_str = algorithm.value
-            processing_space_result_str = processing_space_enum.value
+        store = get_image_store()
+        if image_id in store:
+            return store.get(image_id)
 
-            return ProcessedImageResult(
-                image_base64=image_base64,
-                algorithm=algorithm_result_str,
-                processing_space=processing_space_result_str,
-                avg_rgb_before=avg_rgb_before,
-                avg_rgb_after=avg_rgb_after,
+        stored = await get_worker_pool().run(
+            self._decode_for_store, image_id, image_bytes, in_process=True
+        )
+        if not store.put(stored):
+            raise WhiteBalanceError(
+                f"Decoded image needs {stored.size_bytes} bytes, more than the image store "
+                f"holds ({store.max_bytes}); use /apply instead"
             )
+        return stored
+
+    async def apply_stored(
+        self, image_id: str, request: WhiteBalanceRequest
+    ) -> ProcessedImageResult:
+        """Apply white balance to a previously uploaded image.
+
+        Args:
+            image_id: Image ID returned by :meth:`upload`.
+            request: White balance request parameters.
+
+        Returns:
+            Processed image result.
+
+        Raises:
+            ImageNotFoundError: If the image does not exist or has expired.
+            UnsupportedAlgorithmError: If algorithm is not supported.
+            ServiceBusyError: If the processing queue is full.
+        """
+        stored = get_image_store().get(image_id)
+        key = make_cache_key("apply", image_id, request)
+        result = await self._run_cached(key, self._apply_stored, stored, request, in_process=True)
+        self._record_apply_metrics(result)
+        return result
+
+    async def estimate_stored(
+        self, image_id: str, request: WhiteBalanceRequest
+    ) -> IlluminantEstimate:
+        """Estimate white balance gains for a previously uploaded image.
+
+        Args:
+            image_id: Image ID returned by :meth:`upload`.
+            request: White balance request parameters.
+
+        Returns:
+            Estimated gains and illuminant color.
+
+        Raises:
+            ImageNotFoundError: If the image does not exist or has expired.
+            UnsupportedAlgorithmError: If algorithm is not supported.
+            ServiceBusyError: If the processing queue is full.
+        """
+        stored = get_image_store().get(image_id)
+        key = make_cache_key("estimate", image_id, request)
+        result = await self._run_cached(
+            key, self._estimate_stored, stored, request, in_process=True
+        )
+        self._record_estimate_metrics(result)
+        return result
+
+    async def compare(
+        self,
+        file: Optional[UploadFile],
+        image_id: Optional[str],
+        requests: list[WhiteBalanceRequest],
+        contact_sheet: bool = False,
+    ) -> ComparisonResult:
+        """Run several algorithms or parameter sets on one image.
+
+        The image is decoded and converted once per processing color space,
+        and intermediate statistics are shared between variants.
+
+        Args:
+            file: Uploaded image file, or None if ``image_id`` is given.
+            image_id: Image ID returned by :meth:`upload`, or None if ``file`` is given.
+            requests: White balance request parameters, one per variant.
+            contact_sheet: Whether to also return a side-by-side image of the
+                input and all results.
+
+        Returns:
+            Comparison with one processed image per variant.
+
+        Raises:
+            WhiteBalanceError: If the image source or the number of variants is invalid.
+            ImageNotFoundError: If ``image_id`` does not exist or has expired.
+            InvalidImageError: If image cannot be loaded.
+            UnsupportedAlgorithmError: If an algorithm is not supported.
+            ServiceBusyError: If the processing queue is full.
+        """
+        if (file is None) == (image_id is None):
+            raise WhiteBalanceError("Provide either an image file or an image_id")
+        if not requests:
+            raise WhiteBalanceError("Comparison must contain at least one variant")
+        if len(requests) > settings.max_compare_variants:
+            raise WhiteBalanceError(
+                f"Comparison contains {len(requests)} variants, "
+                f"maximum is {settings.max_compare_variants}"
+            )
+
+        request_bytes = None
+        if image_id is not None:
+            stored = get_image_store().get(image_id)
+            result = await get_worker_pool().run(
+                self._compare_stored, stored, requests, contact_sheet, in_process=True
+            )
+        else:
+            image_bytes = await read_upload(file)
+            request_bytes = len(image_bytes)
+            result = await get_worker_pool().run(
+                self._compare_bytes, image_bytes, requests, contact_sheet
+            )
+
+        if request_bytes is not None:
+            metrics.REQUEST_BYTES.observe(request_bytes)
+        for variant in result.results:
+            self._record_apply_metrics(variant, operation="compare")
+        return result
+
+    def list_algorithms(self) -> list[registry.AlgorithmSpec]:
+        """List the registered algorithms with their parameters and capabilities.
+
+        Returns:
+            Algorithm descriptions in registration order.
+        """
+        return registry.list_algorithms()
+
+    async def _run_cached(
+        self, key: str, func: Callable[..., CachedResult], *args: Any, in_process: bool = False
+    ) -> CachedResult:
+        """Serve a result from the result cache, or compute it in the worker pool.
+
+        Args:
+            key: Result cache key.
+            func: Synchronous function computing the result.
+            *args: Positional arguments for ``func``.
+            in_process: Whether ``func`` must run in this process, see
+                :meth:`WorkerPool.run`.
+
+        Returns:
+            Cached or freshly computed result, tagged with its cache status.
+        """
+        cache = get_result_cache()
+        cached = cache.get(key)
+        if cached is not None:
+            return self._with_cache_status(cached, CACHE_HIT)
+
+        result = await get_worker_pool().run(func, *args, in_process=in_process)
+        cache.put(key, result)
+        return self._with_cache_status(result, CACHE_MISS)
+
+    def _apply_bytes(
+        self, image_bytes: bytes, request: WhiteBalanceRequest, profile: bool = False
+    ) -> ProcessedImageResult:
+        """Apply white balance to an encoded image.
+
+        Args:
+            image_bytes: Encoded image bytes.
+            request: White balance request parameters.
+            profile: Whether to profile processing and attach the report.
+
+        Returns:
+            Processed image result.
+
+        Raises:
+            InvalidImageError: If image cannot be loaded.
+            UnsupportedAlgorithmError: If algorithm is not supported.
+        """
+        try:
+            with JobProfiler(profile) as profiler, metrics.collect_stage_times() as stage_times:
+                # Load image with Pillow
+                image = self._load_image(image_bytes)
+
+                # Very large images are processed band by band to bound memory
+                if self._should_tile(*image.size):
+                    result = self._apply_tiled(image, request)
+                else:
+                    # Decode to 8-bit pixels
+                    with metrics.stage("decode"):
+                        array = utils.image_to_array(image)
+                    result = self._process_group([array], request)[0]
+            result.stage_times_ms = stage_times
+            if profiler.report is not None:
+                result.profile_id = profiler.report.profile_id
+                result.profile_summary = profiler.report.summary
+            return result
 
-        except (InvalidImageError, UnsupportedAlgorithmError):
+        except (InvalidImageError, PayloadTooLargeError, UnsupportedAlgorithmError):
             raise
         except Exception as e:
             logger.error(f"Unexpected error during white balance processing: {e}")
             raise InvalidImageError(f"Failed to process image: {e}") from e
 
-    def _apply_algorithm(
-        self, tensor: "torch.Tensor", algorithm: WhiteBalanceAlgorithm
-    ) -> "torch.Tensor":
-        """Apply the specified white balance algorithm.
+    def _estimate_bytes(
+        self, image_bytes: bytes, request: WhiteBalanceRequest
+    ) -> IlluminantEstimate:
+        """Estimate white balance gains for an encoded image.
+
+        Args:
+            image_bytes: Encoded image bytes.
+            request: White balance request parameters.
+
+        Returns:
+            Estimated gains and illuminant color.
+
+        Raises:
+            InvalidImageError: If image cannot be loaded.
+            UnsupportedAlgorithmError: If algorithm is not supported.
+        """
+        try:
+            with metrics.collect_stage_times() as stage_times:
+                result = self._estimate_image(image_bytes, request)
+            result.stage_times_ms = stage_times
+            return result
+
+        except (InvalidImageError, PayloadTooLargeError, UnsupportedAlgorithmError):
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error during white balance estimation: {e}")
+            raise InvalidImageError(f"Failed to estimate white balance: {e}") from e
+
+    def _estimate_image(
+        self, image_bytes: bytes, request: WhiteBalanceRequest
+    ) -> IlluminantEstimate:
+        """Decode an encoded image and estimate its white balance gains.
+
+        Args:
+            image_bytes: Encoded image bytes.
+            request: White balance request parameters.
+
+        Returns:
+            Estimated gains and illuminant color.
+        """
+        algorithm, input_space, processing_space = self._resolve_request(request)
+        linearize = self._needs_linearization(input_space, processing_space)
+
+        # Load image with Pillow, decoding JPEGs directly at proxy scale
+        image = self._load_image(image_bytes)
+        width, height = image.size
+        max_edge = self._estimation_max_edge(request, width, height)
+        drafted = max_edge is not None and self._draft(image, max_edge)
+
+        # Very large images are analyzed band by band to bound memory
+        if not drafted and self._should_tile(width, height):
+            with metrics.stage("estimate"):
+                gains, estimation_size, error, means_before = self._estimate_tiled(
+                    image.convert("RGB"),
+                    request,
+                    linearize,
+                    max_edge,
+                    request.report_estimation_error,
+                )
+            return IlluminantEstimate(
+                algorithm=algorithm.value,
+                processing_space=processing_space.value,
+                gains=tuple(gains.tolist()),
+                illuminant_rgb=tuple(utils.gains_to_illuminant(gains).tolist()),
+                width=width,
+                height=height,
+                avg_rgb_before=tuple(means_before.tolist()),
+                estimation_size=estimation_size,
+                estimation_error_deg=error.item() if error is not None else None,
+            )
+
+        with metrics.stage("decode"):
+            array = utils.image_to_array(image)
+
+        # Compute average RGB before processing
+        avg_rgb_before = tuple(utils.compute_array_channel_means(array).tolist())
+
+        with metrics.stage("convert"):
+            tensor = self._to_processing_tensor(
+                array, linearize, dtype=self._proxy_source_dtype(request, *array.shape[1::-1])
+            )
+
+        full_tensor = None
+        if drafted and request.report_estimation_error:
+            with metrics.stage("decode"):
+                full_array = utils.image_to_array(self._load_image(image_bytes))
+            with metrics.stage("convert"):
+                full_tensor = self._to_processing_tensor(full_array, linearize)
+
+        with metrics.stage("estimate"):
+            gains, estimation_size, error = self._estimate_on_proxy(
+                tensor, request, max_edge, request.report_estimation_error, full_tensor
+            )
+        illuminant = utils.gains_to_illuminant(gains)
+
+        return IlluminantEstimate(
+            algorithm=algorithm.value,
+            processing_space=processing_space.value,
+            gains=tuple(gains.tolist()),
+            illuminant_rgb=tuple(illuminant.tolist()),
+            width=width,
+            height=height,
+            avg_rgb_before=avg_rgb_before,
+            estimation_size=estimation_size,
+            estimation_error_deg=error.item() if error is not None else None,
+        )
+
+    def _apply_batch_bytes(
+        self, uploads: list[tuple[Optional[str], bytes]], request: WhiteBalanceRequest
+    ) -> list[ProcessedImageResult]:
+        """Apply white balance to many encoded images.
+
+        Args:
+            uploads: Pairs of (filename, encoded image bytes).
+            request: White balance request parameters.
+
+        Returns:
+            Processed image results, in the same order as ``uploads``.
+
+        Raises:
+            InvalidImageError: If an image cannot be loaded.
+            UnsupportedAlgorithmError: If algorithm is not supported.
+        """
+        try:
+            # Decode every image and group indices by size; very large images are
+            # processed band by band on their own. Algorithms that cannot estimate
+            # a stacked batch get one group per image, so no batch tensor is built
+            results: list[Optional[ProcessedImageResult]] = [None] * len(uploads)
+            arrays: dict[int, np.ndarray] = {}
+            groups: dict[tuple[int, ...], list[int]] = {}
+            batched = self._algorithm_spec(request).batched
+            with metrics.collect_stage_times() as stage_times:
+                for index, (filename, image_bytes) in enumerate(uploads):
+                    try:
+                        image = self._load_image(image_bytes)
+                        if self._should_tile(*image.size):
+                            results[index] = self._apply_tiled(image, request)
+                            results[index].filename = filename
+                            continue
+                        with metrics.stage("decode"):
+                            array = utils.image_to_array(image)
+                    except PayloadTooLargeError as e:
+                        raise PayloadTooLargeError(f"{filename}: {e}") from e
+                    except Exception as e:
+                        raise InvalidImageError(f"{filename}: {e}") from e
+                    arrays[index] = array
+                    groups.setdefault(array.shape if batched else (index,), []).append(index)
+
+                for indices in groups.values():
+                    group_results = self._process_group([arrays[i] for i in indices], request)
+                    for index, result in zip(indices, group_results):
+                        result.filename = uploads[index][0]
+                        results[index] = result
+            self._share_stage_times(results, stage_times)
+            logger.debug(f"Processed batch of {len(uploads)} images in {len(groups)} groups")
+
+            return results
+
+        except (InvalidImageError, PayloadTooLargeError, UnsupportedAlgorithmError):
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error during batch white balance processing: {e}")
+            raise InvalidImageError(f"Failed to process batch: {e}") from e
+
+    def _apply_sequence_bytes(
+        self,
+        filename: Optional[str],
+        image_bytes: bytes,
+        request: WhiteBalanceRequest,
+        smoother: TemporalGainSmoother,
+        first_index: int,
+        estimation_size: tuple[int, int],
+    ) -> tuple[SequenceResult, TemporalGainSmoother]:
+        """Apply white balance to the frames of one encoded image with smoothed gains.
+
+        Frames that are not estimated skip conversion to the processing color
+        space entirely: their gains are applied to the 8-bit pixels directly.
+
+        Args:
+            filename: Name of the upload.
+            image_bytes: Encoded image bytes.
+            request: White balance request parameters.
+            smoother: Gain smoother carrying the state of the previous frames.
+            first_index: Index of the first frame of this upload in the sequence.
+            estimation_size: (width, height) of the last frame gains were estimated on.
+
+        Returns:
+            Processed frames of the upload, and the updated smoother.
+
+        Raises:
+            WhiteBalanceError: If the sequence has too many frames.
+            InvalidImageError: If a frame cannot be loaded.
+            UnsupportedAlgorithmError: If algorithm is not supported.
+        """
+        try:
+            _, input_space, processing_space = self._resolve_request(request)
+            linearize = self._needs_linearization(input_space, processing_space)
+
+            frames: list[ProcessedImageResult] = []
+            estimated: list[bool] = []
+            scene_changes: list[bool] = []
+            start = time.perf_counter()
+            with metrics.collect_stage_times() as stage_times:
+                image = self._load_image(image_bytes)
+                for frame in ImageSequence.Iterator(image):
+                    if first_index + len(frames) >= settings.max_sequence_frames:
+                        raise WhiteBalanceError(
+                            f"Sequence has more than {settings.max_sequence_frames} frames"
+                        )
+                    with metrics.stage("decode"):
+                        array = utils.image_to_array(frame)
+                    means = utils.compute_array_channel_means(array)
+
+                    def estimate() -> torch.Tensor:
+                        nonlocal estimation_size
+                        width, height = array.shape[1], array.shape[0]
+                        with metrics.stage("convert"):
+                            tensor = self._to_processing_tensor(
+                                array,
+                                linearize,
+                                dtype=self._proxy_source_dtype(request, width, height),
+                            )
+                        with metrics.stage("estimate"):
+                            gains, estimation_size, _ = self._estimate_on_proxy(
+                                tensor,
+                                request,
+                                self._estimation_max_edge(request, width, height),
+                                False,
+                            )
+                        return gains
+
+                    step = smoother.step(means, estimate)
+                    with metrics.stage("apply"):
+                        output = self._finish(array, step.gains, linearize)
+                    result = self._encode_output(
+                        output,
+                        request,
+                        tuple(means.tolist()),
+                        tuple(step.gains.tolist()),
+                        estimation_size,
+                        None,
+                    )
+                    result.filename = filename
+                    frames.append(result)
+                    estimated.append(step.estimated)
+                    scene_changes.append(step.scene_change)
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            logger.debug(
+                f"Processed {len(frames)} sequence frames of {filename} with "
+                f"{sum(estimated)} estimates in {elapsed_ms:.0f} ms"
+            )
+
+            self._share_stage_times(frames, stage_times)
+            result = SequenceResult(frames, estimated, scene_changes, elapsed_ms, stage_times)
+            return result, smoother
+
+        except WhiteBalanceError:
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error during sequence white balance processing: {e}")
+            raise InvalidImageError(f"Failed to process sequence: {e}") from e
+
+    def _sequence_smoother(self, options: SequenceOptions) -> TemporalGainSmoother:
+        """Create the gain smoother of a sequence, filling in settings defaults.
+
+        Args:
+            options: Re-estimation and smoothing options.
+
+        Returns:
+            Smoother for a new sequence.
+        """
+        return TemporalGainSmoother(
+            smoothing=(
+                options.smoothing if options.smoothing is not None else settings.sequence_smoothing
+            ),
+            reestimate_interval=(
+                options.reestimate_interval
+                if options.reestimate_interval is not None
+                else settings.sequence_reestimate_interval
+            ),
+            scene_change_threshold=(
+                options.scene_change_threshold
+                if options.scene_change_threshold is not None
+                else settings.sequence_scene_change_threshold
+            ),
+        )
+
+    def _decode_for_store(self, image_id: str, image_bytes: bytes) -> StoredImage:
+        """Decode an upload and precompute what every algorithm needs.
 
         Args:
-            tensor: Image tensor of shape (C, H, W) in [0, 1].
-            algorithm: Algorithm to apply.
+            image_id: Image ID to store the upload under.
+            image_bytes: Encoded image bytes.
 
         Returns:
-            White balanced tensor.
+            Decoded image with its linearized tensor and "before" statistics.
+
+        Raises:
+            InvalidImageError: If image cannot be loaded.
+        """
+        try:
+            image = self._load_image(image_bytes)
+            with metrics.stage("decode"):
+                array = utils.image_to_array(image)
+            height, width = array.shape[:2]
+
+            # Images for the tiled pipeline are kept as 8-bit pixels only
+            linear_tensor = None
+            if not self._should_tile(width, height):
+                with metrics.stage("convert"):
+                    linear_tensor = self._to_processing_tensor(
+                        array, linearize=True, dtype=self._stored_dtype(width, height)
+                    )
+
+            return StoredImage(
+                image_id=image_id,
+                array=array,
+                avg_rgb_before=tuple(utils.compute_array_channel_means(array).tolist()),
+                linear_tensor=linear_tensor,
+            )
+
+        except (InvalidImageError, PayloadTooLargeError):
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error while decoding upload: {e}")
+            raise InvalidImageError(f"Failed to decode image: {e}") from e
+
+    def _stored_tensor(self, stored: StoredImage, linearize: bool) -> torch.Tensor:
+        """Get a stored image as a tensor in the processing color space.
+
+        Args:
+            stored: Stored image.
+            linearize: Whether to convert from sRGB to linear RGB.
+
+        Returns:
+            Tensor of shape (C, H, W) with values in [0, 1].
+        """
+        if linearize and stored.linear_tensor is not None:
+            return stored.linear_tensor
+        with metrics.stage("convert"):
+            return self._to_processing_tensor(stored.array, linearize)
+
+    def _apply_stored(
+        self, stored: StoredImage, request: WhiteBalanceRequest
+    ) -> ProcessedImageResult:
+        """Apply white balance to a stored image, skipping decode.
+
+        Args:
+            stored: Stored image.
+            request: White balance request parameters.
+
+        Returns:
+            Processed image result.
 
         Raises:
             UnsupportedAlgorithmError: If algorithm is not supported.
         """
-        if algorithm == WhiteBalanceAlgorithm.GREY_WORLD:
-            return apply_grey_world(tensor)
-        elif algorithm == WhiteBalanceAlgorithm.WHITE_PATCH:
-            return apply_white_patch(tensor)
-        elif algorithm == WhiteBalanceAlgorithm.GREY_EDGE:
-            return apply_grey_edge(tensor)
+        with metrics.collect_stage_times() as stage_times:
+            if self._should_tile(stored.width, stored.height):
+                result = self._apply_tiled(Image.fromarray(stored.array), request)
+            else:
+                _, input_space, processing_space = self._resolve_request(request)
+                linearize = self._needs_linearization(input_space, processing_space)
+                batch = self._stored_tensor(stored, linearize).unsqueeze(0)
+                result = self._process_tensors(
+                    batch, [stored.array], [stored.avg_rgb_before], request
+                )[0]
+        result.stage_times_ms = stage_times
+        return result
+
+    def _estimate_stored(
+        self, stored: StoredImage, request: WhiteBalanceRequest
+    ) -> IlluminantEstimate:
+        """Estimate white balance gains for a stored image, skipping decode.
+
+        Args:
+            stored: Stored image.
+            request: White balance request parameters.
+
+        Returns:
+            Estimated gains and illuminant color.
+
+        Raises:
+            UnsupportedAlgorithmError: If algorithm is not supported.
+        """
+        algorithm, input_space, processing_space = self._resolve_request(request)
+        linearize = self._needs_linearization(input_space, processing_space)
+        max_edge = self._estimation_max_edge(request, stored.width, stored.height)
+
+        with metrics.collect_stage_times() as stage_times:
+            if self._should_tile(stored.width, stored.height):
+                with metrics.stage("estimate"):
+                    gains, estimation_size, error, _ = self._estimate_tiled(
+                        Image.fromarray(stored.array),
+                        request,
+                        linearize,
+                        max_edge,
+                        request.report_estimation_error,
+                    )
+            else:
+                tensor = self._stored_tensor(stored, linearize)
+                with metrics.stage("estimate"):
+                    gains, estimation_size, error = self._estimate_on_proxy(
+                        tensor, request, max_edge, request.report_estimation_error
+                    )
+
+        return IlluminantEstimate(
+            algorithm=algorithm.value,
+            processing_space=processing_space.value,
+            gains=tuple(gains.tolist()),
+            illuminant_rgb=tuple(utils.gains_to_illuminant(gains).tolist()),
+            width=stored.width,
+            height=stored.height,
+            avg_rgb_before=stored.avg_rgb_before,
+            estimation_size=estimation_size,
+            estimation_error_deg=error.item() if error is not None else None,
+            stage_times_ms=stage_times,
+        )
+
+    def _compare_bytes(
+        self, image_bytes: bytes, requests: list[WhiteBalanceRequest], contact_sheet: bool
+    ) -> ComparisonResult:
+        """Decode an encoded image once and compare variants on it.
+
+        Args:
+            image_bytes: Encoded image bytes.
+            requests: White balance request parameters, one per variant.
+            contact_sheet: Whether to build a contact sheet.
+
+        Returns:
+            Comparison with one processed image per variant.
+        """
+        with metrics.collect_stage_times() as stage_times:
+            stored = self._decode_for_store(content_hash(image_bytes), image_bytes)
+            result = self._compare_stored(stored, requests, contact_sheet)
+        result.stage_times_ms = stage_times
+        self._share_stage_times(result.results, stage_times)
+        return result
+
+    def _compare_stored(
+        self, stored: StoredImage, requests: list[WhiteBalanceRequest], contact_sheet: bool
+    ) -> ComparisonResult:
+        """Compare variants on a decoded image.
+
+        Args:
+            stored: Decoded image.
+            requests: White balance request parameters, one per variant.
+            contact_sheet: Whether to build a contact sheet.
+
+        Returns:
+            Comparison with one processed image per variant.
+
+        Raises:
+            WhiteBalanceError: If the image is too large to compare in memory.
+            UnsupportedAlgorithmError: If an algorithm is not supported.
+        """
+        width, height = stored.width, stored.height
+        if self._should_tile(width, height):
+            raise WhiteBalanceError(
+                f"{width}x{height} image is too large to compare in memory; "
+                "use /apply for each algorithm"
+            )
+
+        try:
+            with metrics.collect_stage_times() as stage_times:
+                # Processing tensors per color space, and shared statistics per proxy
+                tensors: dict[bool, torch.Tensor] = {}
+                statistics: dict[tuple[bool, Optional[int]], ImageStatistics] = {}
+
+                results = []
+                outputs = [stored.array]
+                for request in requests:
+                    _, input_space, processing_space = self._resolve_request(request)
+                    linearize = self._needs_linearization(input_space, processing_space)
+                    if linearize not in tensors:
+                        tensors[linearize] = self._stored_tensor(stored, linearize)
+                    tensor = tensors[linearize]
+
+                    max_edge = self._estimation_max_edge(request, width, height)
+                    if max_edge is not None and max(width, height) <= max_edge:
+                        max_edge = None
+                    with metrics.stage("estimate"):
+                        proxy_stats = self._shared_statistics(
+                            statistics, tensor, linearize, max_edge
+                        )
+                        proxy = proxy_stats.image
+                        gains = self._estimate_gains(proxy, request, proxy_stats)
+
+                        error = None
+                        if request.report_estimation_error:
+                            full_stats = self._shared_statistics(
+                                statistics, tensor, linearize, None
+                            )
+                            full_gains = self._estimate_gains(tensor, request, full_stats)
+                            error = utils.angular_error(gains, full_gains).item()
+
+                    with metrics.stage("apply"):
+                        output = self._finish(stored.array, gains, linearize)
+                    outputs.append(output)
+                    results.append(
+                        self._encode_output(
+                            output,
+                            request,
+                            stored.avg_rgb_before,
+                            tuple(gains.tolist()),
+                            (proxy.shape[-1], proxy.shape[-2]),
+                            error,
+                        )
+                    )
+
+                sheet_data = None
+                sheet_size = None
+                if contact_sheet:
+                    sheet = make_contact_sheet(outputs, settings.contact_sheet_cell_edge)
+                    with metrics.stage("encode"):
+                        sheet_data = encode_image(
+                            sheet,
+                            OutputFormat(requests[0].output_format),
+                            requests[0].output_quality,
+                            requests[0].compress_level,
+                        )
+                    sheet_size = (sheet.shape[1], sheet.shape[0])
+
+                result = ComparisonResult(
+                    width=width,
+                    height=height,
+                    avg_rgb_before=stored.avg_rgb_before,
+                    results=results,
+                    contact_sheet=sheet_data,
+                    contact_sheet_size=sheet_size,
+                )
+            result.stage_times_ms = stage_times
+            self._share_stage_times(result.results, stage_times)
+            return result
+
+        except (InvalidImageError, PayloadTooLargeError, UnsupportedAlgorithmError):
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error during algorithm comparison: {e}")
+            raise InvalidImageError(f"Failed to compare algorithms: {e}") from e
+
+    def _shared_statistics(
+        self,
+        statistics: dict[tuple[bool, Optional[int]], ImageStatistics],
+        tensor: torch.Tensor,
+        linearize: bool,
+        max_edge: Optional[int],
+    ) -> ImageStatistics:
+        """Get the shared statistics of an estimation proxy, creating them once.
+
+        Args:
+            statistics: Statistics computed so far, keyed by (linearize, max_edge).
+            tensor: Full-resolution tensor in the processing color space.
+            linearize: Whether ``tensor`` is in linear RGB.
+            max_edge: Maximum long edge of the proxy, or None for full resolution.
+
+        Returns:
+            Statistics of the proxy.
+        """
+        key = (linearize, max_edge)
+        if key not in statistics:
+            statistics[key] = ImageStatistics(utils.downscale_to_max_edge(tensor, max_edge))
+        return statistics[key]
+
+    def _record_apply_metrics(
+        self,
+        result: ProcessedImageResult,
+        request_bytes: Optional[int] = None,
+        operation: str = "apply",
+    ) -> None:
+        """Observe the sizes and stage timings of an applied image.
+
+        Args:
+            result: Processed image result.
+            request_bytes: Size of the upload in bytes, if there was one.
+            operation: Kind of request, for the ``operation`` label.
+        """
+        if request_bytes is not None:
+            metrics.REQUEST_BYTES.observe(request_bytes)
+        metrics.RESPONSE_BYTES.observe(result.output_bytes)
+        if result.width is not None and result.height is not None:
+            metrics.IMAGE_MEGAPIXELS.observe(result.width * result.height / 1_000_000)
+        self._record_stage_metrics(result, operation)
+
+    def _record_estimate_metrics(
+        self, result: IlluminantEstimate, request_bytes: Optional[int] = None
+    ) -> None:
+        """Observe the size and stage timings of an estimate.
+
+        Args:
+            result: Illuminant estimate.
+            request_bytes: Size of the upload in bytes, if there was one.
+        """
+        if request_bytes is not None:
+            metrics.REQUEST_BYTES.observe(request_bytes)
+        metrics.IMAGE_MEGAPIXELS.observe(result.width * result.height / 1_000_000)
+        self._record_stage_metrics(result, "estimate")
+
+    def _record_stage_metrics(self, result: CachedResult, operation: str) -> None:
+        """Observe the stage timings of a result.
+
+        Args:
+            result: Processed image result or illuminant estimate.
+            operation: Kind of request, for the ``operation`` label.
+        """
+        # Cache hits carry the timings of the request that computed them
+        if result.cache_status == CACHE_HIT or not result.stage_times_ms:
+            return
+        for stage, millis in result.stage_times_ms.items():
+            metrics.STAGE_SECONDS.observe(
+                millis / 1000.0,
+                operation=operation,
+                stage=stage,
+                algorithm=result.algorithm,
+                processing_space=result.processing_space,
+            )
+
+    def _share_stage_times(
+        self, results: list[ProcessedImageResult], stage_times: dict[str, float]
+    ) -> None:
+        """Split the stage timings of a job evenly between the images it produced.
+
+        Args:
+            results: Processed images of the job.
+            stage_times: Milliseconds per stage of the whole job.
+        """
+        share = {stage: millis / len(results) for stage, millis in stage_times.items()}
+        for result in results:
+            result.stage_times_ms = dict(share)
+
+    def _with_cache_status(self, result: CachedResult, status: str) -> CachedResult:
+        """Return a copy of a result tagged with its cache status.
+
+        Cached objects are shared between requests, so they are copied rather
+        than modified.
+
+        Args:
+            result: Processed image result or illuminant estimate.
+            status: Cache status to report.
+
+        Returns:
+            Shallow copy of ``result`` with ``cache_status`` set, or ``result``
+            itself if caching is disabled.
+        """
+        if not get_result_cache().enabled:
+            return result
+        result = copy.copy(result)
+        result.cache_status = status
+        return result
+
+    def _load_image(self, image_bytes: bytes) -> Image.Image:
+        """Load image bytes with Pillow.
+
+        Args:
+            image_bytes: Encoded image bytes.
+
+        Returns:
+            Loaded PIL image.
+
+        Raises:
+            InvalidImageError: If image cannot be loaded.
+            PayloadTooLargeError: If the image has too many pixels.
+        """
+        try:
+            image = Image.open(io.BytesIO(image_bytes))
+        except Image.DecompressionBombError as e:
+            raise PayloadTooLargeError(str(e)) from e
+        except Exception as e:
+            raise InvalidImageError(f"Failed to load image: {e}") from e
+        check_image_size(*image.size)
+        return image
+
+    def _should_tile(self, width: int, height: int) -> bool:
+        """Check whether an image is large enough for band-wise processing.
+
+        Args:
+            width: Image width in pixels.
+            height: Image height in pixels.
+
+        Returns:
+            True if the image should be processed with the tiled pipeline.
+        """
+        if settings.tiled_min_megapixels is None:
+            return False
+        return width * height >= settings.tiled_min_megapixels * 1_000_000
+
+    def _apply_tiled(
+        self, image: Image.Image, request: WhiteBalanceRequest
+    ) -> ProcessedImageResult:
+        """Apply white balance to a large image band by band.
+
+        The first pass streams the image through a statistics accumulator
+        (or estimates on a reduced proxy), the second pass applies the gains
+        to each band and feeds it straight into an incremental PNG encoder.
+        Only the decoded 8-bit image and one band of floats are held at once;
+        the second pass works on 8-bit pixels only.
+        Other output formats are assembled into an 8-bit canvas and encoded
+        with Pillow at the end.
+
+        Args:
+            image: Loaded PIL image.
+            request: White balance request parameters.
+
+        Returns:
+            Processed image result.
+        """
+        algorithm, input_space, processing_space = self._resolve_request(request)
+        linearize = self._needs_linearization(input_space, processing_space)
+        image = image.convert("RGB")
+        width, height = image.size
+        logger.debug(f"Processing {width}x{height} image with the tiled pipeline")
+
+        # The statistics pass decodes and converts bands as it goes
+        with metrics.stage("estimate"):
+            gains, estimation_size, error, _ = self._estimate_tiled(
+                image,
+                request,
+                linearize,
+                self._estimation_max_edge(request, width, height),
+                request.report_estimation_error,
+            )
+
+        output_format = OutputFormat(request.output_format)
+        buffer = io.BytesIO()
+        writer = None
+        canvas = None
+        if output_format == OutputFormat.PNG:
+            writer = StreamingPngWriter(
+                buffer, width, height, resolve_compress_level(request.compress_level)
+            )
         else:
-            raise UnsupportedAlgorithmError(f"Unsupported algorithm: {algorithm}")
+            canvas = np.empty((height, width, 3), dtype=np.uint8)
+
+        encode_time = 0.0
+        sums_before = torch.zeros(3, dtype=torch.float64)
+        sums_after = torch.zeros(3, dtype=torch.float64)
+        for band in tiling.iter_row_bands(height, width, settings.tile_max_pixels):
+            with metrics.stage("decode"):
+                array = utils.image_to_array(image, (0, band.top, width, band.bottom))
+            rows = band.bottom - band.top
+            sums_before += utils.compute_array_channel_means(array).double() * rows
+
+            with metrics.stage("apply"):
+                output = self._finish(
+                    array,
+                    gains,
+                    linearize,
+                    None if canvas is None else canvas[band.top : band.bottom],
+                )
+
+            sums_after += utils.compute_array_channel_means(output).double() * rows
+            if writer is not None:
+                start = time.perf_counter()
+                with metrics.stage("encode"):
+                    writer.write_rows(output)
+                encode_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        with metrics.stage("encode"):
+            if writer is not None:
+                writer.close()
+                image_data = buffer.getvalue()
+            else:
+                image_data = encode_image(
+                    canvas, output_format, request.output_quality, request.compress_level
+                )
+        encode_time += time.perf_counter() - start
+
+        return ProcessedImageResult(
+            image_data=image_data,
+            media_type=MEDIA_TYPES[output_format],
+            algorithm=algorithm.value,
+            processing_space=processing_space.value,
+            avg_rgb_before=tuple((sums_before / height).tolist()),
+            avg_rgb_after=tuple((sums_after / height).tolist()),
+            gains=tuple(gains.tolist()),
+            estimation_size=estimation_size,
+            estimation_error_deg=error.item() if error is not None else None,
+            output_format=output_format.value,
+            width=width,
+            height=height,
+            encode_time_ms=encode_time * 1000.0,
+        )
+
+    def _estimate_tiled(
+        self,
+        image: Image.Image,
+        request: WhiteBalanceRequest,
+        linearize: bool,
+        max_edge: Optional[int],
+        report_error: bool,
+    ) -> tuple[torch.Tensor, tuple[int, int], Optional[torch.Tensor], torch.Tensor]:
+        """Estimate gains for a large image without materializing it as floats.
+
+        With a proxy size configured, gains are estimated on a Pillow
+        ``reduce``d copy; otherwise statistics are streamed band by band.
+        Algorithms that cannot be streamed always use a proxy no larger than
+        one tile, and report no estimation error.
+
+        Args:
+            image: Loaded PIL image in RGB mode.
+            request: White balance request parameters.
+            linearize: Whether to process in linear RGB.
+            max_edge: Maximum long edge of the proxy, or None for full resolution.
+            report_error: Whether to also stream full-resolution statistics and
+                report the angular difference.
+
+        Returns:
+            Tuple of (gains, (width, height) used for estimation, angular error
+            in degrees or None, per-channel means before processing).
+        """
+        width, height = image.size
+        gains = None
+        error = None
+        means_before = None
+        estimation_size = (width, height)
+
+        # Algorithms without a band-wise accumulator estimate on a proxy of one tile
+        spec = self._algorithm_spec(request)
+        if max_edge is None and not spec.tiled:
+            max_edge = max(16, math.isqrt(settings.tile_max_pixels))
 
+        if max_edge is not None and (max(width, height) > max_edge or not spec.tiled):
+            proxy = image.reduce(max(1, math.ceil(max(width, height) / max_edge)))
+            array = utils.image_to_array(proxy)
+            means_before = utils.compute_array_channel_means(array)
+            gains = self._estimate_gains(self._to_processing_tensor(array, linearize), request)
+            estimation_size = proxy.size
+
+        if spec.tiled and (gains is None or report_error):
+            full_gains, means_before = self._accumulate_statistics(image, request, linearize)
+            if gains is None:
+                gains = full_gains
+            if report_error:
+                error = utils.angular_error(gains, full_gains)
+
+        return gains, estimation_size, error, means_before
+
+    def _accumulate_statistics(
+        self, image: Image.Image, request: WhiteBalanceRequest, linearize: bool
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        """Stream an image band by band through the algorithm's accumulator.
+
+        Args:
+            image: Loaded PIL image in RGB mode.
+            request: White balance request parameters.
+            linearize: Whether to process in linear RGB.
+
+        Returns:
+            Tuple of (gains, per-channel means before processing).
+        """
+        accumulator = self._create_accumulator(request)
+        width, height = image.size
+        sums_before = torch.zeros(3, dtype=torch.float64)
+
+        for band in tiling.iter_row_bands(
+            height, width, settings.tile_max_pixels, accumulator.halo
+        ):
+            box = (0, band.top - band.halo_top, width, band.bottom + band.halo_bottom)
+            array = utils.image_to_array(image, box)
+            interior = array[band.halo_top : array.shape[0] - band.halo_bottom]
+            sums_before += utils.compute_array_channel_means(interior).double() * len(interior)
+
+            tensor = self._to_processing_tensor(array, linearize)
+            accumulator.update(tensor, band.halo_top, band.halo_bottom)
+
+        return accumulator.gains(), (sums_before / height).float()
+
+    def _draft(self, image: Image.Image, max_edge: int) -> bool:
+        """Configure JPEG decoding at a reduced scale for estimation.
+
+        Pillow's ``draft`` lets the JPEG decoder skip DCT coefficients and
+        decode directly at 1/2, 1/4 or 1/8 scale, which is much cheaper than
+        decoding at full resolution and downscaling afterwards.
+
+        Args:
+            image: Opened, not yet loaded, PIL image.
+            max_edge: Desired maximum long edge in pixels.
+
+        Returns:
+            True if the decoder was reconfigured.
+        """
+        if image.format != "JPEG":
+            return False
+        width, height = image.size
+        scale = max_edge / max(width, height)
+        if scale >= 1.0:
+            return False
+        image.draft("RGB", (max(1, int(width * scale)), max(1, int(height * scale))))
+        return True
+
+    def _estimation_max_edge(
+        self, request: WhiteBalanceRequest, width: int, height: int
+    ) -> Optional[int]:
+        """Resolve the long edge used for illuminant estimation.
+
+        An explicit request value wins. Otherwise the configured proxy size
+        applies, shrunk further if the algorithm's registered cost at full
+        resolution would exceed ``settings.estimation_budget_ms``.
+
+        Args:
+            request: White balance request parameters.
+            width: Image width in pixels.
+            height: Image height in pixels.
+
+        Returns:
+            Maximum long edge of the estimation proxy, or None for full resolution.
+        """
+        if request.estimation_max_edge is not None:
+            return request.estimation_max_edge
+        max_edge = settings.estimation_max_edge
+        if settings.estimation_budget_ms is None:
+            return max_edge
+
+        # Largest proxy whose estimated cost fits the budget
+        cost = self._algorithm_spec(request).cost_ns_per_pixel
+        budget_pixels = settings.estimation_budget_ms * 1e6 / cost
+        if width * height <= budget_pixels:
+            return max_edge
+        budget_edge = max(16, int(max(width, height) * math.sqrt(budget_pixels / (width * height))))
+        return budget_edge if max_edge is None else min(max_edge, budget_edge)
+
+    def _resolve_request(
+        self, request: WhiteBalanceRequest
+    ) -> tuple[WhiteBalanceAlgorithm, ColorSpace, ColorSpace]:
+        """Convert request values to enums.
+
+        Args:
+            request: White balance request parameters.
+
+        Returns:
+            Tuple of (algorithm, input color space, processing color space).
+        """
+        return (
+            WhiteBalanceAlgorithm(request.algorithm),
+            ColorSpace(request.input_color_space),
+            ColorSpace(request.processing_space),
+        )
+
+    def _needs_linearization(
+        self, input_space: ColorSpace, processing_space: ColorSpace
+    ) -> bool:
+        """Check whether processing requires an sRGB to linear round trip.
+
+        Args:
+            input_space: Color space of the uploaded image.
+            processing_space: Color space the algorithm runs in.
+
+        Returns:
+            True if the image must be linearized before processing.
+        """
+        return input_space == ColorSpace.SRGB and processing_space == ColorSpace.LINEAR_RGB
+
+    def _process_group(
+        self, arrays: list[np.ndarray], request: WhiteBalanceRequest
+    ) -> list[ProcessedImageResult]:
+        """Run the processing pipeline on same-size images as one batch.
+
+        Args:
+            arrays: Decoded images of shape (H, W, C) with dtype uint8, all of
+                the same size.
+            request: White balance request parameters.
+
+        Returns:
+            Processed image results, one per image in ``arrays``.
+        """
+        _, input_space, processing_space = self._resolve_request(request)
+        linearize = self._needs_linearization(input_space, processing_space)
+
+        # Compute average RGB before processing
+        means_before = [
+            tuple(utils.compute_array_channel_means(array).tolist()) for array in arrays
+        ]
+
+        # Convert straight into one (N, C, H, W) tensor in the processing color space
+        height, width, channels = arrays[0].shape
+        dtype = self._proxy_source_dtype(request, width, height)
+        batch = torch.empty((len(arrays), channels, height, width), dtype=dtype)
+        with metrics.stage("convert"):
+            for array, image in zip(arrays, batch):
+                self._to_processing_tensor(array, linearize, out=image)
+
+        return self._process_tensors(batch, arrays, means_before, request)
+
+    def _process_tensors(
+        self,
+        batch: torch.Tensor,
+        arrays: list[np.ndarray],
+        means_before: list[tuple[float, float, float]],
+        request: WhiteBalanceRequest,
+    ) -> list[ProcessedImageResult]:
+        """Estimate on a batch in the processing color space, then apply and encode.
+
+        Gains are estimated on ``batch`` and applied to the 8-bit ``arrays``
+        by the fused finish stage.
+
+        Args:
+            batch: Tensor of shape (N, C, H, W) with values in [0, 1].
+            arrays: The 8-bit sRGB pixels ``batch`` was converted from.
+            means_before: Average RGB of each input image.
+            request: White balance request parameters.
+
+        Returns:
+            Processed image results, one per image in ``batch``.
+        """
+        _, input_space, processing_space = self._resolve_request(request)
+        linearize = self._needs_linearization(input_space, processing_space)
+
+        # Estimate gains, on a downscaled proxy if configured, then apply at full size
+        with metrics.stage("estimate"):
+            gains, estimation_size, errors = self._estimate_on_proxy(
+                batch,
+                request,
+                self._estimation_max_edge(request, batch.shape[-1], batch.shape[-2]),
+                request.report_estimation_error,
+            )
+
+        results = []
+        for array, before, image_gains, error in zip(
+            arrays,
+            means_before,
+            gains,
+            errors.tolist() if errors is not None else [None] * len(batch),
+        ):
+            # Apply gains and convert back to 8-bit sRGB for display
+            with metrics.stage("apply"):
+                output = self._finish(array, image_gains, linearize)
+            results.append(
+                self._encode_output(
+                    output, request, before, tuple(image_gains.tolist()), estimation_size, error
+                )
+            )
+        return results
+
+    def _encode_output(
+        self,
+        output: np.ndarray,
+        request: WhiteBalanceRequest,
+        avg_rgb_before: tuple[float, float, float],
+        gains: tuple[float, float, float],
+        estimation_size: tuple[int, int],
+        estimation_error_deg: Optional[float],
+    ) -> ProcessedImageResult:
+        """Encode a processed image and collect its statistics.
+
+        Args:
+            output: Processed image of shape (H, W, C) with dtype uint8 in sRGB.
+            request: White balance request parameters.
+            avg_rgb_before: Average RGB of the input image.
+            gains: Per-channel gains that were applied.
+            estimation_size: (width, height) of the image gains were estimated on.
+            estimation_error_deg: Angular error of the proxy estimate, if requested.
+
+        Returns:
+            Processed image result.
+        """
+        algorithm, _, processing_space = self._resolve_request(request)
+        output_format = OutputFormat(request.output_format)
+
+        start = time.perf_counter()
+        with metrics.stage("encode"):
+            image_data = encode_image(
+                output, output_format, request.output_quality, request.compress_level
+            )
+        encode_time = time.perf_counter() - start
+
+        return ProcessedImageResult(
+            image_data=image_data,
+            media_type=MEDIA_TYPES[output_format],
+            algorithm=algorithm.value,
+            processing_space=processing_space.value,
+            avg_rgb_before=avg_rgb_before,
+            # Compute average RGB after processing
+            avg_rgb_after=tuple(utils.compute_array_channel_means(output).tolist()),
+            gains=gains,
+            estimation_size=estimation_size,
+            estimation_error_deg=estimation_error_deg,
+            output_format=output_format.value,
+            width=output.shape[1],
+            height=output.shape[0],
+            encode_time_ms=encode_time * 1000.0,
+        )
+
+    def _to_processing_tensor(
+        self,
+        array: np.ndarray,
+        linearize: bool,
+        out: Optional[torch.Tensor] = None,
+        dtype: torch.dtype = torch.float32,
+    ) -> torch.Tensor:
+        """Convert 8-bit pixels to a float tensor in the processing color space.
+
+        Linearization goes through a 256-entry lookup table, straight from the
+        uint8 codes to linear floats.
+
+        Args:
+            array: Array of shape (H, W, C) with dtype uint8.
+            linearize: Whether to convert from sRGB to linear RGB.
+            out: Optional contiguous float tensor of shape (C, H, W) to write into.
+            dtype: Float dtype of the result when ``out`` is not given.
+
+        Returns:
+            Contiguous tensor of shape (C, H, W) with values in [0, 1].
+        """
+        if linearize:
+            logger.debug("Converted sRGB to linear RGB for processing")
+            return color_spaces.srgb_uint8_to_linear(array, out, dtype)
+        return utils.array_to_tensor(array, out, dtype)
+
+    def _processing_dtype(self) -> torch.dtype:
+        """Get the configured float dtype of downscaled or stored full-resolution tensors.
+
+        Returns:
+            ``torch.float32``, ``torch.float16`` or ``torch.bfloat16``.
+        """
+        return getattr(torch, settings.processing_dtype)
+
+    def _proxy_source_dtype(
+        self, request: WhiteBalanceRequest, width: int, height: int
+    ) -> torch.dtype:
+        """Get the dtype to convert a full-resolution image to before estimation.
+
+        Estimators run in float32, so a reduced-precision image estimated at
+        full resolution would be upcast whole and cost more memory than
+        float32 alone. Reduced precision is only used for images that are
+        downscaled to a smaller proxy first, where only the proxy is upcast.
+
+        Args:
+            request: White balance request parameters.
+            width: Image width in pixels.
+            height: Image height in pixels.
+
+        Returns:
+            The configured processing dtype, or ``torch.float32``.
+        """
+        max_edge = self._estimation_max_edge(request, width, height)
+        if request.report_estimation_error or max_edge is None or max(width, height) <= max_edge:
+            return torch.float32
+        return self._processing_dtype()
+
+    def _stored_dtype(self, width: int, height: int) -> torch.dtype:
+        """Get the dtype to keep the linearized tensor of a stored image in.
+
+        A stored tensor is reused by every later request on the image. Like
+        in :meth:`_proxy_source_dtype`, reduced precision only saves memory
+        if estimation downscales it to a proxy, so it is used only when the
+        configured ``settings.estimation_max_edge`` shrinks the image.
+        Requests that estimate such an image at full resolution upcast it.
+
+        Args:
+            width: Image width in pixels.
+            height: Image height in pixels.
+
+        Returns:
+            The configured processing dtype, or ``torch.float32``.
+        """
+        max_edge = settings.estimation_max_edge
+        if max_edge is None or max(width, height) <= max_edge:
+            return torch.float32
+        return self._processing_dtype()
+
+    def _finish(
+        self,
+        array: np.ndarray,
+        gains: torch.Tensor,
+        linearize: bool,
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Apply gains to 8-bit pixels and convert the result to 8-bit sRGB.
+
+        Conversion to the processing color space, gains, clamping and the
+        conversion back are fused into one per-channel table lookup that
+        matches the float32 pipeline.
+
+        Args:
+            array: Array of shape (H, W, C) with dtype uint8 in sRGB.
+            gains: Tensor of shape (C,) with per-channel gains.
+            linearize: Whether gains apply in linear RGB.
+            out: Optional writable uint8 array of shape (H, W, C) to write into.
+
+        Returns:
+            Array of shape (H, W, C) with dtype uint8 in sRGB.
+        """
+        return color_spaces.finish_uint8(array, gains, linearize, out=out)
+
+    def _estimate_on_proxy(
+        self,
+        tensor: torch.Tensor,
+        request: WhiteBalanceRequest,
+        max_edge: Optional[int],
+        report_error: bool,
+        full_tensor: Optional[torch.Tensor] = None,
+    ) -> tuple[torch.Tensor, tuple[int, int], Optional[torch.Tensor]]:
+        """Estimate gains on a downscaled proxy of the image.
+
+        Args:
+            tensor: Image tensor of shape (C, H, W) or (N, C, H, W) in [0, 1].
+            request: White balance request parameters.
+            max_edge: Maximum long edge of the proxy, or None for full resolution.
+            report_error: Whether to also estimate at full resolution and
+                report the angular difference.
+            full_tensor: Full-resolution reference if ``tensor`` was already
+                decoded at reduced scale.
+
+        Returns:
+            Tuple of (gains, (width, height) of the proxy, angular error in
+            degrees or None).
+        """
+        proxy = utils.downscale_to_max_edge(tensor, max_edge)
+        gains = self._estimate_gains(proxy, request)
+        estimation_size = (proxy.shape[-1], proxy.shape[-2])
+
+        error = None
+        if report_error:
+            reference = tensor if full_tensor is None else full_tensor
+            error = utils.angular_error(gains, self._estimate_gains(reference, request))
+        return gains, estimation_size, error
+
+    def _estimate_gains(
+        self,
+        tensor: torch.Tensor,
+        request: WhiteBalanceRequest,
+        stats: Optional[ImageStatistics] = None,
+    ) -> torch.Tensor:
+        """Estimate per-channel gains with the requested algorithm and parameters.
+
+        Args:
+            tensor: Image tensor of shape (C, H, W) or (N, C, H, W) in [0, 1].
+            request: White balance request parameters.
+            stats: Intermediates of ``tensor`` shared with other estimates, if any.
+
+        Returns:
+            Gains tensor of shape (C,) or (N, C).
+
+        Raises:
+            UnsupportedAlgorithmError: If algorithm is not supported.
+        """
+        spec = self._algorithm_spec(request)
+        if stats is None:
+            stats = ImageStatistics(tensor)
+        return spec.estimate_gains(stats, **self._algorithm_parameters(request, spec))
+
+    def _create_accumulator(
+        self, request: WhiteBalanceRequest
+    ) -> tiling.StatisticsAccumulator:
+        """Create a streaming statistics accumulator for the requested algorithm.
+
+        Args:
+            request: White balance request parameters.
+
+        Returns:
+            Empty accumulator for band-wise processing.
+
+        Raises:
+            UnsupportedAlgorithmError: If algorithm is not supported or cannot
+                be processed band by band.
+        """
+        spec = self._algorithm_spec(request)
+        if not spec.tiled:
+            raise UnsupportedAlgorithmError(
+                f"Algorithm {spec.name} does not support band-wise processing"
+            )
+        return spec.accumulator(**self._algorithm_parameters(request, spec))
+
+    def _algorithm_spec(self, request: WhiteBalanceRequest) -> registry.AlgorithmSpec:
+        """Look up the registry entry of the requested algorithm.
+
+        Args:
+            request: White balance request parameters.
+
+        Returns:
+            Algorithm description.
+
+        Raises:
+            UnsupportedAlgorithmError: If algorithm is not supported.
+        """
+        algorithm, _, _ = self._resolve_request(request)
+        try:
+            return registry.get_algorithm(algorithm.value)
+        except KeyError:
+            raise UnsupportedAlgorithmError(f"Unsupported algorithm: {algorithm}") from None
+
+    def _algorithm_parameters(
+        self, request: WhiteBalanceRequest, spec: registry.AlgorithmSpec
+    ) -> dict[str, float]:
+        """Collect the tuning parameters the requested algorithm takes.
+
+        Parameters left unset in the request are omitted, so the engine's
+        per-algorithm defaults apply.
+
+        Args:
+            request: White balance request parameters.
+            spec: Registry entry of the requested algorithm.
+
+        Returns:
+            Keyword arguments for the algorithm's estimator and accumulator.
+        """
+        params = {name: getattr(request, name) for name in spec.parameters}
+        return {name: value for name, value in params.items() if value is not None}
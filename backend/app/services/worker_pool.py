@@ -0,0 +1,210 @@
+"""Bounded worker pool for CPU-bound image processing.
+
+Decoding, torch math and encoding are synchronous and can take seconds on
+large images. Running them on the event loop would stall every other
+request, including ``/health``, so route handlers hand the work to a pool of
+threads or processes and await the result. The pool admits at most
+``workers + queue_size`` jobs at a time; further jobs are rejected with
+:class:`ServiceBusyError` so clients can back off instead of piling up.
+
+Workers and torch intra-op threads share the CPUs: many workers with one
+thread each maximize throughput on many small images, while few workers
+with many threads minimize the latency of a single large one. By default
+the pool takes the middle ground of about the square root of the CPU count
+for both.
+"""
+
+import asyncio
+import functools
+import math
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+import torch
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.errors import ServiceBusyError
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+def _init_process_worker(torch_threads: int) -> None:
+    """Configure torch in a freshly started worker process.
+
+    Args:
+        torch_threads: Number of intra-op threads for this process.
+    """
+    torch.set_num_threads(torch_threads)
+
+
+class WorkerPool:
+    """Executor with admission control for engine work."""
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        workers: Optional[int] = None,
+        queue_size: int = 16,
+        torch_threads: Optional[int] = None,
+    ) -> None:
+        """Initialize the worker pool.
+
+        Args:
+            kind: ``"thread"`` or ``"process"``.
+            workers: Number of workers (None for the square root of the number
+                of CPUs, rounded down).
+            queue_size: Number of jobs allowed to wait for a free worker.
+            torch_threads: Intra-op torch threads per worker (None to split the
+                CPUs evenly between workers). Thread workers share torch's
+                thread pool, so this applies to the whole process there.
+
+        Raises:
+            ValueError: If ``kind`` is not supported.
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unsupported worker pool kind: {kind}")
+
+        cpu_count = os.cpu_count() or 1
+        self.kind = kind
+        self.workers = max(1, workers or math.isqrt(cpu_count))
+        self.queue_size = max(0, queue_size)
+        self.torch_threads = max(1, torch_threads or cpu_count // self.workers)
+        self.in_flight = 0
+        self._executor: Optional[Executor] = None
+        self._local_executor: Optional[Executor] = None
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of running plus queued jobs."""
+        return self.workers + self.queue_size
+
+    def _get_executor(self, in_process: bool = False) -> Executor:
+        """Create the underlying executor on first use.
+
+        Thread workers share torch's intra-op thread pool, so its size is
+        set once for the whole process; process workers configure their own.
+
+        Args:
+            in_process: Whether the job must run in this process.
+
+        Returns:
+            Executor running the jobs.
+        """
+        if in_process and self.kind == "process":
+            if self._local_executor is None:
+                torch.set_num_threads(self.torch_threads)
+                self._local_executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="white-balance-local"
+                )
+            return self._local_executor
+
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    # Forking a process with live torch threads can deadlock
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_process_worker,
+                    initargs=(self.torch_threads,),
+                )
+            else:
+                torch.set_num_threads(self.torch_threads)
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="white-balance"
+                )
+            logger.info(
+                f"Started {self.kind} pool with {self.workers} workers, "
+                f"{self.torch_threads} torch threads each, queue size {self.queue_size}"
+            )
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any, in_process: bool = False) -> T:
+        """Run a function in the pool and wait for its result.
+
+        Args:
+            func: Function to call; must be picklable for process pools.
+            *args: Positional arguments for ``func``.
+            in_process: Run on a thread of this process even for process pools.
+                For jobs whose arguments or result live in this process, such
+                as stored images, which would otherwise be pickled to and from
+                a worker on every request.
+
+        Returns:
+            Return value of ``func``.
+
+        Raises:
+            ServiceBusyError: If the pool and its queue are full.
+        """
+        if self.in_flight >= self.capacity:
+            raise ServiceBusyError(
+                f"Server is busy processing {self.in_flight} images, please retry later"
+            )
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(in_process), functools.partial(func, *args)
+            )
+        finally:
+            self.in_flight -= 1
+
+    def shutdown(self) -> None:
+        """Stop the workers, waiting for running jobs to finish."""
+        for executor in (self._executor, self._local_executor):
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+        self._local_executor = None
+
+
+_worker_pool: Optional[WorkerPool] = None
+
+
+def get_worker_pool() -> WorkerPool:
+    """Get the shared worker pool configured from settings.
+
+    Returns:
+        Process-wide worker pool.
+    """
+    global _worker_pool
+    if _worker_pool is None:
+        _worker_pool = WorkerPool(
+            kind=settings.worker_pool_kind,
+            workers=settings.worker_count,
+            queue_size=settings.worker_queue_size,
+            torch_threads=settings.torch_threads,
+        )
+    return _worker_pool
+
+
+def shutdown_worker_pool() -> None:
+    """Shut down the shared worker pool, if it was started."""
+    global _worker_pool
+    if _worker_pool is not None:
+        _worker_pool.shutdown()
+        _worker_pool = None
+
+
+metrics.register(
+    metrics.CallbackMetric(
+        "white_balance_jobs_in_flight",
+        "Processing jobs running or waiting for a worker.",
+        "gauge",
+        lambda: get_worker_pool().in_flight,
+    )
+)
+metrics.register(
+    metrics.CallbackMetric(
+        "white_balance_queue_depth",
+        "Processing jobs waiting for a free worker.",
+        "gauge",
+        lambda: max(0, get_worker_pool().in_flight - get_worker_pool().workers),
+    )
+)
@@ -0,0 +1,144 @@
+"""Benchmark image <-> tensor conversions against the previous implementation.
+
+Each case runs in a fresh process. Linux's peak resident memory counter is
+reset once the inputs exist, so the reported peak is the memory the
+conversion itself needed on top of its inputs.
+
+Usage (from the backend directory)::
+
+    python -m benchmarks.bench_conversions --size 4000x3000 --repeat 5
+"""
+
+import argparse
+import multiprocessing
+from typing import Callable
+
+import numpy as np
+import torch
+from PIL import Image
+
+from app.engine import color_spaces, utils
+from benchmarks.common import measure
+
+
+def legacy_linearize(array: np.ndarray) -> torch.Tensor:
+    """Previous linearization: table lookup, permuted view, then stacked into a batch."""
+    tensor = torch.from_numpy(color_spaces.srgb_to_linear_lut()[array]).permute(2, 0, 1)
+    return torch.stack([tensor])
+
+
+def legacy_normalize(array: np.ndarray) -> torch.Tensor:
+    """Previous float conversion: cast copy, divided copy, then stacked into a batch."""
+    tensor = torch.from_numpy(array.astype(np.float32) / 255.0).permute(2, 0, 1)
+    return torch.stack([tensor])
+
+
+def legacy_encode_srgb(tensor: torch.Tensor, lut_size: int = 4096) -> np.ndarray:
+    """Previous sRGB output: full-size (H, W, C) float copy, then table lookup."""
+    indices = tensor.permute(1, 2, 0).contiguous()
+    indices.clamp_(0.0, 1.0).mul_(lut_size - 1).add_(0.5)
+    return color_spaces.linear_to_srgb_lut(lut_size)[indices.to(torch.int16).numpy()]
+
+
+def legacy_quantize(tensor: torch.Tensor) -> np.ndarray:
+    """Previous uint8 output: clamped copy, scaled copy and cast copy."""
+    array = torch.clamp(tensor, 0.0, 1.0).permute(1, 2, 0).cpu().numpy()
+    return (array * 255.0).astype(np.uint8)
+
+
+def legacy_finish(tensor: torch.Tensor, gains: torch.Tensor) -> np.ndarray:
+    """Previous finish: balanced float copy, then sRGB encoding of the whole image."""
+    return color_spaces.linear_to_srgb_uint8(torch.clamp(tensor * gains[:, None, None], 0.0, 1.0))
+
+
+def current_batch(convert: Callable[..., torch.Tensor], array: np.ndarray) -> torch.Tensor:
+    """Convert an array straight into a preallocated single-image batch."""
+    height, width, channels = array.shape
+    batch = torch.empty((1, channels, height, width))
+    convert(array, out=batch[0])
+    return batch
+
+
+STAGES: dict[str, dict[str, Callable[[dict], object]]] = {
+    "decode": {
+        "legacy": lambda inputs: np.asarray(inputs["image"]),
+        "current": lambda inputs: utils.image_to_array(inputs["image"]),
+    },
+    "linearize": {
+        "legacy": lambda inputs: legacy_linearize(inputs["array"]),
+        "current": lambda inputs: current_batch(
+            color_spaces.srgb_uint8_to_linear, inputs["array"]
+        ),
+    },
+    "normalize": {
+        "legacy": lambda inputs: legacy_normalize(inputs["array"]),
+        "current": lambda inputs: current_batch(utils.array_to_tensor, inputs["array"]),
+    },
+    "encode_srgb": {
+        "legacy": lambda inputs: legacy_encode_srgb(inputs["tensor"]),
+        "current": lambda inputs: color_spaces.linear_to_srgb_uint8(inputs["tensor"]),
+    },
+    "quantize": {
+        "legacy": lambda inputs: legacy_quantize(inputs["tensor"]),
+        "current": lambda inputs: utils.tensor_to_array(inputs["tensor"]),
+    },
+    "finish": {
+        "legacy": lambda inputs: legacy_finish(inputs["tensor"], inputs["gains"]),
+        "current": lambda inputs: color_spaces.finish_uint8(inputs["array"], inputs["gains"]),
+    },
+}
+
+
+def _make_inputs(size: tuple[int, int]) -> dict:
+    """Create a noisy test image, the matching array and tensor, and gains."""
+    width, height = size
+    generator = np.random.default_rng(0)
+    array = generator.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    image = Image.fromarray(array)
+    image.load()
+    # Engine tensors are contiguous (C, H, W)
+    tensor = torch.from_numpy(array).permute(2, 0, 1).contiguous().float().div_(255.0)
+    gains = torch.tensor([1.2, 1.0, 0.8])
+    return {"image": image, "array": array, "tensor": tensor, "gains": gains}
+
+
+def _run_case(
+    stage: str, variant: str, size: tuple[int, int], repeat: int, threads: int
+) -> tuple[float, float]:
+    """Time one conversion and measure its peak memory.
+
+    Returns:
+        Tuple of (best time in milliseconds, peak memory increase in MiB).
+    """
+    torch.set_num_threads(threads)
+    inputs = _make_inputs(size)
+    func = STAGES[stage][variant]
+
+    return measure(lambda: func(inputs), repeat)
+
+
+def main() -> None:
+    """Run all conversions and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="4000x3000", help="Image size as WIDTHxHEIGHT")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case")
+    parser.add_argument("--threads", type=int, default=torch.get_num_threads())
+    args = parser.parse_args()
+    size = tuple(int(value) for value in args.size.lower().split("x"))
+
+    width, height = size
+    image_mb = width * height * 3 / 2**20
+    print(f"uint8 image: {image_mb:.1f} MiB, float32 image: {image_mb * 4:.1f} MiB")
+    context = multiprocessing.get_context("spawn")
+    print(f"{'stage':<12} {'variant':<8} {'best ms':>10} {'peak MiB':>10}")
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        for stage, variants in STAGES.items():
+            for variant in variants:
+                millis, peak = pool.apply(
+                    _run_case, (stage, variant, size, args.repeat, args.threads)
+                )
+                print(f"{stage:<12} {variant:<8} {millis:>10.1f} {peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark the grey edge gradient stages against the previous implementation.
+
+Each stage runs in a fresh process, so memory freed by earlier stages does
+not hide the peak memory of later ones.
+
+Usage (from the backend directory)::
+
+    python -m benchmarks.bench_grey_edge --size 4000x3000 --repeat 5
+"""
+
+import argparse
+import multiprocessing
+from typing import Callable
+
+import torch
+
+from app.engine import white_balance_grey_edge as grey_edge
+from app.engine.utils import select_quantile
+from benchmarks.common import measure
+
+
+def legacy_gradients(image: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor]:
+    """Previous gradient stage: one convolution per Sobel direction."""
+    sobel_x = torch.tensor([[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]], dtype=image.dtype).view(
+        1, 1, 3, 3
+    )
+    sobel_y = torch.tensor([[-1, -2, -1], [0, 0, 0], [1, 2, 1]], dtype=image.dtype).view(
+        1, 1, 3, 3
+    )
+    height, width = image.shape[-2:]
+    channels = image.reshape(-1, 1, height, width)
+    grad_x = torch.nn.functional.conv2d(channels, sobel_x, padding=1).view_as(image)
+    grad_y = torch.nn.functional.conv2d(channels, sobel_y, padding=1).view_as(image)
+    return grad_x, grad_y
+
+
+def legacy_gradient_magnitude(image: torch.Tensor, p: float) -> torch.Tensor:
+    """Previous magnitude stage: separate full-size temporaries per operation."""
+    grad_x, grad_y = legacy_gradients(image)
+    return torch.pow(torch.pow(torch.abs(grad_x), p) + torch.pow(torch.abs(grad_y), p), 1.0 / p)
+
+
+def legacy_estimate(image: torch.Tensor, p: float) -> torch.Tensor:
+    """Previous grey edge estimate built on the legacy magnitude."""
+    magnitude = legacy_gradient_magnitude(image, p)
+    threshold = select_quantile(magnitude.flatten(-3), 0.95, dim=-1)
+    edge_mask = magnitude >= threshold[..., None, None, None]
+    edge_counts = edge_mask.sum(dim=(-2, -1))
+    edge_sums = (image * edge_mask).sum(dim=(-2, -1))
+    edge_means = torch.where(
+        edge_counts > 0, edge_sums / edge_counts.clamp_min(1), image.mean(dim=(-2, -1))
+    )
+    return grey_edge.grey_edge_gains(edge_means)
+
+
+STAGES: dict[str, dict[str, Callable[[torch.Tensor, float], object]]] = {
+    "gradients": {
+        "legacy": lambda image, p: legacy_gradients(image),
+        "current": lambda image, p: grey_edge.compute_gradients(image),
+    },
+    "magnitude": {
+        "legacy": legacy_gradient_magnitude,
+        "current": grey_edge.compute_gradient_magnitude,
+    },
+    "estimate": {
+        "legacy": legacy_estimate,
+        "current": lambda image, p: grey_edge.estimate_grey_edge(image, 0.0, p),
+    },
+}
+
+
+def _run_case(
+    stage: str, variant: str, size: tuple[int, int], p: float, repeat: int, threads: int
+) -> tuple[float, float]:
+    """Time one stage implementation and measure its peak memory.
+
+    Returns:
+        Tuple of (best time in milliseconds, peak memory increase in MiB).
+    """
+    torch.set_num_threads(threads)
+    width, height = size
+    image = torch.rand(3, height, width)
+    func = STAGES[stage][variant]
+    return measure(lambda: func(image, p), repeat)
+
+
+def main() -> None:
+    """Run all stages and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="4000x3000", help="Image size as WIDTHxHEIGHT")
+    parser.add_argument("--p", type=float, default=6.0, help="Minkowski norm parameter")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case")
+    parser.add_argument("--threads", type=int, default=torch.get_num_threads())
+    args = parser.parse_args()
+    size = tuple(int(value) for value in args.size.lower().split("x"))
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'stage':<10} {'variant':<8} {'best ms':>10} {'peak MiB':>10}")
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        for stage, variants in STAGES.items():
+            for variant in variants:
+                millis, peak = pool.apply(
+                    _run_case, (stage, variant, size, args.p, args.repeat, args.threads)
+                )
+                print(f"{stage:<10} {variant:<8} {millis:>10.1f} {peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
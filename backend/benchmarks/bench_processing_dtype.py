@@ -0,0 +1,187 @@
+"""Benchmark processing dtypes for speed, peak memory and accuracy against float32.
+
+Every case runs the in-memory pipeline on a synthetic scene in a fresh
+process, as the service does: linearize into the processing dtype,
+downscale to the estimation proxy, estimate gains (always in float32), then
+apply them and encode to 8-bit sRGB with the fused finish stage. Without a
+proxy the service linearizes into float32 whatever the setting, so the
+benchmark does too. It reports the time of the full-resolution elementwise
+stages, the estimation time, the peak memory above the decoded input, and
+the CIE76 color difference (Delta E) of the output from the float32 output.
+
+Usage (from the backend directory)::
+
+    python -m benchmarks.bench_processing_dtype --size 4000x3000 --repeat 3
+    python -m benchmarks.bench_processing_dtype --estimation-max-edge 0
+"""
+
+import argparse
+import multiprocessing
+import time
+from typing import Optional
+
+import numpy as np
+import torch
+from PIL import Image
+
+from app.engine import color_spaces, registry, utils
+from app.engine.statistics import ImageStatistics
+from benchmarks.common import memory_mb, reset_peak_rss
+
+DTYPES = ("float32", "float16", "bfloat16")
+
+# Linear sRGB (D65) to CIE XYZ, and the D65 reference white
+SRGB_TO_XYZ = np.array(
+    [[0.4124, 0.3576, 0.1805], [0.2126, 0.7152, 0.0722], [0.0193, 0.1192, 0.9505]]
+)
+D65_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+
+def make_scene(size: tuple[int, int], seed: int = 0) -> np.ndarray:
+    """Create a smooth, textured scene under a warm color cast.
+
+    Args:
+        size: (width, height) of the scene.
+        seed: Random seed.
+
+    Returns:
+        Array of shape (H, W, 3) with dtype uint8 in sRGB.
+    """
+    width, height = size
+    generator = np.random.default_rng(seed)
+    coarse = generator.integers(0, 256, (24, 32, 3), dtype=np.uint8)
+    field = np.asarray(Image.fromarray(coarse).resize((width, height), Image.BICUBIC))
+    noise = generator.normal(0.0, 6.0, (height, width, 3))
+    cast = np.array([1.0, 0.85, 0.6])
+    return np.clip(field * cast + noise, 0, 255).astype(np.uint8)
+
+
+def srgb_to_lab(array: np.ndarray) -> np.ndarray:
+    """Convert 8-bit sRGB pixels to CIELAB under D65.
+
+    Args:
+        array: Array of shape (H, W, 3) with dtype uint8.
+
+    Returns:
+        Float64 array of shape (H, W, 3) with L*, a* and b*.
+    """
+    linear = color_spaces.srgb_to_linear_lut()[array].astype(np.float64)
+    xyz = linear @ SRGB_TO_XYZ.T / D65_WHITE
+    delta = 6.0 / 29.0
+    f = np.where(xyz > delta**3, np.cbrt(xyz), xyz / (3 * delta**2) + 4.0 / 29.0)
+    lightness = 116.0 * f[..., 1] - 16.0
+    return np.stack(
+        [lightness, 500.0 * (f[..., 0] - f[..., 1]), 200.0 * (f[..., 1] - f[..., 2])], axis=-1
+    )
+
+
+def _run_pipeline(
+    array: np.ndarray, dtype: torch.dtype, algorithm: str, max_edge: Optional[int]
+) -> tuple[np.ndarray, torch.Tensor, float, float]:
+    """Run linearize, estimate on a proxy, apply and encode.
+
+    Returns:
+        Tuple of (output array, gains, elementwise stage seconds, estimation seconds).
+    """
+    if max_edge is None or max(array.shape[:2]) <= max_edge:
+        dtype = torch.float32
+
+    start = time.perf_counter()
+    tensor = color_spaces.srgb_uint8_to_linear(array, dtype=dtype)
+    linearize_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    proxy = utils.downscale_to_max_edge(tensor, max_edge)
+    gains = registry.get_algorithm(algorithm).estimate_gains(ImageStatistics(proxy))
+    estimate_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    output = color_spaces.finish_uint8(array, gains)
+    apply_time = time.perf_counter() - start
+    return output, gains, linearize_time + apply_time, estimate_time
+
+
+def _run_case(
+    dtype_name: str,
+    algorithm: str,
+    size: tuple[int, int],
+    max_edge: Optional[int],
+    repeat: int,
+    threads: int,
+) -> dict[str, float]:
+    """Measure one dtype and algorithm against the float32 pipeline.
+
+    Returns:
+        Best times in milliseconds, peak memory increase in MiB, gain error
+        in degrees and Delta E statistics.
+    """
+    torch.set_num_threads(threads)
+    dtype = getattr(torch, dtype_name)
+    array = make_scene(size)
+
+    reset_peak_rss()
+    baseline = memory_mb("VmRSS")
+    output, gains, _, _ = _run_pipeline(array, dtype, algorithm, max_edge)
+    peak = memory_mb("VmHWM") - baseline
+
+    elementwise = estimation = float("inf")
+    for _ in range(repeat):
+        _, _, elementwise_time, estimate_time = _run_pipeline(array, dtype, algorithm, max_edge)
+        elementwise = min(elementwise, elementwise_time)
+        estimation = min(estimation, estimate_time)
+
+    reference, reference_gains, _, _ = _run_pipeline(array, torch.float32, algorithm, max_edge)
+    delta_e = np.linalg.norm(srgb_to_lab(output) - srgb_to_lab(reference), axis=-1)
+    return {
+        "elementwise_ms": elementwise * 1000.0,
+        "estimate_ms": estimation * 1000.0,
+        "peak_mb": peak,
+        "gain_error_deg": utils.angular_error(gains, reference_gains).item(),
+        "max_delta_e": float(delta_e.max()),
+        "p99_delta_e": float(np.percentile(delta_e, 99)),
+        "changed_pct": float((delta_e > 0).mean() * 100.0),
+    }
+
+
+def main() -> None:
+    """Run all dtypes and algorithms and print a comparison table."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="4000x3000", help="Image size as WIDTHxHEIGHT")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case")
+    parser.add_argument("--threads", type=int, default=torch.get_num_threads())
+    parser.add_argument(
+        "--estimation-max-edge",
+        type=int,
+        default=1024,
+        help="Long edge of the estimation proxy (0 estimates at full resolution)",
+    )
+    parser.add_argument(
+        "--algorithms", default="grey_world,grey_edge", help="Comma-separated algorithms"
+    )
+    args = parser.parse_args()
+    size = tuple(int(value) for value in args.size.lower().split("x"))
+    megapixels = size[0] * size[1] / 1e6
+    max_edge = args.estimation_max_edge or None
+
+    context = multiprocessing.get_context("spawn")
+    print(
+        f"{'algorithm':<12} {'dtype':<9} {'apply MP/s':>10} {'est ms':>8} {'peak MiB':>9} "
+        f"{'gain deg':>9} {'max dE':>7} {'p99 dE':>7} {'changed':>8}"
+    )
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        for algorithm in args.algorithms.split(","):
+            for dtype_name in DTYPES:
+                result = pool.apply(
+                    _run_case, (dtype_name, algorithm, size, max_edge, args.repeat, args.threads)
+                )
+                print(
+                    f"{algorithm:<12} {dtype_name:<9} "
+                    f"{megapixels / result['elementwise_ms'] * 1000.0:>10.1f} "
+                    f"{result['estimate_ms']:>8.1f} {result['peak_mb']:>9.1f} "
+                    f"{result['gain_error_deg']:>9.4f} {result['max_delta_e']:>7.2f} "
+                    f"{result['p99_delta_e']:>7.2f} {result['changed_pct']:>7.2f}%"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,484 @@
+"""Benchmark the engine and the service apply path, and gate on a stored baseline.
+
+Deterministic synthetic scenes (see :mod:`benchmarks.scenes`) are generated
+once per size. Each case then runs in a fresh process and records the best
+wall time, the peak resident memory above its inputs and, for estimators,
+the angular error of the estimated illuminant from the true one:
+
+- ``engine/*``: single engine functions on a decoded image, for sizes that
+  the service processes in memory.
+- ``service/*``: the stages of the service apply path (decode, convert,
+  estimate, apply, encode) as the service runs them, for the same sizes.
+- ``service/total``: the whole apply path from encoded bytes to encoded
+  bytes at every size, band by band above ``TILED_MIN_MEGAPIXELS``.
+
+With ``--baseline`` the results are compared to a previous run and the
+command exits with status 1 if any case got slower, used more memory or
+became less accurate than the tolerances allow, or failed when it passed
+before. ``--update-baseline`` stores the results as the new baseline.
+
+Usage (from the backend directory)::
+
+    python -m benchmarks.bench_suite --sizes 1,12,48,100 --update-baseline --baseline base.json
+    python -m benchmarks.bench_suite --sizes 1,12,48,100 --baseline base.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+import numpy as np
+import PIL
+import torch
+from PIL import Image
+
+from app.core.config import settings
+from app.engine import color_spaces, registry, utils
+from app.engine.statistics import ImageStatistics
+from app.engine.white_balance_grey_edge import smooth_image
+from app.models.api_schemas import WhiteBalanceRequest
+from app.models.enums import OutputFormat
+from app.services.image_encoding import encode_image
+from app.services.white_balance_service import WhiteBalanceService
+from benchmarks import scenes
+from benchmarks.common import measure
+
+# Slowdowns and memory increases below these absolute amounts are treated as noise
+MIN_TIME_REGRESSION_MS = 5.0
+MIN_MEMORY_REGRESSION_MB = 8.0
+
+ENGINE_CASES = ("image_to_array", "srgb_uint8_to_linear", "smooth_image", "finish_uint8")
+SERVICE_STAGES = ("decode", "convert", "estimate", "apply", "encode")
+
+
+class Scene:
+    """Paths of one generated scene and its ground truth."""
+
+    def __init__(self, directory: str, megapixels: float, cast: str) -> None:
+        """Initialize the paths of a scene.
+
+        Args:
+            directory: Directory holding the scene files.
+            megapixels: Scene size in millions of pixels.
+            cast: Name of the illuminant in :data:`scenes.CASTS`.
+        """
+        self.megapixels = megapixels
+        self.cast = cast
+        self.array_path = os.path.join(directory, f"{megapixels:g}mp.npy")
+        self.png_path = os.path.join(directory, f"{megapixels:g}mp.png")
+
+    def create(self) -> None:
+        """Generate the scene and store it as an array and as a PNG."""
+        array = scenes.make_scene(self.megapixels, self.cast)
+        np.save(self.array_path, array)
+        # Level 1 keeps generation fast; decoding cost barely depends on the level
+        Image.fromarray(array).save(self.png_path, compress_level=1)
+
+    def load_array(self) -> np.ndarray:
+        """Load the decoded scene of shape (H, W, 3) with dtype uint8."""
+        return np.load(self.array_path)
+
+    def load_bytes(self) -> bytes:
+        """Load the PNG-encoded scene."""
+        with open(self.png_path, "rb") as file:
+            return file.read()
+
+
+def _error(gains: torch.Tensor, cast: str) -> float:
+    """Angular error in degrees of gains from the true gains of a cast."""
+    return utils.angular_error(gains.float(), scenes.true_gains(cast)).item()
+
+
+def _record(
+    results: dict[str, dict[str, Any]], name: str, func: Callable[[], Any], repeat: int
+) -> Any:
+    """Measure a stage, store its metrics under ``name`` and return its last output."""
+    holder: dict[str, Any] = {}
+
+    def run() -> None:
+        holder.pop("output", None)
+        holder["output"] = func()
+
+    millis, peak = measure(run, repeat)
+    results[name] = {"ms": millis, "peak_mb": peak}
+    return holder["output"]
+
+
+def _run_engine_case(scene: Scene, case: str, repeat: int) -> dict[str, dict[str, Any]]:
+    """Run one engine function on a scene.
+
+    Args:
+        scene: Scene to process.
+        case: One of :data:`ENGINE_CASES`, or ``estimate/<algorithm>``.
+        repeat: Timed runs after the first.
+
+    Returns:
+        Metrics keyed by case name.
+    """
+    results: dict[str, dict[str, Any]] = {}
+    name = f"engine/{case}"
+    array = scene.load_array()
+    gains = scenes.true_gains(scene.cast)
+
+    if case == "image_to_array":
+        image = Image.fromarray(array)
+        image.load()
+        _record(results, name, lambda: utils.image_to_array(image), repeat)
+    elif case == "srgb_uint8_to_linear":
+        _record(results, name, lambda: color_spaces.srgb_uint8_to_linear(array), repeat)
+    elif case == "finish_uint8":
+        _record(results, name, lambda: color_spaces.finish_uint8(array, gains), repeat)
+    else:
+        tensor = color_spaces.srgb_uint8_to_linear(array)
+        del array
+        if case == "smooth_image":
+            _record(results, name, lambda: smooth_image(tensor, 1.0), repeat)
+        else:
+            spec = registry.get_algorithm(case.split("/", 1)[1])
+            estimate = _record(
+                results, name, lambda: spec.estimate_gains(ImageStatistics(tensor)), repeat
+            )
+            results[name]["error_deg"] = _error(estimate, scene.cast)
+    return results
+
+
+def _run_service_stages(
+    scene: Scene, request: WhiteBalanceRequest, repeat: int
+) -> dict[str, dict[str, Any]]:
+    """Run the in-memory service apply path stage by stage.
+
+    The stages call the same service methods as ``_apply_bytes``, in the
+    same order, so each one sees the inputs the service would give it.
+
+    Args:
+        scene: Scene to process.
+        request: White balance request parameters.
+        repeat: Timed runs after the first.
+
+    Returns:
+        Metrics keyed by ``service/<stage>``.
+    """
+    service = WhiteBalanceService()
+    results: dict[str, dict[str, Any]] = {}
+    image_bytes = scene.load_bytes()
+    _, input_space, processing_space = service._resolve_request(request)
+    linearize = service._needs_linearization(input_space, processing_space)
+
+    array = _record(
+        results,
+        "service/decode",
+        lambda: utils.image_to_array(service._load_image(image_bytes)),
+        repeat,
+    )
+    del image_bytes
+    batch = _record(
+        results,
+        "service/convert",
+        lambda: service._to_processing_tensor(
+            array,
+            linearize,
+            dtype=service._proxy_source_dtype(request, array.shape[1], array.shape[0]),
+        ).unsqueeze(0),
+        repeat,
+    )
+    gains, _, _ = _record(
+        results,
+        "service/estimate",
+        lambda: service._estimate_on_proxy(
+            batch,
+            request,
+            service._estimation_max_edge(request, batch.shape[-1], batch.shape[-2]),
+            False,
+        ),
+        repeat,
+    )
+    results["service/estimate"]["error_deg"] = _error(gains[0], scene.cast)
+    del batch
+    output = _record(
+        results, "service/apply", lambda: service._finish(array, gains[0], linearize), repeat
+    )
+    output_format = OutputFormat(request.output_format)
+    _record(
+        results,
+        "service/encode",
+        lambda: encode_image(
+            output, output_format, request.output_quality, request.compress_level
+        ),
+        repeat,
+    )
+    return results
+
+
+def _run_service_total(
+    scene: Scene, request: WhiteBalanceRequest, repeat: int
+) -> dict[str, dict[str, Any]]:
+    """Run the whole service apply path from encoded bytes to encoded bytes.
+
+    Args:
+        scene: Scene to process.
+        request: White balance request parameters.
+        repeat: Timed runs after the first.
+
+    Returns:
+        Metrics keyed by ``service/total``.
+    """
+    service = WhiteBalanceService()
+    results: dict[str, dict[str, Any]] = {}
+    image_bytes = scene.load_bytes()
+    result = _record(
+        results, "service/total", lambda: service._apply_bytes(image_bytes, request), repeat
+    )
+    results["service/total"]["error_deg"] = _error(torch.tensor(result.gains), scene.cast)
+    return results
+
+
+def _run_case(
+    runner: Callable[..., dict[str, dict[str, Any]]], args: tuple, threads: int
+) -> dict[str, dict[str, Any]]:
+    """Set up a worker process and run one case in it."""
+    torch.set_num_threads(threads)
+    return runner(*args)
+
+
+def _run_isolated(
+    runner: Callable[..., dict[str, dict[str, Any]]],
+    args: tuple,
+    names: list[str],
+    threads: int,
+) -> dict[str, dict[str, Any]]:
+    """Run a case in a fresh process, recording a crash (e.g. out of memory) as failure.
+
+    Args:
+        runner: Case function.
+        args: Arguments of ``runner``.
+        names: Result names the case produces, used to record a failure.
+        threads: Torch intra-op threads.
+
+    Returns:
+        Metrics keyed by result name.
+    """
+    context = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(1, mp_context=context) as executor:
+            return executor.submit(_run_case, runner, args, threads).result()
+    except BrokenProcessPool:
+        return {name: {"failed": True} for name in names}
+
+
+def run_suite(
+    sizes: list[float],
+    algorithms: list[str],
+    request: WhiteBalanceRequest,
+    cast: str,
+    repeat: int,
+    threads: int,
+    report: Callable[[str, dict[str, Any]], None],
+) -> dict[str, dict[str, Any]]:
+    """Run all cases for the given scene sizes.
+
+    Args:
+        sizes: Scene sizes in millions of pixels.
+        algorithms: Algorithms for the ``engine/estimate/*`` cases.
+        request: Request of the ``service/*`` cases.
+        cast: Name of the scene illuminant.
+        repeat: Timed runs after the first, per case.
+        threads: Torch intra-op threads.
+        report: Called with each result as it completes.
+
+    Returns:
+        Metrics keyed by ``<size>mp/<case>``.
+    """
+    service = WhiteBalanceService()
+    results: dict[str, dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="bench_suite_") as directory:
+        for megapixels in sizes:
+            scene = Scene(directory, megapixels, cast)
+            scene.create()
+            prefix = f"{megapixels:g}mp/"
+
+            runs: list[tuple[Callable[..., dict[str, dict[str, Any]]], tuple, list[str]]] = []
+            if not service._should_tile(*scenes.scene_size(megapixels)):
+                cases = list(ENGINE_CASES) + [f"estimate/{name}" for name in algorithms]
+                runs += [
+                    (_run_engine_case, (scene, case, repeat), [f"engine/{case}"])
+                    for case in cases
+                ]
+                runs.append(
+                    (
+                        _run_service_stages,
+                        (scene, request, repeat),
+                        [f"service/{stage}" for stage in SERVICE_STAGES],
+                    )
+                )
+            runs.append((_run_service_total, (scene, request, repeat), ["service/total"]))
+
+            for runner, args, names in runs:
+                for name, metrics in _run_isolated(runner, args, names, threads).items():
+                    metrics["megapixels"] = megapixels
+                    results[prefix + name] = metrics
+                    report(prefix + name, metrics)
+            os.remove(scene.array_path)
+            os.remove(scene.png_path)
+    return results
+
+
+def compare_to_baseline(
+    results: dict[str, dict[str, Any]],
+    baseline: dict[str, dict[str, Any]],
+    time_tolerance: float,
+    memory_tolerance: float,
+    error_tolerance_deg: float,
+) -> list[str]:
+    """Find cases that regressed relative to a baseline.
+
+    Cases missing from either side are ignored, so a run may cover a subset
+    of the baseline sizes.
+
+    Args:
+        results: Metrics of this run.
+        baseline: Metrics of the baseline run.
+        time_tolerance: Allowed relative slowdown, e.g. 0.25 for 25%.
+        memory_tolerance: Allowed relative peak memory increase.
+        error_tolerance_deg: Allowed angular error increase in degrees.
+
+    Returns:
+        One message per regression.
+    """
+    regressions = []
+    for name, before in baseline.items():
+        after = results.get(name)
+        if after is None or before.get("failed"):
+            continue
+        if after.get("failed"):
+            regressions.append(f"{name}: failed, passed in baseline")
+            continue
+        if (
+            after["ms"] > before["ms"] * (1.0 + time_tolerance)
+            and after["ms"] - before["ms"] > MIN_TIME_REGRESSION_MS
+        ):
+            regressions.append(f"{name}: time {before['ms']:.1f} -> {after['ms']:.1f} ms")
+        if (
+            after["peak_mb"] > before["peak_mb"] * (1.0 + memory_tolerance)
+            and after["peak_mb"] - before["peak_mb"] > MIN_MEMORY_REGRESSION_MB
+        ):
+            regressions.append(
+                f"{name}: peak memory {before['peak_mb']:.1f} -> {after['peak_mb']:.1f} MiB"
+            )
+        if "error_deg" in before and after["error_deg"] > before["error_deg"] + error_tolerance_deg:
+            regressions.append(
+                f"{name}: error {before['error_deg']:.3f} -> {after['error_deg']:.3f} deg"
+            )
+    return regressions
+
+
+def _environment(threads: int) -> dict[str, Any]:
+    """Describe the software and settings results depend on."""
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "torch": torch.__version__,
+        "numpy": np.__version__,
+        "pillow": PIL.__version__,
+        "threads": threads,
+        "processing_dtype": settings.processing_dtype,
+        "tiled_min_megapixels": settings.tiled_min_megapixels,
+        "estimation_max_edge": settings.estimation_max_edge,
+    }
+
+
+def _print_result(name: str, metrics: dict[str, Any]) -> None:
+    """Print one result row."""
+    if metrics.get("failed"):
+        print(f"{name:<40} {'failed':>10}", flush=True)
+        return
+    error = f"{metrics['error_deg']:.3f}" if "error_deg" in metrics else ""
+    print(
+        f"{name:<40} {metrics['ms']:>10.1f} "
+        f"{metrics['megapixels'] / metrics['ms'] * 1000.0:>8.1f} "
+        f"{metrics['peak_mb']:>9.1f} {error:>9}",
+        flush=True,
+    )
+
+
+def main() -> Optional[int]:
+    """Run the suite, then store or compare against the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1,12,48,100", help="Comma-separated megapixels")
+    parser.add_argument("--repeat", type=int, default=2, help="Timed runs per case")
+    parser.add_argument("--threads", type=int, default=torch.get_num_threads())
+    parser.add_argument(
+        "--algorithms",
+        default=",".join(spec.name for spec in registry.list_algorithms()),
+        help="Comma-separated algorithms for the engine estimate cases",
+    )
+    parser.add_argument("--service-algorithm", default="grey_world")
+    parser.add_argument("--output-format", default="png", choices=[f.value for f in OutputFormat])
+    parser.add_argument("--cast", default="tungsten", choices=sorted(scenes.CASTS))
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Baseline JSON file to compare against")
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="Store the results as the baseline"
+    )
+    parser.add_argument("--time-tolerance", type=float, default=0.25)
+    parser.add_argument("--memory-tolerance", type=float, default=0.10)
+    parser.add_argument("--error-tolerance-deg", type=float, default=0.05)
+    args = parser.parse_args()
+
+    request = WhiteBalanceRequest(
+        algorithm=args.service_algorithm, output_format=args.output_format
+    )
+    environment = _environment(args.threads)
+    print(f"{'case':<40} {'best ms':>10} {'MP/s':>8} {'peak MiB':>9} {'error deg':>9}")
+    results = run_suite(
+        [float(size) for size in args.sizes.split(",")],
+        args.algorithms.split(","),
+        request,
+        args.cast,
+        args.repeat,
+        args.threads,
+        _print_result,
+    )
+    report = {"environment": environment, "results": results}
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    if not args.baseline:
+        return None
+    if args.update_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Stored baseline in {args.baseline}")
+        return None
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if baseline["environment"] != environment:
+        print("Warning: baseline was recorded in a different environment:")
+        for key, value in baseline["environment"].items():
+            if environment.get(key) != value:
+                print(f"  {key}: {value} (now {environment.get(key)})")
+    regressions = compare_to_baseline(
+        results,
+        baseline["results"],
+        args.time_tolerance,
+        args.memory_tolerance,
+        args.error_tolerance_deg,
+    )
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        return 1
+    print("No regressions against the baseline")
+    return None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
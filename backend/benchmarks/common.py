@@ -0,0 +1,55 @@
+"""Shared measurement helpers for the benchmarks.
+
+Peak memory is read from Linux's ``/proc/self/status``. Resetting the
+peak counter once a case's inputs exist makes the reported peak the memory
+the measured code itself needed.
+"""
+
+import time
+from typing import Callable
+
+
+def memory_mb(field: str) -> float:
+    """Read a memory field of this process from /proc in MiB (reported in KiB).
+
+    Args:
+        field: Field name, for example ``"VmRSS"`` or ``"VmHWM"``.
+
+    Returns:
+        Field value in MiB.
+    """
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    raise KeyError(field)
+
+
+def reset_peak_rss() -> None:
+    """Reset the peak resident set size of this process to its current size."""
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+
+
+def measure(func: Callable[[], object], repeat: int) -> tuple[float, float]:
+    """Measure the peak memory of a first call and the best time of further calls.
+
+    Args:
+        func: Code to measure.
+        repeat: Number of timed calls after the first.
+
+    Returns:
+        Tuple of (best time in milliseconds, peak memory increase in MiB).
+    """
+    reset_peak_rss()
+    baseline = memory_mb("VmRSS")
+    start = time.perf_counter()
+    func()
+    best = time.perf_counter() - start
+    peak = memory_mb("VmHWM") - baseline
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0, peak
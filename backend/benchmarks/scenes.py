@@ -0,0 +1,104 @@
+"""Deterministic synthetic scenes under known illuminants.
+
+A scene is a Mondrian: random flat rectangles of grey-to-saturated surface
+reflectances, lit by one illuminant color, encoded to 8-bit sRGB and
+upscaled with nearest-neighbor sampling so that every size keeps the same
+layout. Light sensor noise is added strip by strip from generators seeded
+by the strip index, so a scene only depends on its size, cast and seed.
+The ideal gains are the inverse of the illuminant, which gives estimators
+a ground truth to be scored against.
+"""
+
+import math
+
+import numpy as np
+import torch
+
+from app.engine import color_spaces
+
+# Illuminant colors in linear RGB, normalized to a maximum of one
+CASTS: dict[str, tuple[float, float, float]] = {
+    "neutral": (1.0, 1.0, 1.0),
+    "tungsten": (1.0, 0.78, 0.52),
+    "shade": (0.82, 0.92, 1.0),
+    "fluorescent": (0.86, 1.0, 0.8),
+}
+
+# (width, height) of the patch layout, which sets the 4:3 aspect ratio
+LAYOUT_SIZE = (64, 48)
+PATCH_COUNT = 160
+# Rows per noise strip; fixed so that scenes do not depend on engine chunk sizes
+NOISE_STRIP_ROWS = 256
+
+
+def scene_size(megapixels: float) -> tuple[int, int]:
+    """Get the 4:3 (width, height) closest to a pixel count.
+
+    Args:
+        megapixels: Number of pixels in millions.
+
+    Returns:
+        (width, height) in pixels.
+    """
+    layout_width, layout_height = LAYOUT_SIZE
+    height = max(1, round(math.sqrt(megapixels * 1e6 * layout_height / layout_width)))
+    return round(height * layout_width / layout_height), height
+
+
+def true_gains(cast: str) -> torch.Tensor:
+    """Get the ideal gains for a scene lit by one of :data:`CASTS`.
+
+    Args:
+        cast: Name of the illuminant.
+
+    Returns:
+        Tensor of shape (3,) with gains in linear RGB.
+    """
+    return 1.0 / torch.tensor(CASTS[cast])
+
+
+def _make_layout(cast: str, seed: int) -> np.ndarray:
+    """Draw the small Mondrian layout of a scene in 8-bit sRGB."""
+    width, height = LAYOUT_SIZE
+    generator = np.random.default_rng(seed)
+    reflectance = np.full((height, width, 3), 0.4)
+    for _ in range(PATCH_COUNT):
+        left, top = generator.integers(0, width), generator.integers(0, height)
+        right = min(width, left + generator.integers(2, width // 4))
+        bottom = min(height, top + generator.integers(2, height // 4))
+        # Mix a grey level with a saturated color so that patches span both
+        grey = generator.uniform(0.05, 0.9)
+        reflectance[top:bottom, left:right] = grey * generator.uniform(0.3, 1.0, 3)
+
+    linear = torch.from_numpy(reflectance * np.array(CASTS[cast])).float()
+    return color_spaces.linear_to_srgb_uint8(linear.permute(2, 0, 1).contiguous())
+
+
+def make_scene(
+    megapixels: float, cast: str = "tungsten", seed: int = 0, noise: int = 2
+) -> np.ndarray:
+    """Create a deterministic scene lit by a known illuminant.
+
+    Args:
+        megapixels: Number of pixels in millions; the scene is 4:3.
+        cast: Name of the illuminant in :data:`CASTS`.
+        seed: Seed of the layout and the noise.
+        noise: Maximum sensor noise in 8-bit code values.
+
+    Returns:
+        Array of shape (H, W, 3) with dtype uint8 in sRGB.
+    """
+    layout = _make_layout(cast, seed)
+    layout_height, layout_width = layout.shape[:2]
+    width, height = scene_size(megapixels)
+    columns = np.arange(width) * layout_width // width
+
+    scene = np.empty((height, width, 3), dtype=np.uint8)
+    for index, top in enumerate(range(0, height, NOISE_STRIP_ROWS)):
+        bottom = min(height, top + NOISE_STRIP_ROWS)
+        rows = np.arange(top, bottom) * layout_height // height
+        strip = layout[rows[:, None], columns].astype(np.int16)
+        generator = np.random.default_rng((seed, index))
+        strip += generator.integers(-noise, noise + 1, strip.shape, dtype=np.int16)
+        np.clip(strip, 0, 255, out=scene[top:bottom], casting="unsafe")
+    return scene
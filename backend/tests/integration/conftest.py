@@ -0,0 +1,39 @@
+"""Shared fixtures for the API integration tests."""
+
+import io
+import itertools
+from typing import Callable, Iterator
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.main import app
+
+_seeds = itertools.count()
+
+
+@pytest.fixture(scope="session")
+def client() -> Iterator[TestClient]:
+    """Create a test client for the application."""
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def random_png() -> Callable[..., bytes]:
+    """Create PNG images with random pixels, a different one on every call.
+
+    Distinct content keeps tests from sharing entries in the result cache
+    and the image store.
+    """
+
+    def make(width: int = 48, height: int = 32) -> bytes:
+        generator = np.random.default_rng(next(_seeds))
+        pixels = generator.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, "PNG")
+        return buffer.getvalue()
+
+    return make
@@ -0,0 +1,104 @@
+"""Integration tests for comparing algorithms with /compare."""
+
+import base64
+import io
+import json
+
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+from app.services.white_balance_service import WhiteBalanceService
+
+PREFIX = "/api/v1/white-balance"
+
+
+@pytest.fixture
+def decodes(monkeypatch) -> list[str]:
+    """Record the image IDs decoded by the service."""
+    decoded: list[str] = []
+    decode = WhiteBalanceService._decode_for_store
+
+    def recording_decode(self, image_id, image_bytes):
+        decoded.append(image_id)
+        return decode(self, image_id, image_bytes)
+
+    monkeypatch.setattr(WhiteBalanceService, "_decode_for_store", recording_decode)
+    return decoded
+
+
+def test_compare_decodes_once_and_returns_one_result_per_algorithm(client, random_png, decodes):
+    algorithms = ["grey_world", "grey_edge", "white_patch"]
+
+    response = client.post(
+        f"{PREFIX}/compare",
+        params={"algorithms": algorithms},
+        files={"file": ("a.png", random_png(), "image/png")},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert len(decodes) == 1
+    assert [result["algorithm"] for result in body["results"]] == algorithms
+    for result in body["results"]:
+        assert len(result["gains"]) == 3
+        image = Image.open(io.BytesIO(base64.b64decode(result["image_base64"])))
+        assert image.size == (body["width"], body["height"])
+
+
+def test_compare_variants_override_shared_parameters(client, random_png):
+    variants = [{"algorithm": "grey_edge", "sigma": 0}, {"algorithm": "grey_edge", "sigma": 3}]
+
+    response = client.post(
+        f"{PREFIX}/compare",
+        data={"variants": json.dumps(variants)},
+        files={"file": ("a.png", random_png(), "image/png")},
+    )
+
+    assert response.status_code == 200
+    first, second = response.json()["results"]
+    assert first["gains"] != second["gains"]
+
+
+def test_compare_stored_image_skips_decode(client, random_png, decodes):
+    upload = client.post(f"{PREFIX}/images", files={"file": ("a.png", random_png(), "image/png")})
+    image_id = upload.json()["image_id"]
+    decodes.clear()
+
+    response = client.post(
+        f"{PREFIX}/compare", params={"image_id": image_id, "algorithms": ["grey_world"]}
+    )
+
+    assert response.status_code == 200
+    assert decodes == []
+
+
+@pytest.mark.parametrize(
+    "params, data, status_code",
+    [
+        ({"algorithms": ["not_an_algorithm"]}, None, 422),
+        ({}, {"variants": "not json"}, 400),
+        ({}, {"variants": "[]"}, 400),
+        ({}, {"variants": '[{"algorithm": "grey_edge", "sigma": -1}]'}, 400),
+        ({}, {"variants": json.dumps([{"algorithm": "grey_world"}] * 3)}, 400),
+    ],
+)
+def test_invalid_variant_lists_are_rejected(
+    client, random_png, monkeypatch, params, data, status_code
+):
+    monkeypatch.setattr(settings, "max_compare_variants", 2)
+
+    response = client.post(
+        f"{PREFIX}/compare",
+        params=params,
+        data=data,
+        files={"file": ("a.png", random_png(), "image/png")},
+    )
+
+    assert response.status_code == status_code
+
+
+def test_compare_requires_exactly_one_image_source(client):
+    response = client.post(f"{PREFIX}/compare", params={"algorithms": ["grey_world"]})
+
+    assert response.status_code == 400
@@ -0,0 +1,82 @@
+"""Integration tests for images kept with /images."""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import image_store
+from app.services.image_store import get_image_store
+
+PREFIX = "/api/v1/white-balance"
+
+
+def upload(client, image: bytes) -> str:
+    response = client.post(f"{PREFIX}/images", files={"file": ("a.png", image, "image/png")})
+    assert response.status_code == 200
+    return response.json()["image_id"]
+
+
+def test_stored_image_matches_direct_apply(client, random_png):
+    image = random_png()
+    image_id = upload(client, image)
+
+    stored = client.post(f"{PREFIX}/images/{image_id}/apply", params={"algorithm": "grey_edge"})
+    direct = client.post(
+        f"{PREFIX}/apply",
+        params={"algorithm": "grey_edge"},
+        files={"file": ("a.png", image, "image/png")},
+    )
+
+    assert stored.status_code == 200
+    assert stored.json()["gains"] == pytest.approx(direct.json()["gains"])
+    assert stored.json()["image_base64"] == direct.json()["image_base64"]
+
+
+def test_stored_image_estimate(client, random_png):
+    image_id = upload(client, random_png())
+
+    response = client.post(f"{PREFIX}/images/{image_id}/estimate")
+
+    assert response.status_code == 200
+    assert len(response.json()["gains"]) == 3
+
+
+def test_unknown_image_returns_404(client):
+    for response in (
+        client.post(f"{PREFIX}/images/missing/apply"),
+        client.post(f"{PREFIX}/images/missing/estimate"),
+        client.delete(f"{PREFIX}/images/missing"),
+    ):
+        assert response.status_code == 404
+        assert response.json()["type"] == "ImageNotFoundError"
+
+
+def test_expired_image_returns_404(client, random_png, monkeypatch):
+    image_id = upload(client, random_png())
+    expired = time.monotonic() + get_image_store().ttl_seconds + 1
+    monkeypatch.setattr(image_store, "time", SimpleNamespace(monotonic=lambda: expired))
+
+    response = client.post(f"{PREFIX}/images/{image_id}/apply")
+
+    assert response.status_code == 404
+
+
+def test_deleted_image_returns_404(client, random_png):
+    image_id = upload(client, random_png())
+
+    assert client.delete(f"{PREFIX}/images/{image_id}").status_code == 204
+    assert client.post(f"{PREFIX}/images/{image_id}/apply").status_code == 404
+
+
+def test_oldest_image_is_evicted_at_capacity(client, random_png, monkeypatch):
+    first = upload(client, random_png())
+    size = get_image_store().get(first).size_bytes
+    monkeypatch.setattr(get_image_store(), "max_bytes", get_image_store().size_bytes + size)
+
+    second = upload(client, random_png())
+    third = upload(client, random_png())
+
+    assert client.post(f"{PREFIX}/images/{first}/apply").status_code == 404
+    assert client.post(f"{PREFIX}/images/{second}/apply").status_code == 200
+    assert client.post(f"{PREFIX}/images/{third}/apply").status_code == 200
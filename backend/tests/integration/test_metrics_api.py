@@ -0,0 +1,125 @@
+"""Integration tests for /metrics and Server-Timing headers."""
+
+import pytest
+
+from app.core.config import settings
+
+PREFIX = "/api/v1/white-balance"
+STAGES = {"decode", "convert", "estimate", "apply", "encode"}
+
+
+def stage_counts(client, operation: str, algorithm: str = "grey_world") -> dict[str, int]:
+    """Scrape /metrics for the stage histogram counts of one operation and algorithm."""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    prefix = f'white_balance_stage_seconds_count{{operation="{operation}",stage="'
+    suffix = f'",algorithm="{algorithm}",processing_space="linear_rgb"}}'
+    counts = {}
+    for line in response.text.splitlines():
+        series, _, value = line.rpartition(" ")
+        if series.startswith(prefix) and series.endswith(suffix):
+            counts[series[len(prefix) : -len(suffix)]] = int(value)
+    return counts
+
+
+def server_timing_stages(response) -> set[str]:
+    """Stage names listed in the Server-Timing header of a response."""
+    entries = response.headers["Server-Timing"].split(", ")
+    assert all(";dur=" in entry for entry in entries)
+    return {entry.split(";")[0] for entry in entries}
+
+
+def increments(before: dict[str, int], after: dict[str, int]) -> dict[str, int]:
+    return {stage: count - before.get(stage, 0) for stage, count in after.items()}
+
+
+def upload(image: bytes, field: str = "file", count: int = 1):
+    if field == "file":
+        return {"file": ("a.png", image, "image/png")}
+    return [(field, (f"{index}.png", image, "image/png")) for index in range(count)]
+
+
+def test_apply_is_timed_and_scraped(client, random_png):
+    before = stage_counts(client, "apply")
+
+    response = client.post(f"{PREFIX}/apply", files=upload(random_png()))
+
+    assert server_timing_stages(response) == STAGES
+    assert increments(before, stage_counts(client, "apply")) == dict.fromkeys(STAGES, 1)
+    text = client.get("/metrics").text
+    assert "# TYPE white_balance_request_bytes histogram" in text
+    assert "white_balance_result_cache_hits_total" in text
+
+
+def test_cache_hit_reports_no_stages(client, random_png):
+    image = random_png()
+    client.post(f"{PREFIX}/apply", files=upload(image))
+    before = stage_counts(client, "apply")
+
+    response = client.post(f"{PREFIX}/apply", files=upload(image))
+
+    assert response.headers["Server-Timing"] == 'cache;desc="hit"'
+    assert stage_counts(client, "apply") == before
+
+
+def test_estimate_is_timed(client, random_png):
+    before = stage_counts(client, "estimate")
+
+    response = client.post(f"{PREFIX}/estimate", files=upload(random_png()))
+
+    assert server_timing_stages(response) == {"decode", "convert", "estimate"}
+    assert increments(before, stage_counts(client, "estimate")) == {
+        "decode": 1,
+        "convert": 1,
+        "estimate": 1,
+    }
+
+
+def test_batch_is_timed_per_image(client, random_png):
+    before = stage_counts(client, "batch")
+
+    response = client.post(
+        f"{PREFIX}/apply-batch",
+        files=upload(random_png(), "files", 1) + upload(random_png(), "files", 2),
+    )
+
+    assert response.status_code == 200
+    assert server_timing_stages(response) == STAGES
+    assert increments(before, stage_counts(client, "batch")) == dict.fromkeys(STAGES, 3)
+
+
+def test_compare_is_timed_per_variant(client, random_png):
+    before = {
+        algorithm: stage_counts(client, "compare", algorithm)
+        for algorithm in ("grey_world", "grey_edge")
+    }
+
+    response = client.post(
+        f"{PREFIX}/compare",
+        params={"algorithms": ["grey_world", "grey_edge"]},
+        files=upload(random_png()),
+    )
+
+    assert server_timing_stages(response) == STAGES
+    for algorithm, counts in before.items():
+        after = stage_counts(client, "compare", algorithm)
+        assert increments(counts, after) == dict.fromkeys(STAGES, 1)
+
+
+def test_sequence_is_timed_per_frame(client, random_png):
+    before = stage_counts(client, "sequence")
+
+    response = client.post(f"{PREFIX}/apply-sequence", files=upload(random_png(), "files", 3))
+
+    assert response.status_code == 200
+    assert increments(before, stage_counts(client, "sequence"))["apply"] == 3
+
+
+@pytest.mark.parametrize("path", ["/apply", "/estimate"])
+def test_server_timing_follows_metrics_setting(client, random_png, monkeypatch, path):
+    monkeypatch.setattr(settings, "metrics_enabled", False)
+
+    response = client.post(f"{PREFIX}{path}", files=upload(random_png()))
+
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
@@ -0,0 +1,56 @@
+"""Integration tests for profiling /apply requests."""
+
+from app.core.config import settings
+
+PREFIX = "/api/v1/white-balance"
+
+
+def apply(client, image: bytes, **kwargs):
+    return client.post(f"{PREFIX}/apply", files={"file": ("a.png", image, "image/png")}, **kwargs)
+
+
+def test_profile_is_rejected_when_profiling_is_disabled(client, random_png, monkeypatch):
+    monkeypatch.setattr(settings, "profiling_enabled", False)
+
+    response = apply(client, random_png(), params={"profile": True})
+
+    assert response.status_code == 400
+    assert response.json()["type"] == "WhiteBalanceError"
+
+
+def test_profiled_apply_returns_report_and_bypasses_cache(client, random_png, monkeypatch):
+    monkeypatch.setattr(settings, "profiling_enabled", True)
+    monkeypatch.setattr(settings, "profiler", "cprofile")
+    monkeypatch.setattr(settings, "profile_dir", None)
+    image = random_png()
+    apply(client, image)
+
+    response = apply(client, image, params={"profile": True})
+
+    assert response.status_code == 200
+    assert "X-Cache" not in response.headers
+    body = response.json()
+    assert body["profile_id"]
+    assert "function calls" in body["profile_summary"]
+
+
+def test_profiled_binary_response_carries_profile_id(client, random_png, monkeypatch):
+    monkeypatch.setattr(settings, "profiling_enabled", True)
+    monkeypatch.setattr(settings, "profiler", "cprofile")
+    monkeypatch.setattr(settings, "profile_dir", None)
+
+    response = apply(
+        client, random_png(), params={"profile": True}, headers={"Accept": "image/png"}
+    )
+
+    assert response.status_code == 200
+    assert len(response.headers["X-Profile-Id"]) == 32
+
+
+def test_unprofiled_apply_has_no_profile(client, random_png, monkeypatch):
+    monkeypatch.setattr(settings, "profiling_enabled", True)
+
+    body = apply(client, random_png()).json()
+
+    assert body["profile_id"] is None
+    assert body["profile_summary"] is None
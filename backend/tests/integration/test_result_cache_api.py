@@ -0,0 +1,34 @@
+"""Integration tests for result caching in the API."""
+
+PREFIX = "/api/v1/white-balance"
+
+
+def test_repeated_apply_is_served_from_cache(client, random_png):
+    image = random_png()
+
+    def apply(**params):
+        return client.post(
+            f"{PREFIX}/apply", params=params, files={"file": ("a.png", image, "image/png")}
+        )
+
+    first = apply(algorithm="grey_edge")
+    second = apply(algorithm="grey_edge")
+    changed = apply(algorithm="grey_edge", sigma=2)
+
+    assert first.headers["X-Cache"] == "MISS"
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json() == first.json()
+    assert changed.headers["X-Cache"] == "MISS"
+
+
+def test_batch_reports_partial_cache_hits(client, random_png):
+    cached, fresh = random_png(), random_png()
+    client.post(f"{PREFIX}/apply", files={"file": ("a.png", cached, "image/png")})
+
+    response = client.post(
+        f"{PREFIX}/apply-batch",
+        files=[("files", ("a.png", cached, "image/png")), ("files", ("b.png", fresh, "image/png"))],
+    )
+
+    assert response.status_code == 200
+    assert response.headers["X-Cache"] == "PARTIAL"
@@ -0,0 +1,77 @@
+"""Integration tests for upload size limits."""
+
+import struct
+import zlib
+
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+from app.services.uploads import max_image_pixels
+
+PREFIX = "/api/v1/white-balance"
+
+
+def png_header(width: int, height: int) -> bytes:
+    """Encode a PNG that declares the given size but contains no pixel data."""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IEND", b"")
+
+
+def post_image(client, path: str, image: bytes):
+    """Upload one image to an endpoint using its file field name."""
+    if path == "/apply-batch":
+        files = [("files", ("a.png", image, "image/png"))]
+    else:
+        files = {"file": ("a.png", image, "image/png")}
+    return client.post(f"{PREFIX}{path}", files=files)
+
+
+PATHS = ["/apply", "/apply-batch", "/images"]
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_upload_over_byte_limit_is_rejected(client, random_png, monkeypatch, path):
+    image = random_png()
+    monkeypatch.setattr(settings, "max_upload_bytes", len(image) - 1)
+
+    response = post_image(client, path, image)
+
+    assert response.status_code == 413
+    assert response.json()["type"] == "PayloadTooLargeError"
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_image_over_megapixel_limit_is_rejected(client, random_png, monkeypatch, path):
+    monkeypatch.setattr(settings, "max_image_megapixels", 0.001)
+
+    response = post_image(client, path, random_png(48, 32))
+
+    assert response.status_code == 413
+    assert "MP" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_header_bomb_is_rejected_without_decoding(client, path):
+    response = post_image(client, path, png_header(100_000, 100_000))
+
+    assert response.status_code == 413
+    assert response.json()["type"] == "PayloadTooLargeError"
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_upload_within_limits_is_accepted(client, random_png, monkeypatch, path):
+    image = random_png(48, 32)
+    monkeypatch.setattr(settings, "max_upload_bytes", len(image))
+    monkeypatch.setattr(settings, "max_image_megapixels", 48 * 32 / 1e6)
+
+    assert post_image(client, path, image).status_code == 200
+
+
+def test_pillow_guard_follows_settings(client):
+    assert Image.MAX_IMAGE_PIXELS == max_image_pixels()
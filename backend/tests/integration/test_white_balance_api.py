@@ -0,0 +1,98 @@
+"""Integration tests for the white balance API."""
+
+import io
+import json
+import math
+
+import numpy as np
+import pytest
+from PIL import Image
+
+PREFIX = "/api/v1/white-balance"
+
+
+def encode_png(array: np.ndarray) -> bytes:
+    """Encode an 8-bit RGB array as PNG."""
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("algorithm", ["grey_world", "white_patch", "grey_edge", "max_rgb"])
+def test_estimate_black_image_returns_finite_illuminant(client, algorithm):
+    image = encode_png(np.zeros((32, 48, 3), dtype=np.uint8))
+
+    response = client.post(
+        f"{PREFIX}/estimate",
+        params={"algorithm": algorithm},
+        files={"file": ("black.png", image, "image/png")},
+    )
+
+    assert response.status_code == 200
+    # NaN is sent as null, which clients cannot use as a color
+    illuminant = response.json()["illuminant_rgb"]
+    assert None not in illuminant
+    assert all(math.isfinite(value) for value in illuminant)
+    assert sum(illuminant) == pytest.approx(1.0)
+
+
+def test_apply_sequence_streams_frames_and_summary(client):
+    generator = np.random.default_rng(0)
+    frames = [
+        ("files", (f"{index}.png", encode_png(generator.integers(0, 256, (16, 24, 3), np.uint8))))
+        for index in range(3)
+    ]
+
+    response = client.post(f"{PREFIX}/apply-sequence", files=frames)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines[:-1]] == [0, 1, 2]
+    assert [line["filename"] for line in lines[:-1]] == ["0.png", "1.png", "2.png"]
+    assert lines[-1]["frame_count"] == 3
+    assert lines[-1]["estimated_frames"] == 1
+
+
+def test_apply_sequence_reports_errors_after_first_upload_in_stream(client):
+    frame = encode_png(np.full((16, 24, 3), 128, dtype=np.uint8))
+    frames = [("files", ("0.png", frame)), ("files", ("1.png", b"junk"))]
+
+    response = client.post(f"{PREFIX}/apply-sequence", files=frames)
+
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["index"] == 0
+    assert lines[-1]["type"] == "InvalidImageError"
+
+    response = client.post(f"{PREFIX}/apply-sequence", files=frames[::-1])
+
+    assert response.status_code == 422
+    assert response.json()["type"] == "InvalidImageError"
+
+
+@pytest.mark.parametrize(
+    "path", ["/apply", "/estimate", "/apply-batch", "/apply-sequence", "/compare"]
+)
+def test_shared_query_parameters_are_validated(client, path):
+    image = encode_png(np.full((16, 24, 3), 128, dtype=np.uint8))
+    field = "files" if path in ("/apply-batch", "/apply-sequence") else "file"
+
+    response = client.post(
+        f"{PREFIX}{path}", params={"sigma": 100}, files={field: ("0.png", image)}
+    )
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["query", "sigma"]
+
+
+def test_apply_sequence_rejects_estimation_error_report(client):
+    image = encode_png(np.full((16, 24, 3), 128, dtype=np.uint8))
+
+    response = client.post(
+        f"{PREFIX}/apply-sequence",
+        params={"report_estimation_error": True},
+        files={"files": ("0.png", image)},
+    )
+
+    assert response.status_code == 400
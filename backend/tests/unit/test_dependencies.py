@@ -0,0 +1,34 @@
+"""Tests for request dependencies."""
+
+import pytest
+
+from app.api.dependencies import get_accepted_image_format
+from app.models.enums import OutputFormat
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        (None, None),
+        ("", None),
+        ("application/json", None),
+        ("*/*", None),
+        ("image/*", OutputFormat.PNG),
+        ("image/webp", OutputFormat.WEBP),
+        ("IMAGE/JPEG", OutputFormat.JPEG),
+        ("image/webp;q=0.9, application/json;q=0.5", OutputFormat.WEBP),
+        ("application/json;q=0.5, image/webp;q=0.9", OutputFormat.WEBP),
+        ("image/webp;q=0.5, application/json;q=0.9", None),
+        ("image/png, */*;q=0.1", OutputFormat.PNG),
+        # Ties with JSON keep JSON, ties between images go to the first listed
+        ("image/png, application/json", None),
+        ("image/webp;q=0.8, application/json;q=0.8", None),
+        ("image/webp;q=0.8, image/png;q=0.8", OutputFormat.WEBP),
+        # Malformed quality values count as q=0
+        ("image/webp;q=high", None),
+        ("image/webp;q=high, image/jpeg;q=0.1", OutputFormat.JPEG),
+        ("image/gif", None),
+    ],
+)
+def test_accept_header_negotiation(accept, expected):
+    assert get_accepted_image_format(accept) == expected
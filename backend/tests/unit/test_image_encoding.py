@@ -0,0 +1,46 @@
+"""Tests for output image encoding."""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+from app.models.enums import OutputFormat
+from app.services.image_encoding import encode_image
+
+
+@pytest.fixture
+def save_options(monkeypatch) -> list[dict]:
+    """Record the options every image is saved with."""
+    options: list[dict] = []
+    save = Image.Image.save
+
+    def recording_save(self, fp, format=None, **params):
+        options.append(params)
+        return save(self, fp, format, **params)
+
+    monkeypatch.setattr(Image.Image, "save", recording_save)
+    return options
+
+
+@pytest.mark.parametrize(
+    "compress_level, png_level, webp_method", [(None, 6, 4), (1, 1, 1), (9, 9, 6)]
+)
+def test_png_and_webp_resolve_their_own_effort(
+    save_options, compress_level, png_level, webp_method
+):
+    array = np.zeros((8, 8, 3), dtype=np.uint8)
+
+    encode_image(array, OutputFormat.PNG, compress_level=compress_level)
+    encode_image(array, OutputFormat.WEBP, compress_level=compress_level)
+
+    assert save_options[0]["compress_level"] == png_level
+    assert save_options[1]["method"] == webp_method
+
+
+def test_webp_default_follows_setting(save_options, monkeypatch):
+    monkeypatch.setattr(settings, "webp_method", 2)
+
+    encode_image(np.zeros((8, 8, 3), dtype=np.uint8), OutputFormat.WEBP)
+
+    assert save_options[0]["method"] == 2
@@ -0,0 +1,100 @@
+"""Tests for the in-memory image store."""
+
+import numpy as np
+import pytest
+
+from app.core.errors import ImageNotFoundError
+from app.models.dto import StoredImage
+from app.services import image_store
+from app.services.image_store import ImageStore
+
+
+class FakeClock:
+    """Stand-in for ``time.monotonic`` that only moves when told to."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(image_store, "time", clock)
+    return clock
+
+
+def stored_image(image_id: str, side: int = 10) -> StoredImage:
+    """Create a stored image holding side * side * 3 bytes."""
+    return StoredImage(image_id, np.zeros((side, side, 3), dtype=np.uint8), (0.0, 0.0, 0.0))
+
+
+def test_get_returns_stored_image(clock):
+    store = ImageStore(max_bytes=10_000, ttl_seconds=60)
+    image = stored_image("a")
+
+    assert store.put(image)
+
+    assert store.get("a") is image
+    assert "a" in store
+    assert store.size_bytes == image.size_bytes
+
+
+def test_unknown_image_is_not_found(clock):
+    store = ImageStore(max_bytes=10_000, ttl_seconds=60)
+
+    with pytest.raises(ImageNotFoundError):
+        store.get("missing")
+    with pytest.raises(ImageNotFoundError):
+        store.delete("missing")
+
+
+def test_images_expire_after_ttl_without_access(clock):
+    store = ImageStore(max_bytes=10_000, ttl_seconds=60)
+    store.put(stored_image("a"))
+    store.put(stored_image("b"))
+
+    clock.now += 50
+    store.get("a")
+    clock.now += 50
+
+    # "a" was used 50 s ago, "b" was last used 100 s ago
+    assert "a" in store
+    assert "b" not in store
+    with pytest.raises(ImageNotFoundError):
+        store.get("b")
+    assert store.size_bytes == stored_image("a").size_bytes
+
+
+def test_least_recently_used_image_is_evicted_at_capacity(clock):
+    store = ImageStore(max_bytes=3 * 300, ttl_seconds=60)
+    for image_id in "abc":
+        store.put(stored_image(image_id))
+    store.get("a")
+
+    store.put(stored_image("d"))
+
+    assert len(store) == 3
+    assert "b" not in store
+    assert all(image_id in store for image_id in "acd")
+    assert store.size_bytes == 3 * 300
+
+
+def test_image_larger_than_budget_is_not_stored(clock):
+    store = ImageStore(max_bytes=200, ttl_seconds=60)
+
+    assert not store.put(stored_image("a"))
+    assert len(store) == 0
+    assert store.size_bytes == 0
+
+
+def test_delete_releases_memory(clock):
+    store = ImageStore(max_bytes=10_000, ttl_seconds=60)
+    store.put(stored_image("a"))
+
+    store.delete("a")
+
+    assert "a" not in store
+    assert store.size_bytes == 0
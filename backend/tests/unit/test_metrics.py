@@ -0,0 +1,68 @@
+"""Tests for the Prometheus metrics and stage timing helpers."""
+
+from app.core import metrics
+from app.core.metrics import CallbackMetric, Histogram
+
+
+def test_histogram_renders_cumulative_buckets_per_label_set():
+    histogram = Histogram("test_seconds", "Test histogram.", (0.1, 1.0), ("stage",))
+
+    histogram.observe(0.05, stage="decode")
+    histogram.observe(0.5, stage="decode")
+    histogram.observe(5.0, stage="decode")
+    histogram.observe(0.5, stage='say "hi"')
+
+    lines = histogram.render()
+
+    assert lines[:2] == ["# HELP test_seconds Test histogram.", "# TYPE test_seconds histogram"]
+    assert 'test_seconds_bucket{stage="decode",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{stage="decode",le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{stage="decode",le="+Inf"} 3' in lines
+    assert 'test_seconds_sum{stage="decode"} 5.55' in lines
+    assert 'test_seconds_count{stage="decode"} 3' in lines
+    assert 'test_seconds_count{stage="say \\"hi\\""} 1' in lines
+
+
+def test_callback_metric_reads_value_when_rendered():
+    value = [1]
+    metric = CallbackMetric("test_total", "Test counter.", "counter", lambda: value[0])
+
+    value[0] = 7
+
+    assert metric.render()[-1] == "test_total 7.0"
+
+
+def test_stages_are_collected_only_inside_collection_block():
+    with metrics.stage("decode"):
+        pass
+
+    with metrics.collect_stage_times() as times:
+        with metrics.stage("decode"):
+            pass
+        with metrics.stage("decode"):
+            pass
+        with metrics.stage("encode"):
+            pass
+
+    assert list(times) == ["decode", "encode"]
+    assert all(millis >= 0.0 for millis in times.values())
+
+
+def test_nested_collection_adds_to_enclosing_block():
+    with metrics.collect_stage_times() as outer:
+        with metrics.stage("decode"):
+            pass
+        with metrics.collect_stage_times() as inner:
+            with metrics.stage("apply"):
+                pass
+
+    assert list(inner) == ["apply"]
+    assert list(outer) == ["decode", "apply"]
+    assert outer["apply"] == inner["apply"]
+
+
+def test_server_timing_format():
+    total = {"decode": 1.0}
+    metrics.add_stage_times(total, {"decode": 2.2, "encode": 0.5})
+
+    assert metrics.format_server_timing(total) == "decode;dur=3.2, encode;dur=0.5"
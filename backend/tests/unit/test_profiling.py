@@ -0,0 +1,63 @@
+"""Tests for per-job profiling."""
+
+import pytest
+import torch
+
+from app.core import metrics
+from app.core.config import settings
+from app.services import profiling
+from app.services.profiling import JobProfiler
+
+
+def work() -> None:
+    with metrics.collect_stage_times(), metrics.stage("apply"):
+        torch.ones(64, 64).matmul(torch.ones(64, 64))
+
+
+def test_disabled_profiler_does_nothing():
+    with JobProfiler(False) as profiler:
+        work()
+
+    assert profiler.report is None
+
+
+@pytest.mark.parametrize(
+    "profiler_name, summary_entry, trace_suffix",
+    [("torch", "aten::mm", ".json"), ("cprofile", "matmul", ".prof")],
+)
+def test_profile_report_and_stored_trace(
+    monkeypatch, tmp_path, profiler_name, summary_entry, trace_suffix
+):
+    monkeypatch.setattr(settings, "profiler", profiler_name)
+    monkeypatch.setattr(settings, "profile_dir", str(tmp_path))
+
+    with JobProfiler(True) as profiler:
+        work()
+
+    report = profiler.report
+    assert summary_entry in report.summary
+    assert report.trace_path == str(tmp_path / f"{report.profile_id}{trace_suffix}")
+    assert (tmp_path / f"{report.profile_id}{trace_suffix}").exists()
+    assert (tmp_path / f"{report.profile_id}.txt").read_text() == report.summary
+
+
+def test_torch_profile_labels_stages(monkeypatch):
+    monkeypatch.setattr(settings, "profiler", "torch")
+    monkeypatch.setattr(settings, "profile_dir", None)
+
+    with JobProfiler(True) as profiler:
+        work()
+
+    assert "stage:apply" in profiler.report.summary
+    assert profiler.report.trace_path is None
+
+
+def test_failed_job_has_no_report_and_releases_lock(monkeypatch):
+    monkeypatch.setattr(settings, "profiler", "cprofile")
+
+    with pytest.raises(ValueError):
+        with JobProfiler(True) as profiler:
+            raise ValueError("job failed")
+
+    assert profiler.report is None
+    assert not profiling._profile_lock.locked()
@@ -0,0 +1,77 @@
+"""Tests for the result cache."""
+
+from types import SimpleNamespace
+
+from app.models.api_schemas import WhiteBalanceRequest
+from app.services.result_cache import ENTRY_OVERHEAD, ResultCache, content_hash, make_cache_key
+
+
+def result(output_bytes: int, name: str = "") -> SimpleNamespace:
+    """Create a picklable stand-in for a cached result of the given size."""
+    return SimpleNamespace(output_bytes=output_bytes, name=name)
+
+
+def test_cache_key_depends_on_content_and_parameters():
+    request = WhiteBalanceRequest(algorithm="grey_world")
+    key = make_cache_key("apply", content_hash(b"image"), request)
+
+    assert key == make_cache_key("apply", content_hash(b"image"), request.model_copy())
+    assert key != make_cache_key("apply", content_hash(b"other"), request)
+    assert key != make_cache_key("estimate", content_hash(b"image"), request)
+    changed = WhiteBalanceRequest(algorithm="grey_world", sigma=2.0)
+    assert key != make_cache_key("apply", content_hash(b"image"), changed)
+
+
+def test_least_recently_used_entries_are_evicted_at_size_limit():
+    cache = ResultCache(max_bytes=3 * (1000 + ENTRY_OVERHEAD))
+    for key in "abc":
+        cache.put(key, result(1000))
+
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.get("a") is not None
+    cache.put("d", result(1000))
+
+    assert cache.get("b") is None
+    assert [cache.get(key) is not None for key in "acd"] == [True, True, True]
+    assert cache.evictions == 1
+    assert cache.size_bytes == 3 * (1000 + ENTRY_OVERHEAD)
+
+
+def test_results_larger_than_budget_are_not_cached():
+    cache = ResultCache(max_bytes=1000)
+
+    cache.put("a", result(2000))
+
+    assert cache.get("a") is None
+    assert cache.size_bytes == 0
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ResultCache(max_bytes=0)
+
+    cache.put("a", result(10))
+
+    assert cache.get("a") is None
+    assert cache.misses == 0
+
+
+def test_disk_tier_survives_a_new_cache_instance(tmp_path):
+    cache = ResultCache(max_bytes=1 << 20, directory=str(tmp_path), disk_max_bytes=1 << 20)
+    cache.put("a", result(10, "persisted"))
+
+    restarted = ResultCache(max_bytes=1 << 20, directory=str(tmp_path), disk_max_bytes=1 << 20)
+
+    assert len(restarted) == 0
+    assert restarted.get("a").name == "persisted"
+    assert restarted.hits == 1
+    # Loaded entries are kept in memory from then on
+    assert len(restarted) == 1
+
+
+def test_disk_tier_is_pruned_to_its_budget(tmp_path):
+    cache = ResultCache(max_bytes=1 << 20, directory=str(tmp_path), disk_max_bytes=1)
+
+    cache.put("a", result(10))
+    cache.put("b", result(10))
+
+    assert not list(tmp_path.glob("*.pkl"))
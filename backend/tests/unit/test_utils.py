@@ -0,0 +1,75 @@
+"""Tests for engine utilities."""
+
+import math
+
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+
+from app.engine import utils
+from app.engine.utils import angular_error, gains_to_illuminant, image_to_array
+
+
+@pytest.fixture
+def image() -> Image.Image:
+    """Create a small random RGB image."""
+    generator = np.random.default_rng(0)
+    return Image.fromarray(generator.integers(0, 256, (37, 53, 3), dtype=np.uint8))
+
+
+@pytest.mark.parametrize("box", [None, (5, 3, 41, 30)])
+def test_image_to_array_matches_pillow(image, box):
+    region = image if box is None else image.crop(box)
+
+    array = image_to_array(image, box)
+
+    np.testing.assert_array_equal(array, np.asarray(region))
+    assert not array.flags.writeable
+
+
+@pytest.mark.parametrize("box", [None, (5, 3, 41, 30)])
+def test_image_to_array_falls_back_without_raw_encoder(image, box, monkeypatch):
+    def missing_encoder(*args):
+        raise AttributeError("module 'PIL.Image' has no attribute '_getencoder'")
+
+    monkeypatch.setattr(utils, "_pack_pixels", missing_encoder)
+    region = image if box is None else image.crop(box)
+    out = np.zeros((region.height, region.width, 3), dtype=np.uint8)
+
+    array = image_to_array(image, box, out)
+
+    assert array is out
+    np.testing.assert_array_equal(array, np.asarray(region))
+
+
+def test_gains_to_illuminant_is_normalized_inverse():
+    illuminant = gains_to_illuminant(torch.tensor([0.5, 1.0, 2.0]))
+
+    torch.testing.assert_close(illuminant, torch.tensor([4.0, 2.0, 1.0]) / 7.0)
+
+
+def test_gains_to_illuminant_is_neutral_for_zero_gains():
+    illuminant = gains_to_illuminant(torch.zeros(2, 3))
+
+    torch.testing.assert_close(illuminant, torch.full((2, 3), 1.0 / 3.0))
+
+
+def test_gains_to_illuminant_is_neutral_for_infinite_gains():
+    illuminant = gains_to_illuminant(torch.full((3,), math.inf))
+
+    torch.testing.assert_close(illuminant, torch.full((3,), 1.0 / 3.0))
+
+
+def test_gains_to_illuminant_stays_finite_for_one_zero_gain():
+    illuminant = gains_to_illuminant(torch.tensor([0.0, 1.0, 1.0]))
+
+    assert torch.isfinite(illuminant).all()
+    torch.testing.assert_close(illuminant.sum(), torch.tensor(1.0))
+
+
+def test_angular_error_of_zero_gains_is_finite():
+    error = angular_error(torch.zeros(3), torch.ones(3))
+
+    assert torch.isfinite(error)
+    assert error.item() < 1e-3
@@ -0,0 +1,77 @@
+"""Tests for the Minkowski family of white balance algorithms."""
+
+import math
+
+import pytest
+import torch
+
+from app.engine.tiling import MinkowskiMomentAccumulator, iter_row_bands
+from app.engine.white_balance_minkowski import MinkowskiConfig, estimate_minkowski
+
+CONFIGS = [(0, 1.0, 0.0), (0, 6.0, 0.0), (0, math.inf, 0.0), (1, 6.0, 1.0), (2, 6.0, 1.0)]
+
+
+def flat_image(color: tuple[int, int, int], height: int = 40, width: int = 30) -> torch.Tensor:
+    """Create an image of one color."""
+    return (torch.tensor(color, dtype=torch.float32) / 255.0)[:, None, None].expand(
+        3, height, width
+    ).contiguous()
+
+
+def constant_blue_image(height: int = 40, width: int = 30) -> torch.Tensor:
+    """Create a textured image whose blue channel is constant."""
+    generator = torch.Generator().manual_seed(0)
+    image = torch.rand(3, height, width, generator=generator) * 0.5 + 0.2
+    image[2] = 90 / 255.0
+    return image
+
+
+def tiled_gains(image: torch.Tensor, config: tuple[int, float, float]) -> torch.Tensor:
+    """Estimate gains by streaming small bands through the moment accumulator."""
+    accumulator = MinkowskiMomentAccumulator([config])
+    height, width = image.shape[-2:]
+    for band in iter_row_bands(height, width, 7 * width, accumulator.halo):
+        rows = image[:, band.top - band.halo_top : band.bottom + band.halo_bottom]
+        accumulator.update(rows, band.halo_top, band.halo_bottom)
+    return accumulator.gains()
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+def test_flat_image_gets_unit_gains_for_derivatives(config):
+    order, p, sigma = config
+    image = flat_image((180, 140, 90))
+
+    gains = estimate_minkowski(image, order, p, sigma)
+    if order == 0:
+        # Pixel values are the signal, so a flat image is balanced like grey world
+        assert gains[0] < gains[1] < gains[2]
+    else:
+        torch.testing.assert_close(gains, torch.ones(3))
+    torch.testing.assert_close(tiled_gains(image, MinkowskiConfig(*config)), gains)
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+def test_black_image_gets_unit_gains(config):
+    image = flat_image((0, 0, 0))
+
+    torch.testing.assert_close(estimate_minkowski(image, *config), torch.ones(3))
+    torch.testing.assert_close(tiled_gains(image, MinkowskiConfig(*config)), torch.ones(3))
+
+
+@pytest.mark.parametrize("config", [config for config in CONFIGS if config[0] > 0])
+def test_constant_channel_is_left_neutral(config):
+    image = constant_blue_image()
+
+    gains = estimate_minkowski(image, *config)
+    assert gains[2] == 1.0
+    # The textured channels are balanced against each other only
+    assert 0.8 < gains[0] < 1.25 and 0.8 < gains[1] < 1.25
+    torch.testing.assert_close(tiled_gains(image, MinkowskiConfig(*config)), gains)
+
+
+def test_batched_images_are_guarded_independently():
+    images = torch.stack([flat_image((180, 140, 90)), constant_blue_image()])
+
+    gains = estimate_minkowski(images, 1, 6.0, 1.0)
+    torch.testing.assert_close(gains[0], torch.ones(3))
+    torch.testing.assert_close(gains[1], estimate_minkowski(images[1], 1, 6.0, 1.0))
@@ -0,0 +1,111 @@
+"""Tests for path selection in the white balance service."""
+
+import asyncio
+import io
+
+import numpy as np
+import pytest
+import torch
+from fastapi import UploadFile
+from PIL import Image
+
+from app.core.config import settings
+from app.engine import registry
+from app.models.api_schemas import WhiteBalanceRequest
+from app.services.white_balance_service import WhiteBalanceService
+
+
+def encode_png(seed: int, size: tuple[int, int] = (48, 32)) -> bytes:
+    """Encode a small random RGB image as PNG."""
+    generator = np.random.default_rng(seed)
+    pixels = generator.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def service() -> WhiteBalanceService:
+    return WhiteBalanceService()
+
+
+@pytest.mark.parametrize("batched", [True, False])
+def test_batch_is_stacked_only_for_batched_algorithms(service, batched, monkeypatch):
+    spec = registry.get_algorithm("grey_world")
+    dims = []
+
+    def estimate(stats, **params):
+        dims.append(stats.image.dim())
+        return spec.estimate(stats, **params)
+
+    monkeypatch.setitem(
+        registry._algorithms, "grey_world", spec._replace(estimate=estimate, batched=batched)
+    )
+    uploads = [(f"{seed}.png", encode_png(seed)) for seed in range(3)]
+
+    results = service._apply_batch_bytes(uploads, WhiteBalanceRequest(algorithm="grey_world"))
+
+    assert [result.filename for result in results] == ["0.png", "1.png", "2.png"]
+    assert dims == ([4] if batched else [3, 3, 3])
+
+
+def test_batch_is_processed_in_chunks_within_pixel_budget(service, monkeypatch):
+    spec = registry.get_algorithm("grey_world")
+    batch_sizes = []
+
+    def estimate(stats, **params):
+        batch_sizes.append(len(stats.image))
+        return spec.estimate(stats, **params)
+
+    monkeypatch.setitem(registry._algorithms, "grey_world", spec._replace(estimate=estimate))
+    monkeypatch.setattr(settings, "batch_max_pixels", 2 * 48 * 32)
+    images = [encode_png(seed) for seed in range(100, 105)] + [encode_png(105, (20, 20))]
+    files = [
+        UploadFile(io.BytesIO(image), filename=f"{index}.png", size=len(image))
+        for index, image in enumerate(images)
+    ]
+
+    results = asyncio.run(service.apply_batch(files, WhiteBalanceRequest(algorithm="grey_world")))
+
+    assert [result.filename for result in results] == [f"{index}.png" for index in range(6)]
+    assert sorted(batch_sizes) == [1, 1, 2, 2]
+
+
+def test_budget_shrinks_proxy_by_algorithm_cost(service, monkeypatch):
+    monkeypatch.setattr(settings, "estimation_max_edge", None)
+    monkeypatch.setattr(settings, "estimation_budget_ms", 20.0)
+    width, height = 4000, 3000
+
+    cheap = service._estimation_max_edge(WhiteBalanceRequest(algorithm="grey_world"), width, height)
+    costly = service._estimation_max_edge(WhiteBalanceRequest(algorithm="grey_edge"), width, height)
+
+    # 20 ms covers 12 MP of grey world at 1.5 ns/px, but only 50k px of grey edge
+    assert cheap is None
+    assert costly is not None and costly < 400
+    cost = registry.get_algorithm("grey_edge").cost_ns_per_pixel
+    proxy_pixels = costly * costly * height / width
+    assert proxy_pixels * cost <= 20.0 * 1e6
+
+
+def test_budget_never_enlarges_configured_proxy(service, monkeypatch):
+    monkeypatch.setattr(settings, "estimation_max_edge", 256)
+    monkeypatch.setattr(settings, "estimation_budget_ms", 1000.0)
+    request = WhiteBalanceRequest(algorithm="grey_edge")
+
+    assert service._estimation_max_edge(request, 4000, 3000) == 256
+    request = WhiteBalanceRequest(algorithm="grey_edge", estimation_max_edge=2048)
+    assert service._estimation_max_edge(request, 4000, 3000) == 2048
+
+
+@pytest.mark.parametrize(
+    "max_edge, dtype", [(None, torch.float32), (48, torch.float32), (32, torch.float16)]
+)
+def test_stored_tensor_uses_reduced_precision_only_with_proxy(
+    service, monkeypatch, max_edge, dtype
+):
+    monkeypatch.setattr(settings, "processing_dtype", "float16")
+    monkeypatch.setattr(settings, "estimation_max_edge", max_edge)
+
+    stored = service._decode_for_store("id", encode_png(0))
+
+    assert stored.linear_tensor.dtype == dtype
@@ -0,0 +1,29 @@
+"""Tests for the bounded worker pool."""
+
+import asyncio
+import os
+
+import pytest
+import torch
+
+from app.services import worker_pool
+from app.services.worker_pool import WorkerPool
+
+
+@pytest.mark.parametrize("cpus, workers, threads", [(1, 1, 1), (4, 2, 2), (16, 4, 4), (6, 2, 3)])
+def test_default_workers_keep_several_torch_threads(cpus, workers, threads, monkeypatch):
+    monkeypatch.setattr(worker_pool.os, "cpu_count", lambda: cpus)
+
+    pool = WorkerPool()
+
+    assert (pool.workers, pool.torch_threads) == (workers, threads)
+
+
+def test_in_process_jobs_skip_process_workers():
+    pool = WorkerPool("process", workers=1, torch_threads=torch.get_num_threads())
+    try:
+        assert asyncio.run(pool.run(os.getpid, in_process=True)) == os.getpid()
+        # The worker process, which would receive pickled arguments, never started
+        assert pool._executor is None
+    finally:
+        pool.shutdown()